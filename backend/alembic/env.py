@@ -3,6 +3,7 @@ from logging.config import fileConfig
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 from app.db.session import Base
+import app.models  # noqa: F401  (register the tables on Base.metadata)
 from alembic import context
 
 # this is the Alembic Config object, which provides
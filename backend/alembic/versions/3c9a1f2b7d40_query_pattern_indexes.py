@@ -0,0 +1,42 @@
+"""query pattern indexes
+
+Revision ID: 3c9a1f2b7d40
+Revises: fa7013706684
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9a1f2b7d40'
+down_revision: Union[str, Sequence[str], None] = 'fa7013706684'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_user_reviews_species_location_ts', 'user_reviews',
+     ['speciesId', 'locationId', sa.text('"timestamp" DESC'), sa.text('id DESC')]),
+    ('ix_user_reviews_timestamp_id', 'user_reviews', ['timestamp', 'id']),
+    ('ix_locations_speciesId_id', 'locations', ['speciesId', 'id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY keeps the tables writable while the indexes build; it cannot run in a transaction.
+    # IF NOT EXISTS: databases created by Base.metadata.create_all already have them.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
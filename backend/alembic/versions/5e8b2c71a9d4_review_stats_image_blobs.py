@@ -0,0 +1,76 @@
+"""review stats and image blobs
+
+Revision ID: 5e8b2c71a9d4
+Revises: d41f7a6e2b93
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8b2c71a9d4'
+down_revision: Union[str, Sequence[str], None] = 'd41f7a6e2b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # IF NOT EXISTS: databases created by Base.metadata.create_all already have both
+    op.create_table(
+        'review_stats',
+        sa.Column('speciesId', sa.Integer(), nullable=False),
+        sa.Column('locationId', sa.Integer(), nullable=False),
+        *[sa.Column(f'count{r}', sa.Integer(), nullable=False) for r in range(1, 6)],
+        sa.Column('ratingSum', sa.BigInteger(), nullable=False),
+        sa.Column('totalReviews', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['speciesId'], ['species.speciesId'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['locationId'], ['locations.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('speciesId', 'locationId'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'image_blobs',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('refCount', sa.Integer(), nullable=False),
+        sa.Column('createdAt', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('sha256'),
+        if_not_exists=True,
+    )
+
+    # Summaries for pairs that have none yet (all of them on a new table); pairs that
+    # are already maintained are left alone.
+    op.execute("""
+        INSERT INTO review_stats ("speciesId", "locationId", count1, count2, count3, count4, count5,
+                                  "ratingSum", "totalReviews")
+        SELECT "speciesId", "locationId",
+               count(*) FILTER (WHERE rating = 1), count(*) FILTER (WHERE rating = 2),
+               count(*) FILTER (WHERE rating = 3), count(*) FILTER (WHERE rating = 4),
+               count(*) FILTER (WHERE rating = 5), coalesce(sum(rating), 0), count(*)
+        FROM user_reviews
+        GROUP BY "speciesId", "locationId"
+        ON CONFLICT ("speciesId", "locationId") DO NOTHING
+    """)
+    # One reference per review image pointing at a stored blob, so `image_store gc`
+    # doesn't collect blobs that were uploaded before this table existed.
+    op.execute("""
+        INSERT INTO image_blobs (sha256, path, size, "refCount", "createdAt")
+        SELECT img->>'sha256', min(substr(img->>'url', length('/uploads/reviews/') + 1)),
+               max(coalesce((img->>'size')::bigint, 0)), count(*), now()
+        FROM user_reviews, jsonb_array_elements(user_reviews.images::jsonb) AS img
+        WHERE user_reviews.images IS NOT NULL AND img ? 'sha256'
+        GROUP BY img->>'sha256'
+        ON CONFLICT (sha256) DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('image_blobs', if_exists=True)
+    op.drop_table('review_stats', if_exists=True)
@@ -0,0 +1,71 @@
+"""location natural key
+
+Revision ID: 9a4c6e1d2f85
+Revises: 5e8b2c71a9d4
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4c6e1d2f85'
+down_revision: Union[str, Sequence[str], None] = '5e8b2c71a9d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SHOWN_DUPLICATES = 20
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Re-running a bulk load without ids used to insert every row again. Merging such
+    # rows means re-pointing their reviews and deleting locations, which cannot be
+    # undone, so it is left to the operator: refuse to go on while duplicates exist.
+    duplicates = op.get_bind().execute(sa.text(f"""
+        SELECT "speciesId", "locationName", latitude, longitude, array_agg(id ORDER BY id) AS ids
+        FROM locations
+        GROUP BY "speciesId", "locationName", latitude, longitude
+        HAVING count(*) > 1
+        ORDER BY min(id)
+        LIMIT {SHOWN_DUPLICATES + 1}
+    """)).all()
+    if duplicates:
+        shown = "\n".join(
+            f"  speciesId={d.speciesId} locationName={d.locationName!r} "
+            f"coordinates=[{d.latitude}, {d.longitude}] ids={d.ids}"
+            for d in duplicates[:SHOWN_DUPLICATES]
+        )
+        more = "\n  ..." if len(duplicates) > SHOWN_DUPLICATES else ""
+        raise RuntimeError(
+            "Cannot add ux_locations_natural_key: these locations share species, name and "
+            f"coordinates:\n{shown}{more}\n"
+            "Merge them (move their user_reviews and review_stats to one id, delete the "
+            "others) and run the upgrade again."
+        )
+
+    with op.get_context().autocommit_block():
+        # a concurrent build that failed (a duplicate inserted meanwhile) leaves an
+        # invalid index behind, which if_not_exists would otherwise keep
+        op.execute("""
+            DO $$ BEGIN
+                IF EXISTS (SELECT 1 FROM pg_index WHERE indexrelid = 'ux_locations_natural_key'::regclass
+                           AND NOT indisvalid) THEN
+                    DROP INDEX ux_locations_natural_key;
+                END IF;
+            EXCEPTION WHEN undefined_table THEN NULL;
+            END $$
+        """)
+        op.create_index('ux_locations_natural_key', 'locations',
+                        ['speciesId', 'locationName', 'latitude', 'longitude'], unique=True,
+                        if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ux_locations_natural_key', table_name='locations', if_exists=True,
+                      postgresql_concurrently=True)
@@ -0,0 +1,36 @@
+"""pending images index
+
+Revision ID: b6d3f0a8c217
+Revises: 9a4c6e1d2f85
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d3f0a8c217'
+down_revision: Union[str, Sequence[str], None] = '9a4c6e1d2f85'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # resume_pending runs in every worker; the partial index keeps it off a full scan of user_reviews
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_reviews_pending_images', 'user_reviews', ['id'],
+            postgresql_where=sa.text('images LIKE \'%"status": "pending"%\''),
+            if_not_exists=True, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_reviews_pending_images', table_name='user_reviews',
+                      if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,56 @@
+"""species search vector
+
+Revision ID: d41f7a6e2b93
+Revises: 7b2e4d91c0a5
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41f7a6e2b93'
+down_revision: Union[str, Sequence[str], None] = '7b2e4d91c0a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of app.models.Specie.SEARCH_VECTOR_SQL as of this revision: accent-folded
+# (app.services.text_fold) names weighted A, color/habitat/characteristics B, description C.
+ACCENTED = 'àáảãạăằắẳẵặâầấẩẫậäåèéẻẽẹêềếểễệëìíỉĩịîïòóỏõọôồốổỗộơờớởỡợöøùúủũụưừứửữựûüỳýỷỹỵÿđçñ'
+UNACCENTED = 'aaaaaaaaaaaaaaaaaaaeeeeeeeeeeeeiiiiiiiooooooooooooooooooouuuuuuuuuuuuuyyyyyydcn'
+
+
+def _weighted(weight: str, *columns: str) -> str:
+    text = " || ' ' || ".join(f"coalesce({c}, '')" for c in columns)
+    return f"setweight(to_tsvector('simple'::regconfig, translate(lower({text}), '{ACCENTED}', '{UNACCENTED}')), '{weight}')"
+
+
+SEARCH_VECTOR_SQL = " || ".join((
+    _weighted("A", "name", '"scientificName"'),
+    _weighted("B", "color", "habitat", "characteristics"),
+    _weighted("C", "description"),
+))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # generated column: existing rows are computed by the table rewrite
+    # (IF NOT EXISTS: databases created by Base.metadata.create_all already have it)
+    op.add_column('species', sa.Column('searchVector', postgresql.TSVECTOR(),
+                                       sa.Computed(SEARCH_VECTOR_SQL, persisted=True), nullable=True),
+                  if_not_exists=True)
+    with op.get_context().autocommit_block():
+        op.create_index('ix_species_searchVector', 'species', ['searchVector'], postgresql_using='gin',
+                        if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_species_searchVector', table_name='species', if_exists=True,
+                      postgresql_concurrently=True)
+    op.drop_column('species', 'searchVector')
@@ -0,0 +1,114 @@
+"""bloom months for multi-year periods
+
+Revision ID: e4a7c1d9b352
+Revises: b6d3f0a8c217
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7c1d9b352'
+down_revision: Union[str, Sequence[str], None] = 'b6d3f0a8c217'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+# Frozen copy of app.services.bloom_calendar.bloom_months as of this revision, so later
+# edits to the app don't change what this migration writes.
+ALL_MONTHS = list(range(1, 13))
+MONTH_NAMES = {
+    name: i
+    for i, names in enumerate((
+        ("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"),
+        ("may",), ("jun", "june"), ("jul", "july"), ("aug", "august"),
+        ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"), ("dec", "december"),
+    ), start=1)
+    for name in names
+}
+_ISO = re.compile(r"^(\d{4})-(\d{1,2})(?:-\d{1,2})?")
+_MONTH_ONLY = re.compile(r"^(?:th[aá]ng\s*)?(\d{1,2})$", re.IGNORECASE)
+
+
+def parse_month(value):
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return (None, value) if 1 <= value <= 12 else None
+    text = str(value).strip()
+    match = _ISO.match(text)
+    if match:
+        year, month = int(match.group(1)), int(match.group(2))
+        return (year, month) if 1 <= month <= 12 else None
+    match = _MONTH_ONLY.match(text)
+    if match:
+        month = int(match.group(1))
+        return (None, month) if 1 <= month <= 12 else None
+    month = MONTH_NAMES.get(text.lower())
+    return (None, month) if month else None
+
+
+def month_span(start, end):
+    length = (end - start) % 12 + 1
+    return sorted((start - 1 + i) % 12 + 1 for i in range(length))
+
+
+def bloom_months(period):
+    if not isinstance(period, dict):
+        return None
+    peak = parse_month(period.get("peak"))
+    start = parse_month(period.get("start")) or peak
+    end = parse_month(period.get("end")) or peak
+    if start is None and end is None:
+        return None
+    (start_year, start_month), (end_year, end_month) = start or end, end or start
+    if start_year is not None and end_year is not None:
+        if (end_year - start_year) * 12 + end_month - start_month >= 11:
+            return ALL_MONTHS
+    return month_span(start_month, end_month)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # bloomMonths used to ignore the year, so a period of a year or more ("2025-03" to
+    # "2026-03") was stored as [3]. Recompute every row and write the ones that differ.
+    conn = op.get_bind()
+    locations = sa.table(
+        'locations', sa.column('id', sa.Integer), sa.column('bloomingPeriod', postgresql.JSONB),
+        sa.column('bloomMonths', postgresql.ARRAY(sa.Integer)),
+    )
+    last_id = 0
+    # the recompute needs rows back from the database, so --sql output leaves it out
+    while not op.get_context().as_sql:
+        rows = conn.execute(
+            sa.select(locations.c.id, locations.c.bloomingPeriod, locations.c.bloomMonths)
+            .where(locations.c.id > last_id, locations.c.bloomingPeriod.isnot(None))
+            .order_by(locations.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        updates = [
+            {"_id": i, "months": m}
+            for i, p, current in rows
+            if (m := bloom_months(p)) != current
+        ]
+        if updates:
+            conn.execute(
+                locations.update().where(locations.c.id == sa.bindparam('_id'))
+                .values(bloomMonths=sa.bindparam('months')),
+                updates,
+            )
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # the recomputed arrays are correct under the old code too; nothing to undo
+    pass
@@ -9,6 +9,7 @@ from typing import Sequence, Union
 
 from alembic import op
 import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
 
 
 # revision identifiers, used by Alembic.
@@ -20,13 +21,59 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     """Upgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    pass
-    # ### end Alembic commands ###
+    # The original schema (species, locations, user_reviews). Databases that were set
+    # up by Base.metadata.create_all before this revision created anything already
+    # have these tables, hence IF NOT EXISTS; later revisions add to them.
+    op.create_table(
+        'species',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('speciesId', sa.Integer(), nullable=True),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('scientificName', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('imageUrl', sa.String(), nullable=True),
+        sa.Column('bloomTime', sa.String(), nullable=True),
+        sa.Column('color', sa.String(), nullable=True),
+        sa.Column('habitat', sa.String(), nullable=True),
+        sa.Column('characteristics', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index(op.f('ix_species_id'), 'species', ['id'], if_not_exists=True)
+    op.create_index(op.f('ix_species_speciesId'), 'species', ['speciesId'], unique=True, if_not_exists=True)
+    op.create_table(
+        'locations',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('speciesId', sa.Integer(), nullable=False),
+        sa.Column('locationName', sa.String(), nullable=False),
+        sa.Column('latitude', sa.Float(), nullable=False),
+        sa.Column('longitude', sa.Float(), nullable=False),
+        sa.Column('bloomingPeriod', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.ForeignKeyConstraint(['speciesId'], ['species.speciesId']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index(op.f('ix_locations_id'), 'locations', ['id'], if_not_exists=True)
+    op.create_table(
+        'user_reviews',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('speciesId', sa.Integer(), nullable=False),
+        sa.Column('locationId', sa.Integer(), nullable=False),
+        sa.Column('userName', sa.String(), nullable=False),
+        sa.Column('rating', sa.Integer(), nullable=False),
+        sa.Column('comment', sa.String(), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('images', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['speciesId'], ['species.speciesId'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['locationId'], ['locations.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index(op.f('ix_user_reviews_id'), 'user_reviews', ['id'], if_not_exists=True)
 
 
 def downgrade() -> None:
     """Downgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    pass
-    # ### end Alembic commands ###
+    op.drop_table('user_reviews', if_exists=True)
+    op.drop_table('locations', if_exists=True)
+    op.drop_table('species', if_exists=True)
@@ -0,0 +1,82 @@
+# app/api/Export.py
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from app.core.config import settings
+from app.schemas.Export import ExportDetailResponse, ExportListResponse
+from app.services.snapshot_export import manifest_files, snapshot_exporter, tar_stream
+
+bearer = HTTPBearer(auto_error=False)
+
+
+def require_export_token(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer)):
+    """Snapshots hold every review; only callers with EXPORT_TOKEN may read them."""
+    if not settings.EXPORT_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Exports are disabled (EXPORT_TOKEN is not set)")
+    if credentials is None or not hmac.compare_digest(credentials.credentials.encode(), settings.EXPORT_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid export token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+router = APIRouter(prefix="/exports", tags=["exports"], dependencies=[Depends(require_export_token)])
+
+LATEST = "latest"
+# a finished snapshot never changes; private, since every request is authenticated
+IMMUTABLE = "private, max-age=31536000, immutable"
+
+
+def resolve(snapshotId: str) -> tuple[str, dict]:
+    """Directory and manifest of a finished snapshot ("latest" for the newest one), or 404."""
+    if snapshotId == LATEST:
+        ids = snapshot_exporter.snapshot_ids()
+        snapshotId = ids[-1] if ids else ""
+    manifest = snapshot_exporter.manifest(snapshotId) if snapshotId else None
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return snapshot_exporter.snapshot_dir(snapshotId), manifest
+
+
+def cache_headers(snapshotId: str) -> dict:
+    return {} if snapshotId == LATEST else {"Cache-Control": IMMUTABLE}
+
+
+@router.get("/", response_model=ExportListResponse)
+def list_exports():
+    ids = snapshot_exporter.snapshot_ids()
+    return {"success": True, "data": [snapshot_exporter.manifest(i) for i in ids]}
+
+
+@router.get("/{snapshotId}", response_model=ExportDetailResponse)
+def get_export(snapshotId: str):
+    return {"success": True, "data": resolve(snapshotId)[1]}
+
+
+@router.get("/{snapshotId}/download")
+def download_export(snapshotId: str):
+    """
+    The whole snapshot as an uncompressed tar (Parquet / Arrow files are already
+    compressed), streamed file by file from disk.
+    """
+    root, manifest = resolve(snapshotId)
+    size, body = tar_stream(root, manifest["snapshotId"], manifest_files(manifest))
+    headers = {
+        "Content-Length": str(size),
+        "Content-Disposition": f'attachment; filename="{manifest["snapshotId"]}.tar"',
+        **cache_headers(snapshotId),
+    }
+    return StreamingResponse(body, media_type="application/x-tar", headers=headers)
+
+
+@router.get("/{snapshotId}/files/{path:path}")
+def get_export_file(snapshotId: str, path: str):
+    """One file of a snapshot, by its manifest path; supports Range requests."""
+    root, manifest = resolve(snapshotId)
+    if path not in manifest_files(manifest):
+        raise HTTPException(status_code=404, detail="File not found")
+    return FileResponse(f"{root}/{path}", headers=cache_headers(snapshotId))
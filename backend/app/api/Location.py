@@ -1,54 +1,476 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+import hashlib
+from typing import Optional
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.deps import get_db
+from app.db.deps import async_index_rows, get_async_db, get_db, index_rows
 from app.models.Location import Location
-from app.schemas.Location import LocationCreate, LocationOut, LocationsResponse
+from app.schemas.Location import LocationClustersResponse, LocationCreate, LocationOut, LocationsResponse
+from app.services import bulk_load
+from app.core.config import settings
+from app.services.bloom_calendar import bloom_months, range_months
+from app.services.bloom_tiles import TileKey, bloom_tiles, month_mask
+from app.services.fast_json import LOCATION_COLUMNS, locations_body
+from app.services.location_clusters import cluster_index, viewport_features
+from app.services.response_cache import response_cache
+from app.services.spatial_index import location_index
+from app.services.species_search import species_suggest
 
 router = APIRouter(prefix="/locations", tags=["locations"])
+async_router = APIRouter(prefix="/locations", tags=["locations"])
 
-@router.get("/all", response_model=LocationsResponse)
-def get_all_locations(db: Session = Depends(get_db)):
-    data = db.query(Location).all()
-    locations = []
-    for loc in data:
-        locations.append({
-            "id": loc.id,
-            "speciesId": loc.speciesId,
-            "locationName": loc.locationName,
-            "coordinates": [loc.latitude, loc.longitude],
-            "bloomingPeriod": loc.bloomingPeriod
-        })
-    return LocationsResponse(success=True, data=locations)
 
-@router.get("/{speciesId}", response_model=LocationsResponse)
-def get_locations_by_species_id(speciesId: int, db: Session = Depends(get_db)):
-    locations = db.query(Location).filter(Location.speciesId == speciesId).all()
-    if not locations:
-        raise HTTPException(status_code=404, detail="No locations found for the given speciesId")
-    #     peak: string
-    #     end: string
-    # }
-    return LocationsResponse(success=True, data=locations)
+def duplicate_location(exc: IntegrityError) -> HTTPException:
+    """409 for a location that already exists (same species, name and coordinates); re-raises anything else."""
+    if "ux_locations_natural_key" not in str(exc.orig):
+        raise exc
+    return HTTPException(status_code=409, detail="A location with this species, name and coordinates already exists")
 
-@router.get("/{speciesId}", response_model=LocationsResponse)
-def get_locations_by_species_id(speciesId: int, db: Session = Depends(get_db)):
-    locations = db.query(Location).filter(Location.speciesId == speciesId).all()
-    if not locations:
-        raise HTTPException(status_code=404, detail="No locations found for the given speciesId")
-    return LocationsResponse(success=True, locations=locations)
 
-@router.post("/", response_model=LocationOut)
-def create_location(location: LocationCreate, db: Session = Depends(get_db)):
-    db_location = Location(
+def location_to_dict(loc: Location) -> dict:
+    return {
+        "id": loc.id,
+        "speciesId": loc.speciesId,
+        "locationName": loc.locationName,
+        "coordinates": [loc.latitude, loc.longitude],
+        "bloomingPeriod": loc.bloomingPeriod
+    }
+
+
+def new_location(location: LocationCreate) -> Location:
+    return Location(
         speciesId=location.speciesId,
         locationName=location.locationName,
         latitude=location.coordinates[0],
         longitude=location.coordinates[1],
-        bloomingPeriod=location.bloomingPeriod
+        bloomingPeriod=location.bloomingPeriod,
+        bloomMonths=bloom_months(location.bloomingPeriod),
     )
+
+
+INDEX_COLUMNS = (Location.id, Location.speciesId, Location.latitude, Location.longitude)
+MAX_SPATIAL_RESULTS = 5000
+
+
+def by_ids(ids: list[int]):
+    return select(*LOCATION_COLUMNS).where(Location.id.in_(ids))
+
+
+def blooming_query(months: list[int], speciesId: Optional[int], any_month: bool):
+    """Served by the GIN index on bloomMonths: @> for a single month, && for a range."""
+    months_col = Location.bloomMonths
+    stmt = select(*LOCATION_COLUMNS).where(
+        months_col.overlap(months) if any_month else months_col.contains(months)
+    )
+    if speciesId is not None:
+        stmt = stmt.where(Location.speciesId == speciesId)
+    return stmt.order_by(Location.id)
+
+
+def blooming_range(start: date, end: date) -> list[int]:
+    try:
+        return range_months(start, end)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+TILE_COLUMNS = (Location.latitude, Location.longitude, Location.speciesId, Location.bloomMonths)
+
+
+def tile_key(speciesId: Optional[int], month: Optional[int], start: Optional[date], end: Optional[date]) -> TileKey:
+    if month is not None and (start or end):
+        raise HTTPException(status_code=422, detail="Use either month or start/end")
+    if (start is None) != (end is None):
+        raise HTTPException(status_code=422, detail="start and end must be given together")
+    months = [month] if month is not None else blooming_range(start, end) if start else []
+    return TileKey(speciesId, month_mask(months))
+
+
+def check_tile(z: int, x: int, y: int):
+    if z > settings.BLOOM_TILE_MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+        raise HTTPException(status_code=404, detail="Tile out of range")
+
+
+def check_tile_species(species_id: int):
+    # unknown ids would otherwise each grow their own branch of the tile pyramid
+    if not bloom_tiles.has_species(species_id):
+        raise HTTPException(status_code=404, detail="No locations found for the given speciesId")
+
+
+def load_tile_points(db: Session):
+    version = bloom_tiles.version_to_load()
+    if version is not None:
+        bloom_tiles.load(index_rows(db, select(*TILE_COLUMNS)), version)
+
+
+async def load_tile_points_async(db: AsyncSession):
+    version = bloom_tiles.version_to_load()
+    if version is not None:
+        rows = await async_index_rows(db, select(*TILE_COLUMNS))
+        await run_in_threadpool(bloom_tiles.load, rows, version)
+
+
+def tile_response(request: Request, data: bytes) -> Response:
+    etag = '"%s"' % hashlib.blake2b(data, digest_size=12).hexdigest()
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={settings.BLOOM_TILE_MAX_AGE}"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if "*" in tags or etag in tags:
+            return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type="image/png", headers=headers)
+
+
+def parse_bbox(bbox: str) -> tuple[float, float, float, float]:
+    """"minLon,minLat,maxLon,maxLat" (map extent order) -> (minLat, minLon, maxLat, maxLon)."""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="bbox must be minLon,minLat,maxLon,maxLat")
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= 180 and -180 <= max_lon <= 180):
+        raise HTTPException(status_code=422, detail="bbox out of range or minLat > maxLat")
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def load_cluster_indexes(rows):
+    """Both indexes are built from the same INDEX_COLUMNS rows; high zooms read the spatial index."""
+    if cluster_index.needs_load():
+        cluster_index.load(rows)
+    if location_index.needs_load():
+        location_index.load(rows)
+
+
+def clusters_body(zoom: int, data: list[dict]) -> Response:
+    return Response(content=orjson.dumps({"success": True, "zoom": zoom, "data": data}), media_type="application/json")
+
+
+def ordered_body(rows, ids: list[int]) -> Response:
+    """Encode rows fetched by primary key in the order the index returned them."""
+    by_id = {row.id: row for row in rows}
+    return Response(content=locations_body(by_id[i] for i in ids if i in by_id), media_type="application/json")
+
+
+@router.get("/all", response_model=LocationsResponse)
+def get_all_locations(request: Request, db: Session = Depends(get_db)):
+    cached = response_cache.lookup(request, "locations", "all")
+    if cached is not None:
+        return cached
+    # column tuples straight to JSON bytes; no ORM objects or per-row validation
+    rows = db.execute(select(*LOCATION_COLUMNS)).all()
+    return response_cache.store_body(request, "locations", "all", locations_body(rows))
+
+@router.get("/nearby", response_model=LocationsResponse)
+def get_nearby_locations(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: float = Query(..., gt=0, description="Search radius in meters"),
+    speciesId: Optional[int] = None,
+    limit: int = Query(500, ge=1, le=MAX_SPATIAL_RESULTS),
+    db: Session = Depends(get_db),
+):
+    """Locations within `radius` meters of (lat, lon), nearest first."""
+    if location_index.needs_load():
+        location_index.load(index_rows(db, select(*INDEX_COLUMNS)))
+    ids = [i for i, _ in location_index.nearby(lat, lon, radius, speciesId, limit)]
+    rows = db.execute(by_ids(ids)).all() if ids else []
+    return ordered_body(rows, ids)
+
+@router.get("/bbox", response_model=LocationsResponse)
+def get_locations_in_bbox(
+    minLat: float = Query(..., ge=-90, le=90),
+    minLon: float = Query(..., ge=-180, le=180),
+    maxLat: float = Query(..., ge=-90, le=90),
+    maxLon: float = Query(..., ge=-180, le=180),
+    speciesId: Optional[int] = None,
+    limit: int = Query(500, ge=1, le=MAX_SPATIAL_RESULTS),
+    db: Session = Depends(get_db),
+):
+    """Locations inside the box; minLon > maxLon means the box crosses the antimeridian."""
+    if minLat > maxLat:
+        raise HTTPException(status_code=422, detail="minLat must not exceed maxLat")
+    if location_index.needs_load():
+        location_index.load(index_rows(db, select(*INDEX_COLUMNS)))
+    ids = location_index.bbox(minLat, minLon, maxLat, maxLon, speciesId, limit)
+    rows = db.execute(by_ids(ids)).all() if ids else []
+    return ordered_body(rows, ids)
+
+@router.get("/clusters", response_model=LocationClustersResponse)
+def get_location_clusters(
+    zoom: int = Query(..., ge=0, le=22),
+    bbox: str = Query(..., description="minLon,minLat,maxLon,maxLat; minLon > maxLon crosses the antimeridian"),
+    speciesId: Optional[int] = None,
+    limit: int = Query(MAX_SPATIAL_RESULTS, ge=1, le=MAX_SPATIAL_RESULTS),
+    db: Session = Depends(get_db),
+):
+    """
+    Location clusters (centroid and count) visible in `bbox` at map zoom `zoom`.
+    Single locations come back unclustered, as do all points above CLUSTER_MAX_ZOOM.
+    """
+    min_lat, min_lon, max_lat, max_lon = parse_bbox(bbox)
+    if cluster_index.needs_load() or location_index.needs_load():
+        load_cluster_indexes(index_rows(db, select(*INDEX_COLUMNS)))
+    data = viewport_features(cluster_index, location_index, zoom, min_lat, min_lon, max_lat, max_lon, speciesId, limit)
+    return clusters_body(zoom, data)
+
+@router.get("/blooming", response_model=LocationsResponse)
+def get_blooming_locations(
+    request: Request,
+    month: int = Query(..., ge=1, le=12),
+    speciesId: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """Locations whose blooming period includes `month` (periods may wrap the new year)."""
+    key = ("blooming", month, speciesId)
+    cached = response_cache.lookup(request, "locations", key)
+    if cached is not None:
+        return cached
+    rows = db.execute(blooming_query([month], speciesId, any_month=False)).all()
+    return response_cache.store_body(request, "locations", key, locations_body(rows))
+
+@router.get("/blooming/range", response_model=LocationsResponse)
+def get_blooming_locations_in_range(
+    request: Request,
+    start: date,
+    end: date,
+    speciesId: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """Locations blooming at any point between `start` and `end` (inclusive, month granularity)."""
+    months = blooming_range(start, end)
+    key = ("blooming", tuple(months), speciesId)
+    cached = response_cache.lookup(request, "locations", key)
+    if cached is not None:
+        return cached
+    rows = db.execute(blooming_query(months, speciesId, any_month=True)).all()
+    return response_cache.store_body(request, "locations", key, locations_body(rows))
+
+@router.get("/tiles/{z}/{x}/{y}.png", response_class=Response)
+def get_bloom_tile(
+    request: Request,
+    z: int = Path(..., ge=0),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    speciesId: Optional[int] = None,
+    month: Optional[int] = Query(None, ge=1, le=12),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Bloom density XYZ tile (256 px PNG) for one species or all, optionally limited to
+    a month or a date window. Served from the on-disk tile pyramid when possible.
+    """
+    check_tile(z, x, y)
+    key = tile_key(speciesId, month, start, end)
+    if speciesId is not None:
+        load_tile_points(db)
+        check_tile_species(speciesId)
+    data = bloom_tiles.cached(key, z, x, y)
+    if data is None:
+        load_tile_points(db)
+        data = bloom_tiles.render(key, z, x, y)
+    return tile_response(request, data)
+
+@router.get("/{speciesId}", response_model=LocationsResponse)
+def get_locations_by_species_id(speciesId: int, request: Request, db: Session = Depends(get_db)):
+    cached = response_cache.lookup(request, "locations", speciesId)
+    if cached is not None:
+        return cached
+    rows = db.execute(select(*LOCATION_COLUMNS).where(Location.speciesId == speciesId)).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="No locations found for the given speciesId")
+    return response_cache.store_body(request, "locations", speciesId, locations_body(rows))
+
+@router.post("/", response_model=LocationOut)
+def create_location(location: LocationCreate, db: Session = Depends(get_db)):
+    db_location = new_location(location)
     db.add(db_location)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        raise duplicate_location(exc)
     db.refresh(db_location)
-    # convert to LocationOut format
-    db_location.coordinates = [db_location.latitude, db_location.longitude]
-    return db_location
\ No newline at end of file
+    location_index.add(db_location.id, db_location.speciesId, db_location.latitude, db_location.longitude)
+    cluster_index.add(db_location.id, db_location.speciesId, db_location.latitude, db_location.longitude)
+    bloom_tiles.location_added(db_location.latitude, db_location.longitude, db_location.speciesId, db_location.bloomMonths)
+    response_cache.invalidate("locations")
+    response_cache.discard("species_full", db_location.speciesId)
+    return location_to_dict(db_location)
+
+@router.post("/bulk")
+async def bulk_load_locations(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv or ndjson; defaults from Content-Type"),
+    blooms: bool = Query(False, description="Body uses the blooms.csv layout (id, lat, lon, date, species, location, radius)"),
+    batchSize: int = Query(bulk_load.DEFAULT_BATCH_SIZE, ge=1, le=100_000),
+):
+    """
+    Load locations from a CSV or NDJSON request body. Rows carrying an `id` are upserted on it,
+    the others on (speciesId, locationName, latitude, longitude), so reloading a file is idempotent.
+    Returns row counts, per-row validation errors and rows/second.
+    """
+    kind = "blooms" if blooms else "locations"
+    try:
+        return await bulk_load.load_request_body(request, kind, format, batchSize)
+    finally:
+        # batches before a failure are committed, so invalidate either way
+        location_index.invalidate()
+        cluster_index.invalidate()
+        bloom_tiles.invalidate()
+        response_cache.invalidate("locations")
+        response_cache.invalidate("species_full")
+        if blooms:
+            species_suggest.invalidate()
+            response_cache.invalidate("species")
+
+
+# -----------------------
+# Async variants (DB_MODE=async)
+# -----------------------
+
+@async_router.get("/all", response_model=LocationsResponse)
+async def get_all_locations_async(request: Request, db: AsyncSession = Depends(get_async_db)):
+    cached = response_cache.lookup(request, "locations", "all")
+    if cached is not None:
+        return cached
+    rows = (await db.execute(select(*LOCATION_COLUMNS))).all()
+    return response_cache.store_body(request, "locations", "all", locations_body(rows))
+
+@async_router.get("/nearby", response_model=LocationsResponse)
+async def get_nearby_locations_async(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: float = Query(..., gt=0, description="Search radius in meters"),
+    speciesId: Optional[int] = None,
+    limit: int = Query(500, ge=1, le=MAX_SPATIAL_RESULTS),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if location_index.needs_load():
+        location_index.load(await async_index_rows(db, select(*INDEX_COLUMNS)))
+    ids = [i for i, _ in location_index.nearby(lat, lon, radius, speciesId, limit)]
+    rows = (await db.execute(by_ids(ids))).all() if ids else []
+    return ordered_body(rows, ids)
+
+@async_router.get("/bbox", response_model=LocationsResponse)
+async def get_locations_in_bbox_async(
+    minLat: float = Query(..., ge=-90, le=90),
+    minLon: float = Query(..., ge=-180, le=180),
+    maxLat: float = Query(..., ge=-90, le=90),
+    maxLon: float = Query(..., ge=-180, le=180),
+    speciesId: Optional[int] = None,
+    limit: int = Query(500, ge=1, le=MAX_SPATIAL_RESULTS),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if minLat > maxLat:
+        raise HTTPException(status_code=422, detail="minLat must not exceed maxLat")
+    if location_index.needs_load():
+        location_index.load(await async_index_rows(db, select(*INDEX_COLUMNS)))
+    ids = location_index.bbox(minLat, minLon, maxLat, maxLon, speciesId, limit)
+    rows = (await db.execute(by_ids(ids))).all() if ids else []
+    return ordered_body(rows, ids)
+
+@async_router.get("/clusters", response_model=LocationClustersResponse)
+async def get_location_clusters_async(
+    zoom: int = Query(..., ge=0, le=22),
+    bbox: str = Query(..., description="minLon,minLat,maxLon,maxLat; minLon > maxLon crosses the antimeridian"),
+    speciesId: Optional[int] = None,
+    limit: int = Query(MAX_SPATIAL_RESULTS, ge=1, le=MAX_SPATIAL_RESULTS),
+    db: AsyncSession = Depends(get_async_db),
+):
+    min_lat, min_lon, max_lat, max_lon = parse_bbox(bbox)
+    if cluster_index.needs_load() or location_index.needs_load():
+        rows = await async_index_rows(db, select(*INDEX_COLUMNS))
+        await run_in_threadpool(load_cluster_indexes, rows)
+    data = viewport_features(cluster_index, location_index, zoom, min_lat, min_lon, max_lat, max_lon, speciesId, limit)
+    return clusters_body(zoom, data)
+
+@async_router.get("/blooming", response_model=LocationsResponse)
+async def get_blooming_locations_async(
+    request: Request,
+    month: int = Query(..., ge=1, le=12),
+    speciesId: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    key = ("blooming", month, speciesId)
+    cached = response_cache.lookup(request, "locations", key)
+    if cached is not None:
+        return cached
+    rows = (await db.execute(blooming_query([month], speciesId, any_month=False))).all()
+    return response_cache.store_body(request, "locations", key, locations_body(rows))
+
+@async_router.get("/blooming/range", response_model=LocationsResponse)
+async def get_blooming_locations_in_range_async(
+    request: Request,
+    start: date,
+    end: date,
+    speciesId: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    months = blooming_range(start, end)
+    key = ("blooming", tuple(months), speciesId)
+    cached = response_cache.lookup(request, "locations", key)
+    if cached is not None:
+        return cached
+    rows = (await db.execute(blooming_query(months, speciesId, any_month=True))).all()
+    return response_cache.store_body(request, "locations", key, locations_body(rows))
+
+@async_router.get("/tiles/{z}/{x}/{y}.png", response_class=Response)
+async def get_bloom_tile_async(
+    request: Request,
+    z: int = Path(..., ge=0),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    speciesId: Optional[int] = None,
+    month: Optional[int] = Query(None, ge=1, le=12),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    check_tile(z, x, y)
+    key = tile_key(speciesId, month, start, end)
+    if speciesId is not None:
+        await load_tile_points_async(db)
+        check_tile_species(speciesId)
+    data = await run_in_threadpool(bloom_tiles.cached, key, z, x, y)
+    if data is None:
+        await load_tile_points_async(db)
+        # rasterizing and PNG encoding are CPU-bound; keep them off the event loop
+        data = await run_in_threadpool(bloom_tiles.render, key, z, x, y)
+    return tile_response(request, data)
+
+@async_router.get("/{speciesId}", response_model=LocationsResponse)
+async def get_locations_by_species_id_async(speciesId: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    cached = response_cache.lookup(request, "locations", speciesId)
+    if cached is not None:
+        return cached
+    rows = (await db.execute(select(*LOCATION_COLUMNS).where(Location.speciesId == speciesId))).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="No locations found for the given speciesId")
+    return response_cache.store_body(request, "locations", speciesId, locations_body(rows))
+
+@async_router.post("/", response_model=LocationOut)
+async def create_location_async(location: LocationCreate, db: AsyncSession = Depends(get_async_db)):
+    db_location = new_location(location)
+    db.add(db_location)
+    try:
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        raise duplicate_location(exc)
+    await db.refresh(db_location)
+    location_index.add(db_location.id, db_location.speciesId, db_location.latitude, db_location.longitude)
+    cluster_index.add(db_location.id, db_location.speciesId, db_location.latitude, db_location.longitude)
+    bloom_tiles.location_added(db_location.latitude, db_location.longitude, db_location.speciesId, db_location.bloomMonths)
+    response_cache.invalidate("locations")
+    response_cache.discard("species_full", db_location.speciesId)
+    return location_to_dict(db_location)
+
+# bulk loading runs the COPY pipeline on the threadpool in both modes
+async_router.add_api_route("/bulk", bulk_load_locations, methods=["POST"])
@@ -0,0 +1,56 @@
+# app/api/Media.py
+import os
+import stat as stat_module
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+from app.services.image_store import IMAGE_TYPES, MEDIA_PREFIX, TMP_DIR, image_store
+
+router = APIRouter(prefix=MEDIA_PREFIX, tags=["media"])
+
+# stored files never change once written (content-addressed or uuid-named)
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _etag(path: str, stat: os.stat_result) -> str:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if len(stem) == 64 or stem.endswith(("_thumb", "_web")):
+        # content hash (or derivative of one) is already a strong validator
+        return f'"{stem}"'
+    return f'"{stat.st_ino:x}-{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+
+@router.get("/{path:path}")
+async def get_media(path: str, request: Request):
+    """
+    Serve review images and their derivatives with immutable caching.
+    Range requests are handled by FileResponse, which uses the server's
+    zero-copy `pathsend` extension when available. Only regular files with an
+    image extension are served, always as that image type and never sniffed,
+    so an uploaded document can't be rendered as a page on the API's origin.
+    """
+    root = os.path.realpath(image_store.root)
+    full = os.path.realpath(os.path.join(root, path))
+    in_progress = full.endswith(".part") or os.path.relpath(full, root).split(os.sep)[0] == TMP_DIR
+    media_type = IMAGE_TYPES.get(os.path.splitext(full)[1].lower())
+    if not full.startswith(root + os.sep) or in_progress or media_type is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    try:
+        stat = os.stat(full)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not stat_module.S_ISREG(stat.st_mode):
+        raise HTTPException(status_code=404, detail="Not found")
+
+    etag = _etag(full, stat)
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE, "X-Content-Type-Options": "nosniff"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if "*" in tags or etag in tags:
+            return Response(status_code=304, headers=headers)
+    return FileResponse(
+        full, stat_result=stat, headers=headers, media_type=media_type,
+        filename=os.path.basename(full), content_disposition_type="inline",
+    )
@@ -1,22 +1,97 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.deps import get_db
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, raiseload, selectinload
+from app.db.deps import async_index_rows, get_async_db, get_db, index_rows
 from app.models.Specie import Specie
-from app.schemas.Specie import SpecieCreate, SpecieOut, SpeciesDetailResponse, SpeciesListResponse
+from app.schemas.Specie import (
+    SpecieCreate,
+    SpecieOut,
+    SpeciesDetailResponse,
+    SpeciesFullResponse,
+    SpeciesListResponse,
+    SpeciesSuggestResponse,
+)
+from app.services import bulk_load
+from app.services.fast_json import SPECIES_COLUMNS, envelope, species_body, species_full_body
+from app.services.response_cache import response_cache
+from app.services.review_stats import species_stats_query
+from app.services.species_search import SUGGEST_COLUMNS, search_query, species_suggest
+from app.services.text_fold import words
 
 router = APIRouter(prefix="/species", tags=["species"])
+async_router = APIRouter(prefix="/species", tags=["species"])
+
+
+def full_query(speciesId: int):
+    # locations in one extra query; anything else lazy-loaded would be an N+1, so it raises
+    return select(Specie).where(Specie.speciesId == speciesId).options(
+        selectinload(Specie.locations).raiseload("*"), raiseload("*"),
+    )
+
 
 @router.get("/all", response_model=SpeciesListResponse)
-def get_all_species(db: Session = Depends(get_db)):
-    species = db.query(Specie).all()
-    return SpeciesListResponse(success=True, data=species)
+def get_all_species(request: Request, db: Session = Depends(get_db)):
+    cached = response_cache.lookup(request, "species", "all")
+    if cached is not None:
+        return cached
+    # column tuples straight to JSON bytes; no ORM objects or per-row validation
+    rows = db.execute(select(*SPECIES_COLUMNS)).all()
+    return response_cache.store_body(request, "species", "all", species_body(rows))
+
+@router.get("/search", response_model=SpeciesListResponse)
+def search_species(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    """Ranked full-text search over names, color, habitat, characteristics and description; accents are ignored."""
+    key = ("search", " ".join(words(q)), limit)
+    cached = response_cache.lookup(request, "species", key)
+    if cached is not None:
+        return cached
+    stmt = search_query(q, limit)
+    rows = db.execute(stmt).all() if stmt is not None else []
+    return response_cache.store_body(request, "species", key, species_body(rows))
+
+@router.get("/suggest", response_model=SpeciesSuggestResponse)
+def suggest_species(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+):
+    """Typeahead on species names from the in-memory prefix index."""
+    if species_suggest.needs_load():
+        species_suggest.load(index_rows(db, select(*SUGGEST_COLUMNS)))
+    return Response(content=envelope(species_suggest.suggest(prefix, limit)), media_type="application/json")
 
 @router.get("/{speciesId}", response_model=SpeciesDetailResponse)
-def get_specie_by_id(speciesId: int, db: Session = Depends(get_db)):
+def get_specie_by_id(speciesId: int, request: Request, db: Session = Depends(get_db)):
+    cached = response_cache.lookup(request, "species", speciesId)
+    if cached is not None:
+        return cached
     specie = db.query(Specie).filter(Specie.speciesId == speciesId).first()
     if not specie:
         raise HTTPException(status_code=404, detail="Specie not found")
-    return SpeciesDetailResponse(success=True, data=specie)
+    return response_cache.store(request, "species", speciesId, SpeciesDetailResponse(success=True, data=specie))
+
+@router.get("/{speciesId}/full", response_model=SpeciesFullResponse)
+def get_specie_full(speciesId: int, request: Request, db: Session = Depends(get_db)):
+    """
+    The species, its locations (with bloomingPeriod) and each location's rating summary.
+    Three queries whatever the location count: species, locations (selectin), grouped stats.
+    """
+    cached = response_cache.lookup(request, "species_full", speciesId)
+    if cached is not None:
+        return cached
+    specie = db.scalar(full_query(speciesId))
+    if not specie:
+        raise HTTPException(status_code=404, detail="Specie not found")
+    stats = db.execute(species_stats_query(speciesId)).all()
+    return response_cache.store_body(request, "species_full", speciesId, species_full_body(specie, stats))
 
 @router.post("/", response_model=SpecieOut)
 def create_specie(specie: SpecieCreate, db: Session = Depends(get_db)):
@@ -24,4 +99,96 @@ def create_specie(specie: SpecieCreate, db: Session = Depends(get_db)):
     db.add(db_specie)
     db.commit()
     db.refresh(db_specie)
+    species_suggest.add(db_specie.speciesId, db_specie.name, db_specie.scientificName)
+    response_cache.invalidate("species")
+    return db_specie
+
+@router.post("/bulk")
+async def bulk_load_species(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv or ndjson; defaults from Content-Type"),
+    batchSize: int = Query(bulk_load.DEFAULT_BATCH_SIZE, ge=1, le=100_000),
+):
+    """
+    Upsert species (keyed by speciesId) from a CSV or NDJSON request body.
+    Returns row counts, per-row validation errors and rows/second.
+    """
+    try:
+        return await bulk_load.load_request_body(request, "species", format, batchSize)
+    finally:
+        # batches before a failure are committed, so invalidate either way
+        species_suggest.invalidate()
+        response_cache.invalidate("species")
+        response_cache.invalidate("species_full")
+
+
+# -----------------------
+# Async variants (DB_MODE=async)
+# -----------------------
+
+@async_router.get("/all", response_model=SpeciesListResponse)
+async def get_all_species_async(request: Request, db: AsyncSession = Depends(get_async_db)):
+    cached = response_cache.lookup(request, "species", "all")
+    if cached is not None:
+        return cached
+    rows = (await db.execute(select(*SPECIES_COLUMNS))).all()
+    return response_cache.store_body(request, "species", "all", species_body(rows))
+
+@async_router.get("/search", response_model=SpeciesListResponse)
+async def search_species_async(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+):
+    key = ("search", " ".join(words(q)), limit)
+    cached = response_cache.lookup(request, "species", key)
+    if cached is not None:
+        return cached
+    stmt = search_query(q, limit)
+    rows = (await db.execute(stmt)).all() if stmt is not None else []
+    return response_cache.store_body(request, "species", key, species_body(rows))
+
+@async_router.get("/suggest", response_model=SpeciesSuggestResponse)
+async def suggest_species_async(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if species_suggest.needs_load():
+        species_suggest.load(await async_index_rows(db, select(*SUGGEST_COLUMNS)))
+    return Response(content=envelope(species_suggest.suggest(prefix, limit)), media_type="application/json")
+
+@async_router.get("/{speciesId}", response_model=SpeciesDetailResponse)
+async def get_specie_by_id_async(speciesId: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    cached = response_cache.lookup(request, "species", speciesId)
+    if cached is not None:
+        return cached
+    specie = await db.scalar(select(Specie).where(Specie.speciesId == speciesId).limit(1))
+    if not specie:
+        raise HTTPException(status_code=404, detail="Specie not found")
+    return response_cache.store(request, "species", speciesId, SpeciesDetailResponse(success=True, data=specie))
+
+@async_router.get("/{speciesId}/full", response_model=SpeciesFullResponse)
+async def get_specie_full_async(speciesId: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    cached = response_cache.lookup(request, "species_full", speciesId)
+    if cached is not None:
+        return cached
+    specie = await db.scalar(full_query(speciesId))
+    if not specie:
+        raise HTTPException(status_code=404, detail="Specie not found")
+    stats = (await db.execute(species_stats_query(speciesId))).all()
+    return response_cache.store_body(request, "species_full", speciesId, species_full_body(specie, stats))
+
+@async_router.post("/", response_model=SpecieOut)
+async def create_specie_async(specie: SpecieCreate, db: AsyncSession = Depends(get_async_db)):
+    db_specie = Specie(**specie.model_dump())
+    db.add(db_specie)
+    await db.commit()
+    await db.refresh(db_specie)
+    species_suggest.add(db_specie.speciesId, db_specie.name, db_specie.scientificName)
+    response_cache.invalidate("species")
     return db_specie
+
+# bulk loading runs the COPY pipeline on the threadpool in both modes
+async_router.add_api_route("/bulk", bulk_load_species, methods=["POST"])
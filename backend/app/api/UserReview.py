@@ -1,29 +1,49 @@
 # app/api/UserReview.py
+import base64
+import json
 import os
 import uuid
 from datetime import datetime
 from typing import List, Optional, Union
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
-from fastapi.responses import JSONResponse
-from sqlalchemy import func
+import orjson
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.deps import get_db
+from app.core.config import settings
+from app.db import session as db_session
+from app.db.deps import async_index_rows, get_async_db, get_db, index_rows
 from app.models.UserReview import UserReview as UserReviewModel
 from app.schemas.Review import (
     ReviewImageOut,
     ReviewImageCreate,
     UserReviewCreate,
     UserReviewOut,
+    UserReviewPage,
 )
+from app.api.Location import INDEX_COLUMNS, parse_bbox
+from app.services.fast_json import REVIEW_COLUMNS, review_line, reviews_body
+from app.services.image_store import IMAGE_TYPES, ImageStore, ImageTooLarge, add_ref_stmt, image_store
+from app.services.response_cache import response_cache
+from app.services.review_stats import batch_stats_query, increment_stmt, stats_lookup, stats_to_dict
+from app.services.review_writer import QUEUED, review_writer
+from app.services.spatial_index import location_index
+from app.services.thumbnails import thumbnail_worker
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/reviews", tags=["reviews"])
+async_router = APIRouter(prefix="/reviews", tags=["reviews"])
 
-# upload directory (ensure exists)
-UPLOAD_DIR = os.environ.get("REVIEWS_UPLOAD_DIR", "uploads/reviews")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+MAX_PAGE_SIZE = 200
+MAX_STATS_BATCH = 1000
+STREAM_BATCH_SIZE = 500
+
+# metadata keys used while saving that are not persisted on the review
+PRIVATE_IMAGE_KEYS = ("local_path", "blob")
 
 
 # Simple response schema for endpoints
@@ -36,37 +56,170 @@ class ReviewResponse(BaseModel):
 # -----------------------
 # Helpers
 # -----------------------
-def save_upload_file(file: UploadFile, upload_dir: str = UPLOAD_DIR) -> dict:
+def _image_ext(filename: Optional[str], content_type: Optional[str] = None) -> Optional[str]:
+    """Stored extension: the filename's if it is a served image type, else one for content_type."""
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext in IMAGE_TYPES:
+        return ext
+    return next((e for e, t in IMAGE_TYPES.items() if t == content_type), None)
+
+
+def save_upload_file(file: UploadFile, store: ImageStore = image_store, max_bytes: Optional[int] = None) -> dict:
     """
-    Save uploaded file to disk and return metadata dict:
-    { id, url, thumbnailUrl, originalName, uploadedAt (ISO), size }
+    Stream an uploaded file into the content-addressed image store and return metadata dict:
+    { id, url, thumbnailUrl, originalName, uploadedAt (ISO), size, sha256 }
+    Identical content is stored once; the caller must add the blob reference (add_ref_stmt)
+    in the review transaction. Blocking I/O: call from the threadpool.
     Note: url/thumbnailUrl here are local paths; replace with real CDN URL in production.
     """
-    ext = os.path.splitext(file.filename)[1]
-    file_id = str(uuid.uuid4())
-    filename = f"{file_id}{ext}"
-    dest_path = os.path.join(upload_dir, filename)
-    with open(dest_path, "wb") as f:
-        contents = file.file.read()
-        f.write(contents)
+    max_bytes = max_bytes or settings.REVIEW_IMAGE_MAX_BYTES
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"{file.filename}: image exceeds {max_bytes} bytes")
+    try:
+        blob = store.put(file.file, _image_ext(file.filename, file.content_type), max_bytes)
+    except ImageTooLarge:
+        raise HTTPException(status_code=413, detail=f"{file.filename}: image exceeds {max_bytes} bytes")
 
     uploaded_at = datetime.utcnow().isoformat() + "Z"
-    size = len(contents)
-    # For demo we use file path as url. Replace with your public URL.
-    url = f"/{upload_dir}/{filename}"
-    thumbnail_url = url  # placeholder; generate thumbnail if you want
+    url = store.url_for(blob.path)
 
     return {
-        "id": file_id,
+        "id": str(uuid.uuid4()),
         "url": url,
-        "thumbnailUrl": thumbnail_url,
+        "thumbnailUrl": url,  # replaced by the thumbnail worker once derivatives exist
         "originalName": file.filename,
         "uploadedAt": uploaded_at,
-        "size": size,
-        "local_path": dest_path,
+        "size": blob.size,
+        "sha256": blob.sha256,
+        "local_path": store.abspath(blob.path),
+        "blob": blob,
     }
 
 
+def save_review_images(files: Optional[List[UploadFile]]) -> list[dict]:
+    """
+    Validate and store every uploaded image. Blobs written for a request that later
+    fails stay unreferenced and are collected by `image_store gc`.
+    """
+    files = [f for f in files or [] if f.filename]
+    if len(files) > settings.REVIEW_MAX_IMAGES:
+        raise HTTPException(status_code=400, detail=f"At most {settings.REVIEW_MAX_IMAGES} images per review")
+    for f in files:
+        if f.content_type and not f.content_type.startswith("image/"):
+            raise HTTPException(status_code=415, detail=f"{f.filename}: not an image")
+        if _image_ext(f.filename, f.content_type) is None:
+            raise HTTPException(status_code=415, detail=f"{f.filename}: only JPEG, PNG, WebP and GIF images are accepted")
+    saved = [save_upload_file(f) for f in files]
+    return thumbnail_worker.mark_pending(saved)
+
+
+def image_ref_stmts(saved: list[dict]) -> list:
+    return [add_ref_stmt(meta["blob"]) for meta in saved]
+
+
+def images_json(saved: list[dict]) -> Optional[str]:
+    if not saved:
+        return None
+    return json.dumps([{k: v for k, v in meta.items() if k not in PRIVATE_IMAGE_KEYS} for meta in saved])
+
+
+def reviews_query(speciesId: int, locationId: int, *columns):
+    """Reviews of one species/location; pass columns to select plain row tuples instead of ORM objects."""
+    return select(*(columns or (UserReviewModel,))).where(
+        UserReviewModel.speciesId == speciesId,
+        UserReviewModel.locationId == locationId
+    )
+
+
+def encode_cursor(review: UserReviewModel) -> str:
+    raw = f"{review.timestamp.isoformat()}|{review.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, review_id = raw.split("|", 1)
+        return datetime.fromisoformat(ts), review_id
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def newest_first(stmt):
+    return stmt.order_by(UserReviewModel.timestamp.desc(), UserReviewModel.id.desc())
+
+
+def page_query(speciesId: int, locationId: int, limit: int, cursor: Optional[str]):
+    """Keyset page on (timestamp, id) descending; fetches one extra row to detect a next page."""
+    stmt = reviews_query(speciesId, locationId)
+    if cursor:
+        ts, review_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(UserReviewModel.timestamp, UserReviewModel.id) < (ts, review_id))
+    return newest_first(stmt).limit(limit + 1)
+
+
+def build_page(rows, limit: int) -> UserReviewPage:
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return UserReviewPage(
+        data=[UserReviewOut.model_validate(r) for r in rows],
+        nextCursor=encode_cursor(rows[-1]) if has_more else None,
+    )
+
+
+def new_review(speciesId: int, locationId: int, rating: int, comment: str, userName: str,
+               images: Optional[str] = None) -> UserReviewModel:
+    return UserReviewModel(
+        id=str(uuid.uuid4()),
+        speciesId=speciesId,
+        locationId=locationId,
+        userName=userName,
+        rating=rating,
+        comment=comment,
+        timestamp=datetime.utcnow(),
+        images=images,
+    )
+
+
+def parse_pairs(pairs: str) -> list[tuple[int, int]]:
+    """"1:43,1:44" -> [(1, 43), (1, 44)], duplicates dropped."""
+    try:
+        parsed = [tuple(int(v) for v in pair.split(":")) for pair in pairs.split(",") if pair.strip()]
+    except ValueError:
+        parsed = None
+    if not parsed or any(len(p) != 2 for p in parsed):
+        raise HTTPException(status_code=422, detail="pairs must look like speciesId:locationId,speciesId:locationId")
+    if len(parsed) > MAX_STATS_BATCH:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_STATS_BATCH} pairs per request")
+    return list(dict.fromkeys(parsed))
+
+
+def check_stats_batch(pairs: Optional[str], bbox: Optional[str]):
+    if (pairs is None) == (bbox is None):
+        raise HTTPException(status_code=422, detail="Pass either pairs or bbox")
+
+
+def bbox_pairs(bbox: str, speciesId: Optional[int], limit: int) -> list[tuple[int, int]]:
+    """(speciesId, locationId) of the locations in the box, from the in-memory spatial index."""
+    ids, species, _, _ = location_index.bbox_arrays(*parse_bbox(bbox), speciesId)
+    return list(zip(species[:limit].tolist(), ids[:limit].tolist()))
+
+
+def batch_stats_body(pairs: list[tuple[int, int]], rows) -> Response:
+    """Map of locationId -> summary; requested locations without reviews get the empty summary."""
+    data = {location_id: stats_to_dict(None) for _, location_id in pairs}
+    data.update((row.locationId, stats_to_dict(row)) for row in rows)
+    # ratingDistribution and the map itself have int keys
+    body = orjson.dumps({"success": True, "data": data, "message": None}, option=orjson.OPT_NON_STR_KEYS)
+    return Response(content=body, media_type="application/json")
+
+
+def accepted(response: Response, review: UserReviewModel) -> ReviewResponse:
+    """Write-behind with REVIEW_ACK=queued: buffered, not yet committed."""
+    response.status_code = status.HTTP_202_ACCEPTED
+    return ReviewResponse(success=True, data=UserReviewOut.model_validate(review), message="Review accepted")
+
+
 # -----------------------
 # Routes
 # -----------------------
@@ -74,80 +227,84 @@ def save_upload_file(file: UploadFile, upload_dir: str = UPLOAD_DIR) -> dict:
 @router.get("/all", response_model=List[UserReviewOut])
 def get_all_reviews(speciesId: int, locationId: int, db: Session = Depends(get_db)):
     """
-    Return all reviews. Consider adding pagination in real app.
+    Return all reviews. Use /reviews/page or /reviews/stream for large locations.
     """
-    reviews = db.query(UserReviewModel).filter(
-        UserReviewModel.speciesId == speciesId,
-        UserReviewModel.locationId == locationId
-    ).all()
-    # Pydantic v2 conversion: UserReviewOut.model_validate(...) OR if model_config {"from_attributes": True} is set, direct conversion might work.
-    # Use explicit conversion to be safe:
-    out = [UserReviewOut.model_validate(r) for r in reviews]
-    return out
+    # column tuples encoded straight to JSON (same shape as List[UserReviewOut])
+    rows = db.execute(reviews_query(speciesId, locationId, *REVIEW_COLUMNS)).all()
+    return Response(content=reviews_body(rows), media_type="application/json")
+
+
+@router.get("/page", response_model=UserReviewPage)
+def get_reviews_page(
+    speciesId: int,
+    locationId: int,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Cursor-paginated reviews, newest first. Pass the returned nextCursor to get the following page.
+    """
+    rows = db.scalars(page_query(speciesId, locationId, limit, cursor)).all()
+    return build_page(rows, limit)
+
+
+@router.get("/stream")
+def stream_reviews(speciesId: int, locationId: int):
+    """
+    All reviews as NDJSON (one UserReviewOut per line), newest first, read through a server-side cursor.
+    """
+    stmt = newest_first(reviews_query(speciesId, locationId, *REVIEW_COLUMNS))
+    stmt = stmt.execution_options(yield_per=STREAM_BATCH_SIZE)
+
+    def generate():
+        # own session: the response body outlives the request's dependencies
+        with db_session.SessionLocal() as db:
+            for row in db.execute(stmt):
+                yield review_line(row)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 
 @router.get("/stats")
 def get_review_stats(speciesId: int, locationId: int, db: Session = Depends(get_db)):
     """
-    speciesId can be 'null' (string) to indicate no filter on species.
-    locationId should be integer or 'null'.
     Returns: averageRating, totalReviews, ratingDistribution {5..1}
+    Served from the review_stats summary maintained by submit_review.
     """
-    # parse path params
-    sp_id: Optional[int] = None
-    loc_id: Optional[int] = None
-    if speciesId is not None:
-        sp_id = speciesId
-    if locationId is not None:
-        loc_id = locationId
-
-    q = db.query(UserReviewModel).with_entities(
-        func.avg(UserReviewModel.rating).label("avg_rating"),
-        func.count(UserReviewModel.id).label("total"),
-    )
-
-    if sp_id is not None:
-        q = q.filter(UserReviewModel.speciesId == sp_id)
-    if loc_id is not None:
-        q = q.filter(UserReviewModel.locationId == loc_id)
-
-    stats_row = q.one()
-    avg_rating = float(stats_row.avg_rating) if stats_row.avg_rating is not None else 0.0
-    total_reviews = int(stats_row.total)
-
-    # rating distribution
-    dist_q = db.query(UserReviewModel.rating, func.count(UserReviewModel.id).label("count"))
-    if sp_id is not None:
-        dist_q = dist_q.filter(UserReviewModel.speciesId == sp_id)
-    if loc_id is not None:
-        dist_q = dist_q.filter(UserReviewModel.locationId == loc_id)
-    dist_q = dist_q.group_by(UserReviewModel.rating)
-    rows = dist_q.all()
-    # build distribution dict for 5..1
-    distribution = {5: 0, 4: 0, 3: 0, 2: 0, 1: 0}
-    for rating, cnt in rows:
-        # rating may be None / unexpected; guard
-        try:
-            r = int(rating)
-            if r in distribution:
-                distribution[r] = cnt
-        except Exception:
-            continue
+    return stats_to_dict(db.scalars(stats_lookup(speciesId, locationId)).first())
 
-    return {
-        "averageRating": round(avg_rating, 2),
-        "totalReviews": total_reviews,
-        "ratingDistribution": distribution,
-    }
+@router.get("/stats/batch")
+def get_review_stats_batch(
+    pairs: Optional[str] = Query(None, description="speciesId:locationId pairs, comma separated"),
+    bbox: Optional[str] = Query(None, description="minLon,minLat,maxLon,maxLat; every location inside"),
+    speciesId: Optional[int] = Query(None, description="with bbox: only this species' locations"),
+    limit: int = Query(MAX_STATS_BATCH, ge=1, le=MAX_STATS_BATCH),
+    db: Session = Depends(get_db),
+):
+    """
+    Rating summaries for many locations at once, keyed by locationId, from one grouped
+    query: either explicit (speciesId, locationId) pairs or all locations in a bbox.
+    """
+    check_stats_batch(pairs, bbox)
+    if pairs is not None:
+        wanted = parse_pairs(pairs)
+    else:
+        if location_index.needs_load():
+            location_index.load(index_rows(db, select(*INDEX_COLUMNS)))
+        wanted = bbox_pairs(bbox, speciesId, limit)
+    rows = db.execute(batch_stats_query(wanted)).all() if wanted else []
+    return batch_stats_body(wanted, rows)
 
 @router.post("/submit", response_model=ReviewResponse)
 def submit_review(
+    response: Response,
     speciesId: int = Form(...),
     locationId: int = Form(...),
     rating: int = Form(..., ge=1, le=5),
     comment: str = Form(...),
     userName: str = Form(...),
-    images: Optional[UploadFile] = File(None),
+    images: Optional[List[UploadFile]] = File(None),
     db: Session = Depends(get_db),
 ):
     """
@@ -157,21 +314,23 @@ def submit_review(
     """
     # validate species/location exist? (optional)
     # You may want to check species and location existence here.
-    # Create review
-    review_id = str(uuid.uuid4())
+    saved = save_review_images(images)
+    review = new_review(speciesId, locationId, rating, comment, userName, images_json(saved))
 
-
-    review = UserReviewModel(
-        id=review_id,
-        speciesId=speciesId,
-        locationId=locationId,
-        userName=userName,
-        rating=rating,
-        comment=comment,
-    )
+    if review_writer.enabled:
+        future = review_writer.submit(review, saved)
+        if review_writer.ack == QUEUED:
+            return accepted(response, review)
+        review_writer.wait(future)
+        return ReviewResponse(success=True, data=UserReviewOut.model_validate(review), message="Review submitted")
 
     db.add(review)
+    db.execute(increment_stmt(speciesId, locationId, [rating]))
+    for stmt in image_ref_stmts(saved):
+        db.execute(stmt)
     db.commit()
+    response_cache.discard("species_full", speciesId)
+    thumbnail_worker.enqueue(review.id, saved)
     review_out = UserReviewOut.model_validate(review)
     return ReviewResponse(success=True, data=review_out, message="Review submitted")
 
@@ -185,3 +344,101 @@ def get_review_by_id(review_id: str, db: Session = Depends(get_db)):
     if not review:
         return ReviewResponse(success=False, data=None, message="Review not found")
     return ReviewResponse(success=True, data=UserReviewOut.model_validate(review))
+
+
+# -----------------------
+# Async variants (DB_MODE=async)
+# -----------------------
+
+@async_router.get("/all", response_model=List[UserReviewOut])
+async def get_all_reviews_async(speciesId: int, locationId: int, db: AsyncSession = Depends(get_async_db)):
+    rows = (await db.execute(reviews_query(speciesId, locationId, *REVIEW_COLUMNS))).all()
+    return Response(content=reviews_body(rows), media_type="application/json")
+
+
+@async_router.get("/page", response_model=UserReviewPage)
+async def get_reviews_page_async(
+    speciesId: int,
+    locationId: int,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    rows = (await db.scalars(page_query(speciesId, locationId, limit, cursor))).all()
+    return build_page(rows, limit)
+
+
+@async_router.get("/stream")
+async def stream_reviews_async(speciesId: int, locationId: int):
+    stmt = newest_first(reviews_query(speciesId, locationId, *REVIEW_COLUMNS))
+    stmt = stmt.execution_options(yield_per=STREAM_BATCH_SIZE)
+
+    async def generate():
+        async with db_session.AsyncSessionLocal() as db:
+            async for row in await db.stream(stmt):
+                yield review_line(row)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@async_router.get("/stats")
+async def get_review_stats_async(speciesId: int, locationId: int, db: AsyncSession = Depends(get_async_db)):
+    return stats_to_dict((await db.scalars(stats_lookup(speciesId, locationId))).first())
+
+
+@async_router.get("/stats/batch")
+async def get_review_stats_batch_async(
+    pairs: Optional[str] = Query(None, description="speciesId:locationId pairs, comma separated"),
+    bbox: Optional[str] = Query(None, description="minLon,minLat,maxLon,maxLat; every location inside"),
+    speciesId: Optional[int] = Query(None, description="with bbox: only this species' locations"),
+    limit: int = Query(MAX_STATS_BATCH, ge=1, le=MAX_STATS_BATCH),
+    db: AsyncSession = Depends(get_async_db),
+):
+    check_stats_batch(pairs, bbox)
+    if pairs is not None:
+        wanted = parse_pairs(pairs)
+    else:
+        if location_index.needs_load():
+            location_index.load(await async_index_rows(db, select(*INDEX_COLUMNS)))
+        wanted = bbox_pairs(bbox, speciesId, limit)
+    rows = (await db.execute(batch_stats_query(wanted))).all() if wanted else []
+    return batch_stats_body(wanted, rows)
+
+
+@async_router.post("/submit", response_model=ReviewResponse)
+async def submit_review_async(
+    response: Response,
+    speciesId: int = Form(...),
+    locationId: int = Form(...),
+    rating: int = Form(..., ge=1, le=5),
+    comment: str = Form(...),
+    userName: str = Form(...),
+    images: Optional[List[UploadFile]] = File(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # file copies and hashing stay off the event loop
+    saved = await run_in_threadpool(save_review_images, images)
+    review = new_review(speciesId, locationId, rating, comment, userName, images_json(saved))
+    if review_writer.enabled:
+        future = await review_writer.submit_async(review, saved)
+        if review_writer.ack == QUEUED:
+            return accepted(response, review)
+        await review_writer.wait_async(future)
+        return ReviewResponse(success=True, data=UserReviewOut.model_validate(review), message="Review submitted")
+    db.add(review)
+    await db.execute(increment_stmt(speciesId, locationId, [rating]))
+    for stmt in image_ref_stmts(saved):
+        await db.execute(stmt)
+    await db.commit()
+    response_cache.discard("species_full", speciesId)
+    thumbnail_worker.enqueue(review.id, saved)
+    review_out = UserReviewOut.model_validate(review)
+    return ReviewResponse(success=True, data=review_out, message="Review submitted")
+
+
+@async_router.get("/{review_id}", response_model=ReviewResponse)
+async def get_review_by_id_async(review_id: str, db: AsyncSession = Depends(get_async_db)):
+    review = await db.get(UserReviewModel, review_id)
+    if not review:
+        return ReviewResponse(success=False, data=None, message="Review not found")
+    return ReviewResponse(success=True, data=UserReviewOut.model_validate(review))
@@ -6,11 +6,143 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "change_this_in_production"
     ALGORITHM: str = "HS256"
     DATABASE_URL: str = "postgresql://postgres:postgres@db:5432/postgres"
+    # async driver URL; derived from DATABASE_URL (postgresql+asyncpg) when unset
+    ASYNC_DATABASE_URL: str | None = None
+
+    # "sync" runs handlers on the threadpool with Session,
+    # "async" uses AsyncSession on the event loop
+    DB_MODE: str = "sync"
+    # also mount both variants under /api/sync/v1 and /api/async/v1 for benchmarking
+    DB_MOUNT_BOTH: bool = False
+
+    # Connection pool (one engine per process, shared by all routers)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # log a warning when a request waits longer than this for a connection
+    DB_POOL_SLOW_CHECKOUT_MS: float = 100.0
+
+    # Read replicas (comma-separated URLs, same pool settings as the primary).
+    # GET/HEAD requests read from a replica picked by DB_REPLICA_POLICY
+    # ("round_robin" or "least_connections"); writes, and a client's reads for
+    # DB_READ_YOUR_WRITES_SECONDS after its last write, use DATABASE_URL
+    DATABASE_REPLICA_URLS: str = ""
+    DB_REPLICA_POLICY: str = "round_robin"
+    DB_READ_YOUR_WRITES_SECONDS: float = 5.0
+    # a replica that fails to connect, or lags more than DB_REPLICA_MAX_LAG_SECONDS
+    # at a health check, is left out for DB_REPLICA_RETRY_SECONDS
+    DB_REPLICA_CHECK_SECONDS: float = 5.0
+    DB_REPLICA_MAX_LAG_SECONDS: float = 10.0
+    DB_REPLICA_RETRY_SECONDS: float = 30.0
+
+    # In-process grid index behind /locations/nearby and /locations/bbox
+    SPATIAL_CELL_DEG: float = 0.05
+    SPATIAL_INDEX_TTL: float = 300.0
+
+    # /locations/clusters: cell size in screen pixels (power of two), zooms kept
+    # precomputed in memory, and the zoom above which points are no longer clustered
+    CLUSTER_CELL_PX: int = 64
+    CLUSTER_PRECOMPUTED_MAX_ZOOM: int = 10
+    CLUSTER_MAX_ZOOM: int = 16
+
+    # In-memory typeahead index behind /species/suggest
+    SPECIES_INDEX_TTL: float = 300.0
+
+    # Bloom density XYZ tiles: kernel radius and on-disk pyramid cache
+    BLOOM_TILE_RADIUS_M: float = 5000.0
+    BLOOM_TILE_MAX_ZOOM: int = 16
+    BLOOM_TILE_CACHE_DIR: str = "cache/tiles"
+    # tiles a worker writes into one pyramid version before starting a new generation (0: unbounded)
+    BLOOM_TILE_CACHE_MAX_TILES: int = 50_000
+    # pyramid versions kept on disk; a cached tile is reused across up to this many inserts
+    BLOOM_TILE_CACHE_KEEP_VERSIONS: int = 32
+    # browser / CDN caching of tiles; the server-side pyramid is invalidated on new locations
+    BLOOM_TILE_MAX_AGE: int = 300
+
+    # Pre-serialized reference-data responses (/species, /locations)
+    RESPONSE_CACHE_TTL: float = 300.0
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Review image uploads
+    REVIEW_IMAGE_MAX_BYTES: int = 25 * 1024 * 1024
+    REVIEW_MAX_IMAGES: int = 10
+    # Background thumbnail / web derivative generation (process pool)
+    THUMBNAILS_ENABLED: bool = True
+    THUMBNAIL_WORKERS: int = 2
+    THUMBNAIL_SIZE: int = 320
+    WEB_IMAGE_SIZE: int = 1600
+    # a queued image is re-queued by resume_pending once its claim is this old
+    THUMBNAIL_CLAIM_SECONDS: float = 600.0
+
+    # Write-behind batching for /reviews/submit; off commits one transaction per review
+    REVIEW_WRITE_BEHIND: bool = False
+    REVIEW_FLUSH_MS: float = 20.0
+    REVIEW_FLUSH_ROWS: int = 500
+    # "commit": respond once the review's batch is committed; "queued": respond 202 once buffered
+    REVIEW_ACK: str = "commit"
+    # backpressure: buffered reviews, and how long a submission waits for room before 503
+    REVIEW_QUEUE_MAX: int = 10_000
+    REVIEW_QUEUE_TIMEOUT_MS: float = 1000.0
+    # with REVIEW_ACK=commit, how long a submission waits for its batch before 503
+    REVIEW_COMMIT_TIMEOUT_MS: float = 10_000.0
+    REVIEW_DRAIN_TIMEOUT: float = 30.0
+
+    # Columnar analytics snapshots (python -m app.services.snapshot_export, served at /exports)
+    EXPORT_DIR: str = "exports"
+    # "parquet" or "arrow" (Arrow IPC files)
+    EXPORT_FORMAT: str = "parquet"
+    # server-side cursor batch, output row group size, and total rows buffered across partitions
+    EXPORT_BATCH_ROWS: int = 10_000
+    EXPORT_ROW_GROUP_ROWS: int = 100_000
+    EXPORT_MAX_BUFFERED_ROWS: int = 500_000
+    # incremental exports stop this far behind the clock so in-flight reviews are not skipped
+    EXPORT_WATERMARK_LAG_SECONDS: float = 60.0
+    # bearer token required by every /exports request; unset disables the routes
+    EXPORT_TOKEN: str = ""
+
+    # Request / SQL instrumentation exposed at /metrics (Prometheus text format)
+    METRICS_ENABLED: bool = True
+    # log requests slower than this with their SQL statements; 0 disables
+    SLOW_REQUEST_MS: float = 0.0
+    SLOW_REQUEST_MAX_STATEMENTS: int = 20
+
+    # Skip Base.metadata.create_all on startup when the database is already at the
+    # alembic head (entrypoint.sh runs `alembic upgrade head` before the workers start)
+    FAST_BOOT: bool = True
 
     BACKEND_PORT: int = 8000
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # verified token -> user cache used by get_current_user (entries also end at the token's exp)
+    TOKEN_CACHE_TTL: float = 60.0
+    TOKEN_CACHE_MAX_ENTRIES: int = 10_000
+    # bcrypt runs on its own bounded thread pool; excess concurrent requests get 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
     
     model_config = ConfigDict(env_file=".env", extra="ignore")
 
-settings = Settings()
\ No newline at end of file
+    @staticmethod
+    def _async_url(url: str) -> str:
+        scheme, _, rest = url.partition("://")
+        return f"postgresql+asyncpg://{rest}" if scheme.startswith("postgres") else url
+
+    @property
+    def async_database_url(self) -> str:
+        return self.ASYNC_DATABASE_URL or self._async_url(self.DATABASE_URL)
+
+    @property
+    def replica_urls(self) -> list[str]:
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+    @property
+    def async_replica_urls(self) -> list[str]:
+        return [self._async_url(url) for url in self.replica_urls]
+
+    @property
+    def async_enabled(self) -> bool:
+        return self.DB_MODE == "async" or self.DB_MOUNT_BOTH
+
+settings = Settings()
@@ -1,32 +1,101 @@
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Callable
+
+from cachetools import TLRUCache
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.db.deps import get_db
-from app.models.user import User
+
+if TYPE_CHECKING:
+    from app.models.user import User
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+
+# -----------------------
+# Password hashing (bounded executor)
+# -----------------------
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool so hashing never blocks the event
+    loop or occupies the request threadpool. bcrypt releases the GIL, so threads are
+    enough. At most max_pending jobs are accepted; beyond that callers get 503
+    instead of queueing behind a login burst.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent password operations, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._submit(pwd_context.verify, plain_password, hashed_password).result()
+
+    def hash(self, password: str) -> str:
+        return self._submit(pwd_context.hash, password).result()
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(self._submit(pwd_context.verify, plain_password, hashed_password))
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(pwd_context.hash, password))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
+
+
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await password_hasher.verify_async(plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await password_hasher.hash_async(password)
+
 
+# -----------------------
+# Tokens
+# -----------------------
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+    to_encode.update({"exp": expire, "iat": now})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 def create_refresh_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + (expires_delta or timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
+    to_encode.update({"exp": expire, "iat": now})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -36,21 +105,157 @@ def decode_token(token: str):
         return payload
     except JWTError:
         return None
-    
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+
+
+@dataclass(frozen=True)
+class VerifiedToken:
+    user: Any            # detached User; merge() it into a session before modifying
+    user_id: int
+    issued_at: float     # epoch seconds, 0 when the token has no iat
+    expires_at: float    # time.monotonic() deadline derived from the token's exp
+
+
+class TokenCache:
+    """
+    Verified token -> user, so authenticated requests skip JWT decoding and the user
+    lookup. An entry lives for TOKEN_CACHE_TTL seconds or until the token's own exp,
+    whichever comes first.
+
+    Revocation (logout, password change, ban) goes through revoke_token/revoke_user,
+    which also reject tokens still in flight on this worker. Checks registered with
+    add_revocation_check run on every cache miss (e.g. a shared denylist), and
+    add_revocation_listener callbacks are told about local revocations so they can
+    be broadcast to other workers; the TTL bounds staleness until they arrive.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cache = TLRUCache(maxsize=maxsize, ttu=self._ttu, timer=time.monotonic)
+        self._revoked_tokens: dict[str, float] = {}   # token key -> monotonic expiry
+        self._revoked_before: dict[int, float] = {}   # user_id -> epoch seconds
+        self._checks: list[Callable[[dict], bool]] = []
+        self._listeners: list[Callable[[str, Any], None]] = []
+
+    def _ttu(self, key, value: VerifiedToken, now: float) -> float:
+        return min(now + self.ttl, value.expires_at)
+
+    @staticmethod
+    def key(token: str) -> str:
+        # don't keep raw bearer tokens in memory longer than the request
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str):
+        key = self.key(token)
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is None or self._is_revoked(key, entry.user_id, entry.issued_at):
+            return None
+        return entry
+
+    def put(self, token: str, payload: dict, user) -> VerifiedToken:
+        now_epoch, now_mono = time.time(), time.monotonic()
+        entry = VerifiedToken(
+            user=user,
+            user_id=int(payload["sub"]),
+            issued_at=float(payload.get("iat") or 0),
+            expires_at=now_mono + (float(payload["exp"]) - now_epoch) if "exp" in payload else now_mono + self.ttl,
+        )
+        with self._lock:
+            self._cache[self.key(token)] = entry
+        return entry
+
+    def accepts(self, token: str, payload: dict) -> bool:
+        """Revocation checks for a freshly decoded token (cache miss path)."""
+        if self._is_revoked(self.key(token), int(payload["sub"]), float(payload.get("iat") or 0)):
+            return False
+        return not any(check(payload) for check in self._checks)
+
+    def _is_revoked(self, key: str, user_id: int, issued_at: float) -> bool:
+        with self._lock:
+            if key in self._revoked_tokens:
+                if self._revoked_tokens[key] > time.monotonic():
+                    return True
+                del self._revoked_tokens[key]
+            cutoff = self._revoked_before.get(user_id)
+        return cutoff is not None and issued_at <= cutoff
+
+    def revoke_token(self, token: str, payload: dict | None = None):
+        payload = payload or decode_token(token) or {}
+        key = self.key(token)
+        remaining = float(payload["exp"]) - time.time() if "exp" in payload else self.ttl
+        now = time.monotonic()
+        with self._lock:
+            self._cache.pop(key, None)
+            self._revoked_tokens = {k: v for k, v in self._revoked_tokens.items() if v > now}
+            if remaining > 0:
+                self._revoked_tokens[key] = now + remaining
+        self._notify("token", key)
+
+    def revoke_user(self, user_id: int):
+        """Reject every token issued to user_id up to now (tokens without iat included)."""
+        with self._lock:
+            self._revoked_before[int(user_id)] = time.time()
+            for key in [k for k, v in self._cache.items() if v.user_id == int(user_id)]:
+                self._cache.pop(key, None)
+        self._notify("user", int(user_id))
+
+    def add_revocation_check(self, check: Callable[[dict], bool]):
+        """check(payload) -> True to reject the token."""
+        self._checks.append(check)
+
+    def add_revocation_listener(self, listener: Callable[[str, Any], None]):
+        """listener(kind, value) with kind "token" (sha256 key) or "user" (user_id)."""
+        self._listeners.append(listener)
+
+    def _notify(self, kind: str, value):
+        for listener in self._listeners:
+            listener(kind, value)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_MAX_ENTRIES, settings.TOKEN_CACHE_TTL)
+
+
+def _load_user(user_id: int):
+    from app.db.session import SessionLocal
+    from app.models.user import User
+
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.user_id == user_id).first()
+        if user is not None:
+            db.expunge(user)
+        return user
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> "User":
+    """
+    Cache hits cost one dict lookup on the event loop: no JWT decode, no session,
+    no threadpool hop. Misses decode, run revocation checks and load the user once.
+    """
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached.user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    payload = decode_token(token)
+    if payload is None or payload.get("sub") is None:
+        raise credentials_exception
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+        user_id = int(payload["sub"])
+    except (TypeError, ValueError):
+        raise credentials_exception
+    if not token_cache.accepts(token, payload):
         raise credentials_exception
-    user = db.query(User).filter(User.user_id == int(user_id)).first()
+    user = await run_in_threadpool(_load_user, user_id)
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    token_cache.put(token, payload, user)
+    return user
@@ -1,14 +1,56 @@
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
-from app.core.config import settings
+from app.db.replicas import READ_METHODS
+from app.db.session import AsyncSessionLocal, SessionLocal, replicas, write_tracker
+from app.services.metrics import mark_thread_start
 
-def get_db():
-    engine = create_engine(settings.DATABASE_URL)
-    print("URL:---------------------------", settings.DATABASE_URL)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    db = SessionLocal()
+
+def _use_replica(request: Request, response: Response):
+    """The replica to read from, or None for the primary (writes, recent writers, none healthy)."""
+    if not replicas:
+        return None
+    if request.method not in READ_METHODS:
+        write_tracker.wrote(request, response)
+        return None
+    if write_tracker.recently_wrote(request):
+        return None
+    return replicas.pick()
+
+
+def get_db(request: Request, response: Response):
+    # sync dependencies run on the threadpool; the first one marks the end of queueing
+    mark_thread_start()
+    replica = _use_replica(request, response)
+    request.state.db_replica = replica.name if replica is not None else None
+    db = (replica.SessionLocal if replica is not None else SessionLocal)()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db(request: Request, response: Response):
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database path is disabled; set DB_MODE=async or DB_MOUNT_BOTH=true")
+    replica = _use_replica(request, response)
+    request.state.db_replica = replica.name if replica is not None else None
+    async with (replica.AsyncSessionLocal if replica is not None else AsyncSessionLocal)() as db:
+        yield db
+
+
+def index_rows(db: Session, statement):
+    """Rows for rebuilding a process-wide index; read from the primary when db is on a replica,
+    which may not have replayed the write that invalidated the index yet."""
+    if not db.info.get("replica"):
+        return db.execute(statement).all()
+    with SessionLocal() as primary:
+        return primary.execute(statement).all()
+
+
+async def async_index_rows(db: AsyncSession, statement):
+    if not db.info.get("replica"):
+        return (await db.execute(statement)).all()
+    async with AsyncSessionLocal() as primary:
+        return (await primary.execute(statement)).all()
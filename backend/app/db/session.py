@@ -1,3 +1,175 @@
-from sqlalchemy.orm import declarative_base
+import logging
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+from app.db.replicas import Replica, ReplicaSet, WriteTracker
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
+
+
+class PoolStats:
+    """
+    Running totals of how long callers waited to check a connection out of the pool.
+    Read with snapshot(); used to size DB_POOL_SIZE / DB_MAX_OVERFLOW.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.slow_checkouts = 0
+        self.timeouts = 0
+
+    def record(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += wait
+            if wait > self.max_wait:
+                self.max_wait = wait
+            if wait * 1000 >= settings.DB_POOL_SLOW_CHECKOUT_MS:
+                self.slow_checkouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            avg = self.total_wait / self.checkouts if self.checkouts else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "avgWaitMs": round(avg * 1000, 3),
+                "maxWaitMs": round(self.max_wait * 1000, 3),
+                "slowCheckouts": self.slow_checkouts,
+                "timeouts": self.timeouts,
+            }
+
+
+pool_stats = PoolStats()
+
+
+class _TimedCheckoutMixin:
+    """Measures the time spent waiting for a free connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            pool_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        wait = time.perf_counter() - start
+        pool_stats.record(wait)
+        metrics.observe_checkout(wait)
+        if wait * 1000 >= settings.DB_POOL_SLOW_CHECKOUT_MS:
+            logger.warning(
+                "Slow pool checkout: waited %.1f ms (%s)", wait * 1000, self.status()
+            )
+        return conn
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_kwargs() -> dict:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+engine = create_engine(settings.DATABASE_URL, poolclass=TimedQueuePool, **_pool_kwargs())
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if settings.METRICS_ENABLED:
+    metrics.instrument_engine(engine)
+
+# Async engine is only built when the async path is enabled so the sync-only
+# deployment does not need the asyncpg driver installed.
+async_engine = None
+AsyncSessionLocal = None
+if settings.async_enabled:
+    async_engine = create_async_engine(
+        settings.async_database_url, poolclass=TimedAsyncQueuePool, **_pool_kwargs()
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    if settings.METRICS_ENABLED:
+        metrics.instrument_engine(async_engine.sync_engine)
+
+
+def _replica(url: str, async_url: str) -> Replica:
+    replica_engine = create_engine(url, poolclass=TimedQueuePool, **_pool_kwargs())
+    replica_async_engine = None
+    if settings.async_enabled:
+        replica_async_engine = create_async_engine(async_url, poolclass=TimedAsyncQueuePool, **_pool_kwargs())
+    if settings.METRICS_ENABLED:
+        metrics.instrument_engine(replica_engine)
+        if replica_async_engine is not None:
+            metrics.instrument_engine(replica_async_engine.sync_engine)
+    return Replica(replica_engine, replica_async_engine)
+
+
+# Read replicas; empty unless DATABASE_REPLICA_URLS is set (see app/db/replicas.py)
+replicas = ReplicaSet(
+    [_replica(url, async_url) for url, async_url in zip(settings.replica_urls, settings.async_replica_urls)],
+    policy=settings.DB_REPLICA_POLICY,
+    retry_seconds=settings.DB_REPLICA_RETRY_SECONDS,
+    check_seconds=settings.DB_REPLICA_CHECK_SECONDS,
+    max_lag_seconds=settings.DB_REPLICA_MAX_LAG_SECONDS,
+)
+write_tracker = WriteTracker(settings.DB_READ_YOUR_WRITES_SECONDS)
+
+
+def _pool_status(pool) -> dict:
+    return {
+        "size": pool.size(),
+        "checkedOut": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "checkedIn": pool.checkedin(),
+    }
+
+
+def get_pool_status() -> dict:
+    """Current pool occupancy plus accumulated checkout wait statistics."""
+    status = {**_pool_status(engine.pool), **pool_stats.snapshot()}
+    if async_engine is not None:
+        status["async"] = _pool_status(async_engine.pool)
+    if replicas:
+        health = replicas.status()
+        status["replicas"] = {
+            replica.name: {
+                **health[replica.name],
+                **_pool_status(replica.engine.pool),
+                **({"async": _pool_status(replica.async_engine.pool)} if replica.async_engine is not None else {}),
+            }
+            for replica in replicas.replicas
+        }
+    return status
+
+
+async def dispose_engines():
+    replicas.stop()
+    engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
+    for replica in replicas.replicas:
+        replica.engine.dispose()
+        if replica.async_engine is not None:
+            await replica.async_engine.dispose()
@@ -0,0 +1,18 @@
+# app/models/image_blob.py
+from datetime import datetime
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String
+from app.db.session import Base
+
+
+class ImageBlob(Base):
+    """
+    One stored image file in the content-addressed store, keyed by SHA-256.
+    refCount is the number of review images pointing at it.
+    """
+    __tablename__ = "image_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String, nullable=False)  # relative to the store root, e.g. "ab/cd/<sha256>.jpg"
+    size = Column(BigInteger, nullable=False)
+    refCount = Column(Integer, nullable=False, default=0)
+    createdAt = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Float, ForeignKey, Integer, String
+from sqlalchemy import Column, Float, ForeignKey, Index, Integer, String
 from app.db.session import Base
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import relationship
 
 
@@ -20,5 +20,16 @@ class Location(Base):
 
     # Blooming period lưu JSON {"start": "...", "peak": "...", "end": "..."}
     bloomingPeriod = Column(JSONB, nullable=True)
-
-    species = relationship("Specie", back_populates="locations")
\ No newline at end of file
+    # months (1-12) covered by bloomingPeriod, see app.services.bloom_calendar
+    bloomMonths = Column(ARRAY(Integer), nullable=True)
+
+    species = relationship("Specie", back_populates="locations")
+
+    __table_args__ = (
+        # /locations/{speciesId}; id keeps the per-species rows in primary-key order
+        Index("ix_locations_speciesId_id", speciesId, id),
+        # /locations/blooming: bloomMonths @> / && month arrays
+        Index("ix_locations_bloomMonths", bloomMonths, postgresql_using="gin"),
+        # natural key: bulk loads of rows without an id upsert on it
+        Index("ux_locations_natural_key", speciesId, locationName, latitude, longitude, unique=True),
+    )
@@ -0,0 +1,23 @@
+# app/models/review_stats.py
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer
+from app.db.session import Base
+
+
+class ReviewStats(Base):
+    """
+    Running rating summary per (speciesId, locationId), maintained by submit_review
+    in the same transaction as the review insert.
+    """
+    __tablename__ = "review_stats"
+
+    speciesId = Column(Integer, ForeignKey("species.speciesId", ondelete="CASCADE"), primary_key=True)
+    locationId = Column(Integer, ForeignKey("locations.id", ondelete="CASCADE"), primary_key=True)
+
+    count1 = Column(Integer, nullable=False, default=0)
+    count2 = Column(Integer, nullable=False, default=0)
+    count3 = Column(Integer, nullable=False, default=0)
+    count4 = Column(Integer, nullable=False, default=0)
+    count5 = Column(Integer, nullable=False, default=0)
+
+    ratingSum = Column(BigInteger, nullable=False, default=0)
+    totalReviews = Column(Integer, nullable=False, default=0)
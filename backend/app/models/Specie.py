@@ -1,6 +1,22 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Computed, Index, Integer, String
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from app.db.session import Base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
+from app.services.text_fold import fold_sql
+
+
+def _weighted(weight: str, *columns: str) -> str:
+    text = " || ' ' || ".join(f"coalesce({c}, '')" for c in columns)
+    return f"setweight(to_tsvector('simple'::regconfig, {fold_sql(text)}), '{weight}')"
+
+
+# names rank above color/habitat/characteristics, which rank above the description
+SEARCH_VECTOR_SQL = " || ".join((
+    _weighted("A", "name", '"scientificName"'),
+    _weighted("B", "color", "habitat", "characteristics"),
+    _weighted("C", "description"),
+))
+
 
 class Specie(Base):
     __tablename__ = "species"
@@ -14,5 +30,12 @@ class Specie(Base):
     color = Column(String, nullable=True)
     habitat = Column(String, nullable=True)
     characteristics = Column(String, nullable=True)
+    # accent-folded full-text document for /species/search, maintained by Postgres
+    searchVector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True)))
     
-    locations = relationship("Location", back_populates="species", cascade="all, delete-orphan")
+    locations = relationship("Location", back_populates="species", cascade="all, delete-orphan",
+                             order_by="Location.id")
+
+    __table_args__ = (
+        Index("ix_species_searchVector", "searchVector", postgresql_using="gin"),
+    )
@@ -1,5 +1,5 @@
 # app/models/user_review.py
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, BigInteger
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, BigInteger, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.session import Base
@@ -18,4 +18,13 @@ class UserReview(Base):
 
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
 
-    images = Column(String, nullable=True) 
+    images = Column(String, nullable=True)
+
+    __table_args__ = (
+        # /reviews/all, /reviews/page (keyset on timestamp, id) and /reviews/stream
+        Index("ix_user_reviews_species_location_ts", speciesId, locationId, timestamp.desc(), id.desc()),
+        # global newest-first scans and incremental exports by timestamp
+        Index("ix_user_reviews_timestamp_id", timestamp, id),
+        # thumbnail_worker.resume_pending; only reviews with images still being rendered
+        Index("ix_user_reviews_pending_images", id, postgresql_where=images.like('%"status": "pending"%')),
+    )
@@ -1,3 +1,5 @@
 from .Specie import Specie
 from .Location import Location
-from .UserReview import UserReview
\ No newline at end of file
+from .UserReview import UserReview
+from .ReviewStats import ReviewStats
+from .ImageBlob import ImageBlob
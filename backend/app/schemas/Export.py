@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class ExportTable(BaseModel):
+    rows: int
+    files: list[str] = Field(..., description="Paths relative to the snapshot, for /exports/{snapshotId}/files/...")
+    partitions: int | None = None
+
+class ExportManifest(BaseModel):
+    snapshotId: str
+    format: str = Field(..., description="parquet or arrow")
+    incremental: bool = Field(..., description="Reviews only since the previous snapshot's watermark")
+    since: datetime | None = None
+    watermark: datetime = Field(..., description="Reviews with timestamp up to this are included")
+    createdAt: datetime
+    tables: dict[str, ExportTable]
+
+class ExportListResponse(BaseModel):
+    success: bool = Field(..., description="Indicates if the request was successful")
+    data: list[ExportManifest] = Field(..., description="Finished snapshots, oldest first")
+
+class ExportDetailResponse(BaseModel):
+    success: bool = Field(..., description="Indicates if the request was successful")
+    data: ExportManifest
@@ -41,3 +41,16 @@ class LocationsResponse(BaseModel):
     
     model_config = {"from_attributes": True}
 
+
+class LocationCluster(BaseModel):
+    id: Optional[int] = Field(None, description="Location id when the feature is a single location")
+    cluster: bool
+    count: int
+    coordinates: list[float] = Field(..., description="Latitude and longitude (centroid for clusters)")
+    speciesId: Optional[int] = None
+
+
+class LocationClustersResponse(BaseModel):
+    success: bool
+    zoom: int
+    data: list[LocationCluster]
@@ -1,7 +1,9 @@
 # app/schemas/review.py
 from typing import List, Optional, Dict
 from datetime import datetime
-from pydantic import BaseModel, Field
+import json
+
+from pydantic import BaseModel, Field, field_validator
 
 
 # -------- ReviewImage schemas --------
@@ -11,6 +13,9 @@ class ReviewImageBase(BaseModel):
     originalName: str = Field(..., example="photo.jpg")
     uploadedAt: datetime = Field(..., example="2025-10-04T08:30:00Z", description="Datetime object")
     size: int = Field(..., example=123456, description="File size in bytes")
+    sha256: Optional[str] = Field(None, description="Hex SHA-256 of the stored file")
+    webUrl: Optional[str] = Field(None, description="Web-optimized derivative, once generated")
+    status: Optional[str] = Field(None, description="Derivative job status: pending, ready or failed")
 
     model_config = {"extra": "ignore"}
 
@@ -57,8 +62,24 @@ class UserReviewUpdate(BaseModel):
 
 class UserReviewOut(UserReviewBase):
     id: str = Field(..., example="rev_uuid_or_string")
-    images: str | None = None
+    images: List[ReviewImageOut] = Field(default_factory=list)
     timestamp: datetime = Field(..., example="2025-10-04T08:30:00Z", description="Datetime object")
 
     # allow conversion from SQLAlchemy ORM objects
     model_config = {"from_attributes": True, "extra": "ignore"}
+
+    @field_validator("images", mode="before")
+    @classmethod
+    def parse_images(cls, value):
+        # stored as a JSON array in the user_reviews.images text column
+        if value is None or value == "":
+            return []
+        if isinstance(value, str):
+            return json.loads(value)
+        return value
+
+
+class UserReviewPage(BaseModel):
+    success: bool = True
+    data: List[UserReviewOut] = Field(..., description="Reviews on this page, newest first")
+    nextCursor: Optional[str] = Field(None, description="Opaque cursor for the next page; null on the last page")
@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
 
+from app.schemas.Location import LocationOut
+
 class SpecieBase(BaseModel):
     name: str
     scientificName: str
@@ -29,4 +31,29 @@ class SpeciesListResponse(BaseModel):
 class SpeciesDetailResponse(BaseModel):
     success: bool = Field(..., description="Indicates if the request was successful")
     data: SpecieOut = Field(..., description="Detailed information about the species")
-    message: str | None = Field(None, description="Optional message providing additional information")  
\ No newline at end of file
+    message: str | None = Field(None, description="Optional message providing additional information")
+
+class SpeciesSuggestion(BaseModel):
+    speciesId: int
+    name: str
+    scientificName: str
+
+class SpeciesSuggestResponse(BaseModel):
+    success: bool = Field(..., description="Indicates if the request was successful")
+    data: list[SpeciesSuggestion] = Field(..., description="Matching species, best first")
+
+class RatingSummary(BaseModel):
+    averageRating: float
+    totalReviews: int
+    ratingDistribution: dict[int, int]
+
+class SpeciesLocationOut(LocationOut):
+    rating: RatingSummary
+
+class SpecieFullOut(SpecieOut):
+    locations: list[SpeciesLocationOut]
+
+class SpeciesFullResponse(BaseModel):
+    success: bool = Field(..., description="Indicates if the request was successful")
+    data: SpecieFullOut = Field(..., description="The species, its locations and their rating summaries")
+    message: str | None = Field(None, description="Optional message providing additional information")
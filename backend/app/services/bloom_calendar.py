@@ -0,0 +1,140 @@
+# app/services/bloom_calendar.py
+"""
+Month index for Location.bloomingPeriod.
+
+bloomingPeriod is free-form JSON ({"start", "peak", "end"} as "2025-05", "2024-03-20",
+"5" or "May"). bloom_months() normalizes it to the sorted list of months (1-12) the
+location blooms in, stored in Location.bloomMonths and indexed with GIN, so
+"blooming in May" is `bloomMonths @> {5}` and a date range is `bloomMonths && {...}`.
+Periods that wrap the new year (start "2025-11", end "2026-02") cover 11, 12, 1, 2;
+dated periods of a year or more ("2025-03" to "2026-03") cover every month.
+
+Rows loaded before the column existed are filled by the alembic migration; to
+recompute everything (e.g. after changing the parser):
+
+    python -m app.services.bloom_calendar backfill
+"""
+import argparse
+import re
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models.Location import Location
+
+ALL_MONTHS = list(range(1, 13))
+MONTH_NAMES = {
+    name: i
+    for i, names in enumerate((
+        ("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"),
+        ("may",), ("jun", "june"), ("jul", "july"), ("aug", "august"),
+        ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"), ("dec", "december"),
+    ), start=1)
+    for name in names
+}
+_ISO = re.compile(r"^(\d{4})-(\d{1,2})(?:-\d{1,2})?")
+_MONTH_ONLY = re.compile(r"^(?:th[aá]ng\s*)?(\d{1,2})$", re.IGNORECASE)
+
+
+def parse_month(value) -> Optional[tuple[Optional[int], int]]:
+    """
+    (year, month) from "2025-05", "2025-05-20", "5", "Tháng 5", "May" or an int; the
+    year is None when the value has none. None if unknown.
+    """
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return (None, value) if 1 <= value <= 12 else None
+    text = str(value).strip()
+    match = _ISO.match(text)
+    if match:
+        year, month = int(match.group(1)), int(match.group(2))
+        return (year, month) if 1 <= month <= 12 else None
+    match = _MONTH_ONLY.match(text)
+    if match:
+        month = int(match.group(1))
+        return (None, month) if 1 <= month <= 12 else None
+    month = MONTH_NAMES.get(text.lower())
+    return (None, month) if month else None
+
+
+def month_span(start: int, end: int) -> list[int]:
+    """Months from start through end inclusive, wrapping past December."""
+    length = (end - start) % 12 + 1
+    return sorted((start - 1 + i) % 12 + 1 for i in range(length))
+
+
+def bloom_months(period: Optional[dict]) -> Optional[list[int]]:
+    """
+    Months covered by a bloomingPeriod. A missing start or end falls back to peak,
+    so {"peak": "2024-03-20"} is just March. When both ends carry a year, a span of
+    twelve months or more is every month. None when nothing is parseable.
+    """
+    if not isinstance(period, dict):
+        return None
+    peak = parse_month(period.get("peak"))
+    start = parse_month(period.get("start")) or peak
+    end = parse_month(period.get("end")) or peak
+    if start is None and end is None:
+        return None
+    (start_year, start_month), (end_year, end_month) = start or end, end or start
+    if start_year is not None and end_year is not None:
+        if (end_year - start_year) * 12 + end_month - start_month >= 11:
+            return ALL_MONTHS
+    return month_span(start_month, end_month)
+
+
+def range_months(start: date, end: date) -> list[int]:
+    """Months touched by the inclusive date range [start, end]; a range of a year or more is every month."""
+    if end < start:
+        raise ValueError("end must not be before start")
+    if (end.year - start.year) * 12 + end.month - start.month >= 11:
+        return ALL_MONTHS
+    return month_span(start.month, end.month)
+
+
+# -----------------------
+# Backfill
+# -----------------------
+def backfill(db: Session, batch_size: int = 5000) -> int:
+    """Recompute bloomMonths for every location. Returns the number of rows changed."""
+    changed, last_id = 0, 0
+    while True:
+        rows = db.execute(
+            select(Location.id, Location.bloomingPeriod, Location.bloomMonths)
+            .where(Location.id > last_id).order_by(Location.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return changed
+        updates = [
+            {"id": loc_id, "bloomMonths": months}
+            for loc_id, period, current in rows
+            if (months := bloom_months(period)) != current
+        ]
+        if updates:
+            db.execute(update(Location), updates)
+            changed += len(updates)
+        db.commit()
+        last_id = rows[-1].id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Location bloom-month index")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    from app.db.session import SessionLocal
+    from app.services.bloom_tiles import bloom_tiles
+
+    with SessionLocal() as db:
+        changed = backfill(db, args.batch_size)
+    if changed:
+        bloom_tiles.invalidate()
+    print(f"updated {changed} locations")
+
+
+if __name__ == "__main__":
+    main()
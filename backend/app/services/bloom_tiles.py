@@ -0,0 +1,420 @@
+# app/services/bloom_tiles.py
+"""
+Bloom density raster tiles (XYZ, Web Mercator, 256 px PNG).
+
+Locations are held in memory as normalized Mercator coordinates plus species and a
+12-bit bloom-month mask. A tile is rendered by binning the points near it into a
+padded pixel histogram and blurring it with a separable Gaussian (two matrix
+products), so the cost is independent of how many points fall in the tile. Each
+point contributes a bump of height 1 and BLOOM_TILE_RADIUS_M standard deviation;
+intensity is 1 - exp(-density), so neighbouring tiles and zoom levels share one scale.
+
+Rendered tiles are kept on disk as a pyramid:
+
+    BLOOM_TILE_CACHE_DIR/v<version>/<species|all>/<window>/<z>/<x>/<y>.png
+
+A new location bumps the version and records the point in v<version>/DIRTY.json.
+A miss in the current version walks back through the older versions to the newest
+one holding the tile and hard-links it forward, unless a point added in between
+could have changed it; so a tile nobody asked for during a run of inserts is still
+reused afterwards. Bulk loads mark the whole version dirty, which ends the walk.
+The version lives in a file, so every worker (and the CLIs) share the same pyramid
+and invalidations. Each worker's point snapshot follows the version by appending
+the points listed in the DIRTY.json files it missed; only a bulk load (or a pruned
+version) makes it reload every location.
+
+The pyramid is bounded by generations and by BLOOM_TILE_CACHE_KEEP_VERSIONS: once a
+worker has written BLOOM_TILE_CACHE_MAX_TILES tiles into the current version it
+starts a new one with nothing dirty, and versions older than the last
+BLOOM_TILE_CACHE_KEEP_VERSIONS (or than the newest bulk invalidation) are deleted.
+Pruning runs after a bulk invalidation and every KEEP_VERSIONS / 4 versions, not on
+every insert.
+"""
+import fcntl
+import io
+import json
+import math
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from cachetools import LRUCache
+
+from app.core.boot import lazy_import
+from app.core.config import settings
+from app.services.spatial_index import mercator
+
+np = lazy_import("numpy")
+
+TILE_SIZE = 256
+# meters per pixel at the equator at zoom 0
+EQUATOR_MPP = 2 * math.pi * 6_378_137 / TILE_SIZE
+MAX_SIGMA_PX = 64.0
+VERSION_CHECK_SECONDS = 1.0
+ALL = "all"
+
+# transparent -> yellow -> orange -> red, alpha rising with intensity
+COLOR_STOPS = (
+    (0.00, (255, 255, 178, 0)),
+    (0.25, (254, 204, 92, 110)),
+    (0.50, (253, 141, 60, 170)),
+    (0.75, (240, 59, 32, 210)),
+    (1.00, (189, 0, 38, 235)),
+)
+
+
+@dataclass(frozen=True)
+class TileKey:
+    species: Optional[int]
+    months: int  # 12-bit mask, 0 = no date filter
+
+    @property
+    def path(self) -> str:
+        return os.path.join(ALL if self.species is None else str(self.species), f"m{self.months:03x}")
+
+
+def month_mask(months: Optional[Iterable[int]]) -> int:
+    return sum(1 << (m - 1) for m in set(months or ()))
+
+
+# -----------------------
+# Projection and rendering
+# -----------------------
+def tile_sigma_px(z: int, y: int) -> float:
+    """Kernel standard deviation in pixels at the tile's centre latitude."""
+    n = 2 ** z
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 0.5) / n))))
+    mpp = EQUATOR_MPP * math.cos(math.radians(lat)) / n
+    return min(max(settings.BLOOM_TILE_RADIUS_M / mpp, 1.0), MAX_SIGMA_PX)
+
+
+def render_density(mx, my, z: int, x: int, y: int, sigma: float):
+    """Summed Gaussian bumps (height 1 per point) on the tile's 256x256 pixel grid."""
+    scale = TILE_SIZE * 2 ** z
+    pad = int(math.ceil(3 * sigma))
+    size = TILE_SIZE + 2 * pad
+    x0, y0 = x * TILE_SIZE - pad, y * TILE_SIZE - pad
+    px, py = mx * scale - x0, my * scale - y0
+    near = (px >= 0) & (px < size) & (py >= 0) & (py < size)
+    if not near.any():
+        return None
+    hist, _, _ = np.histogram2d(py[near], px[near], bins=size, range=[[0, size], [0, size]])
+    # separable blur: kernel[i, j] weighs padded bin j for output pixel i
+    offsets = np.arange(TILE_SIZE)[:, None] + pad - np.arange(size)[None, :]
+    kernel = np.exp(-0.5 * (offsets / sigma) ** 2)
+    return kernel @ hist @ kernel.T
+
+
+_LUT = None
+
+
+def colorize(density):
+    global _LUT
+    if _LUT is None:
+        at = np.linspace(0.0, 1.0, 256)
+        positions = [p for p, _ in COLOR_STOPS]
+        _LUT = np.stack(
+            [np.interp(at, positions, [c[ch] for _, c in COLOR_STOPS]) for ch in range(4)], axis=1
+        ).astype(np.uint8)
+    intensity = 1.0 - np.exp(-density)
+    return _LUT[(intensity * 255).astype(np.uint8)]
+
+
+def encode_png(rgba) -> bytes:
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.fromarray(rgba, "RGBA").save(buf, "PNG", compress_level=6)
+    return buf.getvalue()
+
+
+_EMPTY_PNG: Optional[bytes] = None
+
+
+def empty_tile() -> bytes:
+    global _EMPTY_PNG
+    if _EMPTY_PNG is None:
+        _EMPTY_PNG = encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), np.uint8))
+    return _EMPTY_PNG
+
+
+# -----------------------
+# Points
+# -----------------------
+class TilePoints:
+    """Location snapshot used for rendering; follows the cache version (see catch_up)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version: Optional[int] = None
+        self.mx = self.my = self.species = self.months = None
+        self.species_ids: frozenset[int] = frozenset()
+
+    def needs_load(self, version: int) -> bool:
+        return self.version != version
+
+    def load(self, rows: Iterable[tuple], version: int):
+        """rows: iterable of (latitude, longitude, speciesId, bloomMonths)."""
+        rows = list(rows)
+        lat = [r[0] for r in rows]
+        lon = [r[1] for r in rows]
+        with self._lock:
+            self.mx, self.my = mercator(lat, lon)
+            self.species = np.asarray([r[2] for r in rows], dtype=np.int64)
+            self.months = np.asarray([month_mask(r[3]) for r in rows], dtype=np.int64)
+            self.species_ids = frozenset(self.species.tolist())
+            self.version = version
+
+    def catch_up(self, cache: "TileCache", version: int) -> bool:
+        """
+        Append the points added by the versions since the snapshot was taken. False
+        when one of them invalidated everything or is gone; the caller reloads then.
+        """
+        with self._lock:
+            current = self.version
+        if current is None or current > version:
+            return False
+        added = []
+        for v in range(current + 1, version + 1):
+            points = cache.added(v)
+            if points is None:
+                return False
+            added += points
+        with self._lock:
+            if self.version != current:
+                return self.version == version
+            if added:
+                mx, my = mercator([p[0] for p in added], [p[1] for p in added])
+                species = np.asarray([p[2] for p in added], dtype=np.int64)
+                self.mx, self.my = np.concatenate([self.mx, mx]), np.concatenate([self.my, my])
+                self.species = np.concatenate([self.species, species])
+                self.months = np.concatenate([self.months, np.asarray([p[3] for p in added], dtype=np.int64)])
+                self.species_ids = self.species_ids | frozenset(species.tolist())
+            self.version = version
+        return True
+
+    def select(self, key: TileKey):
+        with self._lock:
+            mx, my, species, months = self.mx, self.my, self.species, self.months
+        keep = np.ones(len(mx), dtype=bool)
+        if key.species is not None:
+            keep &= species == key.species
+        if key.months:
+            keep &= (months & key.months) != 0
+        return mx[keep], my[keep]
+
+
+# -----------------------
+# Pyramid cache
+# -----------------------
+class TileCache:
+    def __init__(self, root: str, max_tiles: int = 0, keep_versions: int = 32):
+        self.root = root
+        self.max_tiles = max_tiles
+        self.keep_versions = max(keep_versions, 2)
+        self.prune_every = max(self.keep_versions // 4, 1)
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        # version -> dirty points as (species, month mask, mx, my), or ALL; bump writes a
+        # version's DIRTY.json before publishing it and never changes it afterwards
+        self._dirty_points = LRUCache(maxsize=4 * self.keep_versions)
+        # tiles this process wrote into the current version, for the generation cap
+        self._written = (None, 0)
+        self._count_lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+
+    def _version_file(self) -> str:
+        return os.path.join(self.root, "VERSION")
+
+    def version(self) -> int:
+        now = time.monotonic()
+        if self._version is None or now - self._checked_at > VERSION_CHECK_SECONDS:
+            try:
+                with open(self._version_file()) as f:
+                    version = int(f.read().strip() or 0)
+            except (FileNotFoundError, ValueError):
+                version = 0
+            if self._version is not None and version < self._version:
+                self._dirty_points.clear()  # the cache directory was reset
+            self._version, self._checked_at = version, now
+        return self._version
+
+    def tile_path(self, version: int, key: TileKey, z: int, x: int, y: int) -> str:
+        return os.path.join(self.root, f"v{version}", key.path, str(z), str(x), f"{y}.png")
+
+    def get(self, key: TileKey, z: int, x: int, y: int) -> Optional[bytes]:
+        version = self.version()
+        path = self.tile_path(version, key, z, x, y)
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+        # newest older version holding the tile, unless a version since then touched it
+        for older in range(version - 1, max(version - self.keep_versions, -1), -1):
+            if self._dirty(older + 1, key, z, x, y):
+                return None
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.link(self.tile_path(older, key, z, x, y), path)
+            except FileNotFoundError:
+                continue
+            except FileExistsError:
+                pass
+            except OSError:
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+        return None
+
+    def put(self, version: int, key: TileKey, z: int, x: int, y: int, data: bytes):
+        # don't write into a version that has already been superseded
+        if version != self.version():
+            return
+        path = self.tile_path(version, key, z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        if self.max_tiles > 0:
+            with self._count_lock:
+                counted, written = self._written
+                written = written + 1 if counted == version else 1
+                self._written = (version, written)
+            if written == self.max_tiles:
+                # new generation; tiles still in use are linked forward on their next hit
+                self.bump([])
+
+    def _read_dirty(self, version: int):
+        try:
+            with open(os.path.join(self.root, f"v{version}", "DIRTY.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return ALL  # previous version was not carried forward (or has been pruned)
+
+    def added(self, version: int) -> Optional[list]:
+        """Points ([lat, lon, speciesId, month mask]) version added, None if it invalidated everything."""
+        dirty = self._read_dirty(version)
+        return None if dirty == ALL else dirty
+
+    def _dirty(self, version: int, key: TileKey, z: int, x: int, y: int) -> bool:
+        dirty = self._dirty_points.get(version)
+        if dirty is None:
+            dirty = self._read_dirty(version)
+            if dirty != ALL:
+                mx, my = mercator([p[0] for p in dirty], [p[1] for p in dirty])
+                dirty = [(p[2], p[3], px, py) for p, px, py in zip(dirty, mx.tolist(), my.tolist())]
+            self._dirty_points[version] = dirty
+        if dirty == ALL:
+            return True
+        pad = 3 * tile_sigma_px(z, y) / (TILE_SIZE * 2 ** z)
+        left, top = x / 2 ** z - pad, y / 2 ** z - pad
+        right, bottom = (x + 1) / 2 ** z + pad, (y + 1) / 2 ** z + pad
+        for species, months, mx, my in dirty:
+            if key.species is not None and key.species != species:
+                continue
+            if key.months and not key.months & months:
+                continue
+            if left <= mx < right and top <= my < bottom:
+                return True
+        return False
+
+    def bump(self, points: Optional[list[tuple]] = None) -> int:
+        """
+        Start a new version. `points` ((lat, lon, speciesId, bloomMonths) tuples) lets
+        unaffected tiles carry over; None invalidates everything.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._checked_at = 0.0
+            version = self.version() + 1
+            version_dir = os.path.join(self.root, f"v{version}")
+            os.makedirs(version_dir, exist_ok=True)
+            dirty = ALL if points is None else [
+                [lat, lon, species, month_mask(months)] for lat, lon, species, months in points
+            ]
+            with open(os.path.join(version_dir, "DIRTY.json"), "w") as f:
+                json.dump(dirty, f)
+            tmp = self._version_file() + ".part"
+            with open(tmp, "w") as f:
+                f.write(str(version))
+            os.replace(tmp, self._version_file())
+            self._version, self._checked_at = version, time.monotonic()
+        if (points is None or version % self.prune_every == 0) and not self._prune_lock.locked():
+            threading.Thread(target=self._prune, daemon=True).start()
+        return version
+
+    def _prune(self):
+        # one pruner at a time; it keeps the last keep_versions versions, and none before
+        # the newest one that invalidated everything (nothing older can be linked forward)
+        if not self._prune_lock.acquire(blocking=False):
+            return
+        try:
+            latest = self.version()
+            keep_from = max(latest - self.keep_versions + 1, 0)
+            for version in range(latest, keep_from, -1):
+                if self._read_dirty(version) == ALL:
+                    keep_from = version
+                    break
+            for name in os.listdir(self.root):
+                if name.startswith("v") and name[1:].isdigit() and int(name[1:]) < keep_from:
+                    shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        finally:
+            self._prune_lock.release()
+
+
+# -----------------------
+# Service
+# -----------------------
+class BloomTiles:
+    def __init__(self, cache_dir: str, max_tiles: int = 0, keep_versions: int = 32):
+        self.cache = TileCache(cache_dir, max_tiles, keep_versions)
+        self.points = TilePoints()
+
+    def version_to_load(self) -> Optional[int]:
+        """
+        The cache version the point snapshot must be refreshed to, or None if current.
+        Read it before querying, so the rows are at least as new as the version they
+        are tagged with and tiles rendered from them are safe to persist under it.
+        """
+        version = self.cache.version()
+        if not self.points.needs_load(version) or self.points.catch_up(self.cache, version):
+            return None
+        return version
+
+    def load(self, rows: Iterable[tuple], version: int):
+        self.points.load(rows, version)
+
+    def has_species(self, species_id: int) -> bool:
+        """Whether the point snapshot has any location of the species (refresh it first)."""
+        return species_id in self.points.species_ids
+
+    def cached(self, key: TileKey, z: int, x: int, y: int) -> Optional[bytes]:
+        return self.cache.get(key, z, x, y)
+
+    def render(self, key: TileKey, z: int, x: int, y: int) -> bytes:
+        """Render (and persist) one tile; refresh the points first (see version_to_load)."""
+        version = self.points.version
+        mx, my = self.points.select(key)
+        density = render_density(mx, my, z, x, y, tile_sigma_px(z, y)) if len(mx) else None
+        data = empty_tile() if density is None else encode_png(colorize(density))
+        self.cache.put(version, key, z, x, y, data)
+        return data
+
+    def location_added(self, lat: float, lon: float, species_id: int, months: Optional[list[int]]):
+        self.cache.bump([(lat, lon, species_id, months)])
+
+    def invalidate(self):
+        self.cache.bump(None)
+
+
+bloom_tiles = BloomTiles(
+    settings.BLOOM_TILE_CACHE_DIR,
+    settings.BLOOM_TILE_CACHE_MAX_TILES,
+    settings.BLOOM_TILE_CACHE_KEEP_VERSIONS,
+)
@@ -0,0 +1,382 @@
+# app/services/bulk_load.py
+"""
+Bulk ingestion of species and locations from CSV / NDJSON.
+
+Input is read as a stream and validated in batches against the normal create
+schemas. Valid rows are written with COPY into a temp staging table followed by
+a single INSERT ... SELECT ... ON CONFLICT per batch (or multi-row VALUES with
+writer="values"). Each batch commits on its own, so a failure part-way keeps
+the batches already loaded. A location batch that still violates a constraint
+(an explicit id whose species, name and coordinates belong to another row) is
+rolled back and its rows are reported as rejected; the load carries on.
+
+CLI:
+
+    python -m app.services.bulk_load species species.ndjson
+    python -m app.services.bulk_load locations locations.csv --batch-size 10000
+    python -m app.services.bulk_load blooms blooms.csv
+"""
+import argparse
+import csv
+import io
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from itertools import islice
+from tempfile import SpooledTemporaryFile
+from typing import IO, Iterable, Iterator, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.Location import Location
+from app.models.Specie import Specie
+from app.schemas.Location import LocationCreate
+from app.schemas.Specie import SpecieCreate
+from app.services.bloom_calendar import bloom_months
+
+KINDS = ("species", "locations", "blooms")
+FORMATS = ("csv", "ndjson")
+DEFAULT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+SPECIES_COLUMNS = [
+    "speciesId", "name", "scientificName", "description", "imageUrl",
+    "bloomTime", "color", "habitat", "characteristics",
+]
+LOCATION_COLUMNS = ["speciesId", "locationName", "latitude", "longitude", "bloomingPeriod", "bloomMonths"]
+# ux_locations_natural_key; rows without an id are upserted on it
+LOCATION_NATURAL_KEY = ["speciesId", "locationName", "latitude", "longitude"]
+
+
+class LocationRecord(LocationCreate):
+    id: Optional[int] = None
+
+
+@dataclass
+class BulkReport:
+    rows: int = 0
+    written: int = 0
+    rejected: int = 0
+    errors: list = field(default_factory=list)
+    seconds: float = 0.0
+    rowsPerSecond: float = 0.0
+
+    def reject(self, row_number: int, message: str):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "error": message})
+
+    def finish(self, started: float) -> "BulkReport":
+        self.seconds = round(time.perf_counter() - started, 3)
+        self.rowsPerSecond = round(self.written / self.seconds, 1) if self.seconds else 0.0
+        return self
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+# -----------------------
+# Parsing
+# -----------------------
+def iter_records(stream: IO[str], fmt: str) -> Iterator[dict]:
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    elif fmt == "ndjson":
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"line {line_number}: invalid JSON ({exc.msg})") from None
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def _blank_to_none(raw: dict) -> dict:
+    return {k: (None if v == "" else v) for k, v in raw.items() if k is not None}
+
+
+def location_fields(raw: dict) -> dict:
+    """Accept `coordinates`, `latitude`/`longitude` or `lat`/`lon`; bloomingPeriod may be a JSON string."""
+    raw = _blank_to_none(raw)
+    if "coordinates" not in raw:
+        lat = raw.pop("latitude", raw.pop("lat", None))
+        lon = raw.pop("longitude", raw.pop("lon", None))
+        raw["coordinates"] = [lat, lon]
+    elif isinstance(raw["coordinates"], str):
+        raw["coordinates"] = json.loads(raw["coordinates"])
+    if isinstance(raw.get("bloomingPeriod"), str):
+        raw["bloomingPeriod"] = json.loads(raw["bloomingPeriod"])
+    return raw
+
+
+def bloom_fields(raw: dict, species_by_name: dict) -> dict:
+    """
+    Map a blooms.csv row (id, lat, lon, date, species, location, radius) onto a location.
+    Its `id` numbers the observation, not a location, so it is not kept.
+    """
+    raw = _blank_to_none(raw)
+    return {
+        "speciesId": species_by_name.get((raw.get("species") or "").strip().lower()),
+        "locationName": raw.get("location"),
+        "coordinates": [raw.get("lat"), raw.get("lon")],
+        "bloomingPeriod": {"peak": raw["date"]} if raw.get("date") else None,
+    }
+
+
+def batched(records: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    it = iter(records)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def validate_batch(schema: type[BaseModel], batch: list[tuple[int, dict]],
+                   report: BulkReport) -> list[tuple[int, BaseModel]]:
+    """Validate (row_number, raw) pairs; invalid rows are recorded on the report and skipped."""
+    valid = []
+    for row_number, raw in batch:
+        try:
+            valid.append((row_number, schema.model_validate(raw)))
+        except ValidationError as exc:
+            err = exc.errors()[0]
+            where = ".".join(str(p) for p in err["loc"]) or "row"
+            report.reject(row_number, f"{where}: {err['msg']}")
+    return valid
+
+
+# -----------------------
+# Writing
+# -----------------------
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, (list, tuple)):
+        # Postgres array literal, for integer[] columns such as bloomMonths
+        return "{" + ",".join(str(v) for v in value) + "}"
+    return value
+
+
+def _copy_rows(db: Session, staging: str, columns: list[str], rows: list[tuple]):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow([_copy_value(v) for v in row])
+    buf.seek(0)
+    cols = ", ".join(f'"{c}"' for c in columns)
+    dbapi_conn = db.connection().connection.dbapi_connection
+    with dbapi_conn.cursor() as cur:
+        cur.copy_expert(f"COPY {staging} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf)
+
+
+def upsert(db: Session, model, columns: list[str], rows: list[tuple],
+           conflict: Optional[list[str]], writer: str = "copy") -> int:
+    """
+    Insert `rows` (tuples ordered like `columns`) into model's table.
+    With `conflict`, existing rows matching those columns are updated in place.
+    """
+    if not rows:
+        return 0
+    table = model.__table__
+    update_cols = [c for c in columns if not conflict or c not in conflict]
+
+    if writer == "values":
+        stmt = pg_insert(table)
+        if conflict:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=conflict, set_={c: stmt.excluded[c] for c in update_cols}
+            )
+        db.execute(stmt, [dict(zip(columns, row)) for row in rows])
+        return len(rows)
+
+    staging = f"_bulk_{table.name}"
+    cols = ", ".join(f'"{c}"' for c in columns)
+    db.execute(text(
+        f"CREATE TEMP TABLE {staging} "
+        f"AS SELECT {cols} FROM {table.name} WITH NO DATA"
+    ))
+    _copy_rows(db, staging, columns, rows)
+    sql = f"INSERT INTO {table.name} ({cols}) SELECT {cols} FROM {staging}"
+    if conflict:
+        sets = ", ".join(f'"{c}" = EXCLUDED."{c}"' for c in update_cols)
+        keys = ", ".join(f'"{c}"' for c in conflict)
+        sql += f" ON CONFLICT ({keys}) DO UPDATE SET {sets}"
+    db.execute(text(sql))
+    # staging shape depends on `columns` (with or without id), so don't keep it around
+    db.execute(text(f"DROP TABLE {staging}"))
+    return len(rows)
+
+
+def sync_id_sequence(db: Session, table: str, column: str = "id"):
+    """Move a serial sequence past explicitly loaded ids so later inserts don't collide."""
+    db.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), "
+        f"COALESCE((SELECT MAX(\"{column}\") FROM {table}), 0) + 1, false)"
+    ))
+
+
+def load_species(db: Session, records: Iterable[dict], batch_size: int = DEFAULT_BATCH_SIZE,
+                 writer: str = "copy") -> BulkReport:
+    report, started = BulkReport(), time.perf_counter()
+    numbered = enumerate(records, start=1)
+    for batch in batched(numbered, batch_size):
+        report.rows += len(batch)
+        valid = validate_batch(SpecieCreate, [(n, _blank_to_none(r)) for n, r in batch], report)
+        # last occurrence wins when a batch repeats a speciesId
+        latest = {s.speciesId: s for _, s in valid}
+        rows = [tuple(getattr(s, c) for c in SPECIES_COLUMNS) for s in latest.values()]
+        report.written += upsert(db, Specie, SPECIES_COLUMNS, rows, ["speciesId"], writer)
+        db.commit()
+    return report.finish(started)
+
+
+def load_locations(db: Session, records: Iterable[dict], batch_size: int = DEFAULT_BATCH_SIZE,
+                   writer: str = "copy", blooms: bool = False) -> BulkReport:
+    report, started = BulkReport(), time.perf_counter()
+    known_species = set(db.scalars(select(Specie.speciesId)).all())
+    species_by_name = {}
+    if blooms:
+        species_by_name = {
+            name.strip().lower(): sid
+            for sid, name in db.execute(select(Specie.speciesId, Specie.name)).all()
+        }
+    explicit_ids = False
+
+    for batch in batched(enumerate(records, start=1), batch_size):
+        report.rows += len(batch)
+        prepared = []
+        for n, raw in batch:
+            try:
+                prepared.append((n, bloom_fields(raw, species_by_name) if blooms else location_fields(raw)))
+            except (ValueError, TypeError) as exc:
+                report.reject(n, f"unparseable row: {exc}")
+        valid = validate_batch(LocationRecord, prepared, report)
+
+        # last occurrence wins when a batch repeats an id or a natural key
+        with_id, without_id = {}, {}
+        for n, loc in valid:
+            if loc.speciesId not in known_species:
+                report.reject(n, f"unknown speciesId {loc.speciesId}")
+                continue
+            if len(loc.coordinates) != 2:
+                report.reject(n, "coordinates must be [latitude, longitude]")
+                continue
+            row = (
+                loc.speciesId, loc.locationName, loc.coordinates[0], loc.coordinates[1],
+                json.dumps(loc.bloomingPeriod) if loc.bloomingPeriod is not None else None,
+                bloom_months(loc.bloomingPeriod),
+            )
+            if loc.id is not None:
+                with_id[loc.id] = (n, (loc.id, *row))
+            else:
+                without_id[row[:len(LOCATION_NATURAL_KEY)]] = (n, row)
+
+        try:
+            written = upsert(db, Location, ["id", *LOCATION_COLUMNS], [r for _, r in with_id.values()], ["id"], writer)
+            written += upsert(db, Location, LOCATION_COLUMNS, [r for _, r in without_id.values()],
+                              LOCATION_NATURAL_KEY, writer)
+            db.commit()
+        except IntegrityError as exc:
+            db.rollback()
+            message = f"batch rolled back: {str(exc.orig).strip().splitlines()[0]}"
+            for n in sorted(n for n, _ in [*with_id.values(), *without_id.values()]):
+                report.reject(n, message)
+            continue
+        report.written += written
+        explicit_ids = explicit_ids or bool(with_id)
+
+    if explicit_ids:
+        sync_id_sequence(db, Location.__tablename__)
+        db.commit()
+    return report.finish(started)
+
+
+def ensure_bloom_species(db: Session, records: list[dict]) -> int:
+    """Create species named in blooms data that don't exist yet. Returns how many were added."""
+    existing = {n.strip().lower() for n in db.scalars(select(Specie.name)).all()}
+    next_id = (db.scalar(select(func.max(Specie.speciesId))) or 0) + 1
+    added = 0
+    for name in dict.fromkeys((r.get("species") or "").strip() for r in records):
+        if name and name.lower() not in existing:
+            db.add(Specie(speciesId=next_id, name=name, scientificName=name))
+            existing.add(name.lower())
+            next_id += 1
+            added += 1
+    db.commit()
+    return added
+
+
+def load(db: Session, kind: str, stream: IO[str], fmt: str = "csv",
+         batch_size: int = DEFAULT_BATCH_SIZE, writer: str = "copy") -> BulkReport:
+    records = iter_records(stream, fmt)
+    if kind == "species":
+        return load_species(db, records, batch_size, writer)
+    if kind == "locations":
+        return load_locations(db, records, batch_size, writer)
+    if kind == "blooms":
+        # blooms files are small observation sheets; species are resolved by name
+        rows = list(records)
+        ensure_bloom_species(db, rows)
+        return load_locations(db, rows, batch_size, writer, blooms=True)
+    raise ValueError(f"Unknown kind: {kind}")
+
+
+async def load_request_body(request: Request, kind: str, fmt: Optional[str], batch_size: int) -> dict:
+    """
+    Spool an uploaded CSV/NDJSON body (memory up to 8 MB, then disk) and load it off the event loop.
+    """
+    if fmt is None:
+        content_type = request.headers.get("content-type", "")
+        fmt = "ndjson" if "ndjson" in content_type or "jsonl" in content_type else "csv"
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {FORMATS}")
+
+    spool = SpooledTemporaryFile(max_size=8 * 1024 * 1024, mode="w+b")
+    try:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        text_stream = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+
+        def run() -> BulkReport:
+            from app.db.session import SessionLocal
+
+            with SessionLocal() as db:
+                return load(db, kind, text_stream, fmt, batch_size)
+
+        try:
+            report = await run_in_threadpool(run)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    finally:
+        spool.close()
+    return report.to_dict()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load species / locations")
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, default=None,
+                        help="defaults to the file extension (.csv / .ndjson)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--writer", choices=("copy", "values"), default="copy")
+    args = parser.parse_args()
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db, open(args.path, newline="", encoding="utf-8") as f:
+        report = load(db, args.kind, f, fmt, args.batch_size, args.writer)
+    print(json.dumps(report.to_dict(), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
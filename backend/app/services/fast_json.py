@@ -0,0 +1,105 @@
+# app/services/fast_json.py
+"""
+ORM-free serialization for list endpoints.
+
+Handlers select only the columns a response needs as plain row tuples and
+encode them straight to JSON bytes with orjson, skipping ORM hydration and
+per-row Pydantic validation. Key order and value formats match the
+response_model output (LocationsResponse, SpeciesListResponse, UserReviewOut),
+so clients see the same payload.
+"""
+from typing import Iterable, Optional
+
+import orjson
+
+from app.models.Location import Location
+from app.models.Specie import Specie
+from app.models.UserReview import UserReview
+from app.schemas.Review import ReviewImageOut
+from app.services.review_stats import stats_to_dict
+
+LOCATION_COLUMNS = (
+    Location.locationName, Location.latitude, Location.longitude,
+    Location.bloomingPeriod, Location.id, Location.speciesId,
+)
+SPECIES_COLUMNS = (
+    Specie.name, Specie.scientificName, Specie.description, Specie.imageUrl, Specie.bloomTime,
+    Specie.color, Specie.habitat, Specie.characteristics, Specie.id, Specie.speciesId,
+)
+SPECIES_KEYS = tuple(c.key for c in SPECIES_COLUMNS)
+REVIEW_COLUMNS = (
+    UserReview.speciesId, UserReview.locationId, UserReview.userName, UserReview.rating,
+    UserReview.comment, UserReview.images, UserReview.id, UserReview.timestamp,
+)
+IMAGE_KEYS = tuple(ReviewImageOut.model_fields)
+
+
+def location_row(row) -> dict:
+    name, lat, lon, period, loc_id, species_id = row
+    return {
+        "locationName": name,
+        "coordinates": [lat, lon],
+        "bloomingPeriod": period,
+        "id": loc_id,
+        "speciesId": species_id,
+    }
+
+
+def species_row(row) -> dict:
+    return dict(zip(SPECIES_KEYS, row))
+
+
+def review_images(raw: Optional[str]) -> list:
+    if not raw:
+        return []
+    return [{k: img.get(k) for k in IMAGE_KEYS} for img in orjson.loads(raw)]
+
+
+def review_row(row) -> dict:
+    species_id, location_id, user_name, rating, comment, images, review_id, timestamp = row
+    return {
+        "speciesId": species_id,
+        "locationId": location_id,
+        "userName": user_name,
+        "rating": rating,
+        "comment": comment,
+        "images": review_images(images),
+        "id": review_id,
+        "timestamp": timestamp,
+    }
+
+
+def species_full_body(specie: Specie, stats_rows: Iterable) -> bytes:
+    """A species with its (eager-loaded) locations, each carrying its rating summary."""
+    stats = {row.locationId: row for row in stats_rows}
+    data = {key: getattr(specie, key) for key in SPECIES_KEYS}
+    data["locations"] = [
+        {
+            **location_row((loc.locationName, loc.latitude, loc.longitude, loc.bloomingPeriod, loc.id, loc.speciesId)),
+            "rating": stats_to_dict(stats.get(loc.id)),
+        }
+        for loc in specie.locations
+    ]
+    # ratingDistribution has int keys
+    return orjson.dumps({"success": True, "data": data, "message": None}, option=orjson.OPT_NON_STR_KEYS)
+
+
+def envelope(data: list, message: Optional[str] = None) -> bytes:
+    """Encode the {success, data, message} wrapper used by the list responses."""
+    return orjson.dumps({"success": True, "data": data, "message": message})
+
+
+def locations_body(rows: Iterable) -> bytes:
+    return envelope([location_row(r) for r in rows])
+
+
+def species_body(rows: Iterable) -> bytes:
+    return envelope([species_row(r) for r in rows])
+
+
+def reviews_body(rows: Iterable) -> bytes:
+    return orjson.dumps([review_row(r) for r in rows])
+
+
+def review_line(row) -> bytes:
+    return orjson.dumps(review_row(row), option=orjson.OPT_APPEND_NEWLINE)
@@ -0,0 +1,194 @@
+# app/services/image_store.py
+"""
+Content-addressed store for review images.
+
+Files are named by the SHA-256 of their bytes and sharded two levels deep
+(`ab/cd/<sha256>.<ext>`), so identical uploads are stored once. Every review image
+that points at a blob holds one reference in `image_blobs.refCount`; the count is
+updated in the same transaction as the review. Blobs that end up unreferenced
+(released, or written by a request that then failed) are removed by:
+
+    python -m app.services.image_store gc [--grace-seconds 3600]
+
+Blobs are write-once, which is what lets /uploads/reviews/* be served as immutable.
+"""
+import argparse
+import glob
+import hashlib
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from typing import BinaryIO, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.models.ImageBlob import ImageBlob
+
+CHUNK_SIZE = 1024 * 1024
+TMP_DIR = "tmp"
+# public URL prefix the store is served under (app.api.Media)
+MEDIA_PREFIX = "/uploads/reviews"
+# the only extensions stored and served, with the content type they are served as
+IMAGE_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+    ".gif": "image/gif",
+}
+
+
+class ImageTooLarge(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class StoredBlob:
+    sha256: str
+    path: str  # relative to the store root
+    size: int
+    created: bool  # False when the content was already stored
+
+
+class ImageStore:
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(os.path.join(root, TMP_DIR), exist_ok=True)
+
+    def shard_dir(self, sha256: str) -> str:
+        return os.path.join(sha256[:2], sha256[2:4])
+
+    def abspath(self, relpath: str) -> str:
+        return os.path.join(self.root, relpath)
+
+    def url_for(self, path: str) -> str:
+        """Public URL of a file inside the store (absolute path or relative to root)."""
+        rel = os.path.relpath(path, self.root) if os.path.isabs(path) or path.startswith(self.root) else path
+        return f"{MEDIA_PREFIX}/{rel.replace(os.sep, '/')}"
+
+    def path_for(self, url: str) -> str:
+        """Filesystem path of a store URL; inverse of url_for."""
+        return self.abspath(url.removeprefix(MEDIA_PREFIX).lstrip("/"))
+
+    def find(self, sha256: str) -> Optional[str]:
+        """Relative path of the stored blob with this hash, whatever its extension."""
+        pattern = os.path.join(self.root, self.shard_dir(sha256), f"{sha256}.*")
+        for match in glob.glob(pattern):
+            if not match.endswith(".part"):
+                return os.path.relpath(match, self.root)
+        return None
+
+    def put(self, src: BinaryIO, ext: str, max_bytes: int) -> StoredBlob:
+        """
+        Stream src into the store in fixed-size chunks, hashing as it goes.
+        Raises ImageTooLarge as soon as max_bytes is exceeded. Blocking I/O.
+        """
+        tmp_path = os.path.join(self.root, TMP_DIR, f"{uuid.uuid4()}.part")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                while chunk := src.read(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ImageTooLarge(max_bytes)
+                    digest.update(chunk)
+                    f.write(chunk)
+            sha256 = digest.hexdigest()
+            existing = self.find(sha256)
+            if existing is not None:
+                os.remove(tmp_path)
+                # refresh mtime so gc's grace period covers the new reference
+                os.utime(self.abspath(existing))
+                return StoredBlob(sha256, existing, size, created=False)
+            relpath = os.path.join(self.shard_dir(sha256), f"{sha256}{ext}")
+            os.makedirs(os.path.dirname(self.abspath(relpath)), exist_ok=True)
+            os.replace(tmp_path, self.abspath(relpath))
+            return StoredBlob(sha256, relpath, size, created=True)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def delete(self, relpath: str):
+        """Remove a blob and any derivatives generated for it."""
+        sha256 = os.path.splitext(os.path.basename(relpath))[0]
+        derived = os.path.join(os.path.dirname(self.abspath(relpath)), "derived", f"{sha256}_*")
+        for path in [self.abspath(relpath), *glob.glob(derived)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def add_ref_stmt(blob: StoredBlob, count: int = 1):
+    """Upsert that adds `count` references to a blob; run inside the review's transaction."""
+    stmt = pg_insert(ImageBlob).values(sha256=blob.sha256, path=blob.path.replace(os.sep, "/"),
+                                       size=blob.size, refCount=count)
+    return stmt.on_conflict_do_update(
+        index_elements=[ImageBlob.sha256],
+        set_={"refCount": ImageBlob.refCount + stmt.excluded.refCount},
+    )
+
+
+def release_stmt(sha256: str, count: int = 1):
+    """Drop references when review images are deleted; gc removes blobs that reach zero."""
+    return (
+        ImageBlob.__table__.update()
+        .where(ImageBlob.sha256 == sha256)
+        .values(refCount=ImageBlob.refCount - count)
+    )
+
+
+def gc(store: ImageStore, db, grace_seconds: float = 3600) -> dict:
+    """
+    Delete blobs with no references. Files newer than grace_seconds are kept because
+    the request that wrote them may not have committed yet.
+    """
+    referenced = set(db.scalars(select(ImageBlob.sha256).where(ImageBlob.refCount > 0)).all())
+    cutoff = time.time() - grace_seconds
+    removed = kept = 0
+    for dirpath, dirnames, filenames in os.walk(store.root):
+        rel = os.path.relpath(dirpath, store.root)
+        if rel.split(os.sep)[-1] == "derived":
+            continue
+        for name in filenames:
+            sha256, _ = os.path.splitext(name)
+            path = os.path.join(dirpath, name)
+            in_tmp = rel == TMP_DIR
+            is_blob = len(sha256) == 64 and rel.count(os.sep) == 1
+            if not (in_tmp or is_blob) or sha256 in referenced:
+                kept += 1
+                continue
+            if os.path.getmtime(path) > cutoff:
+                kept += 1
+                continue
+            if is_blob:
+                store.delete(os.path.relpath(path, store.root))
+            else:
+                os.remove(path)
+            removed += 1
+    db.execute(ImageBlob.__table__.delete().where(ImageBlob.refCount <= 0))
+    db.commit()
+    return {"removed": removed, "kept": kept}
+
+
+image_store = ImageStore(os.environ.get("REVIEWS_UPLOAD_DIR", "uploads/reviews"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Review image store maintenance")
+    parser.add_argument("command", choices=["gc"])
+    parser.add_argument("--grace-seconds", type=float, default=3600)
+    args = parser.parse_args()
+
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        print(gc(image_store, db, args.grace_seconds))
+
+
+if __name__ == "__main__":
+    main()
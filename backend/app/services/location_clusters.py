@@ -0,0 +1,269 @@
+# app/services/location_clusters.py
+"""
+Hierarchical point clusters for /locations/clusters (supercluster-style).
+
+Zoom z is divided into square cells of CLUSTER_CELL_PX screen pixels in Web
+Mercator, i.e. an n x n grid with n = 2 ** z * 256 / CLUSTER_CELL_PX. The grids
+are aligned, so cell (cx, cy) at zoom z is the parent of its four children at z + 1
+and every level is built by merging the level below it, starting from the points at
+CLUSTER_PRECOMPUTED_MAX_ZOOM. Each cell keeps a count and coordinate sums (the
+centroid is their mean), once for all locations and once per species.
+
+Levels are sorted arrays keyed by group * n * n + cy * n + cx, so a viewport is one
+binary search per grid row. Above the precomputed zooms the viewport is small and is
+clustered on the fly from the spatial index; above CLUSTER_MAX_ZOOM points are
+returned individually. Inserts from create_location are queued and merged into
+every level on the next query; the index is reloaded after SPATIAL_INDEX_TTL
+seconds so other workers' inserts become visible.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from app.core.boot import lazy_import
+from app.core.config import settings
+from app.services.spatial_index import LocationIndex, inverse_mercator, mercator
+
+np = lazy_import("numpy")
+
+TILE_SIZE = 256
+
+
+@dataclass
+class Level:
+    """Cells of one zoom level, sorted by key. member_* are meaningful only when count == 1."""
+    key: np.ndarray
+    count: np.ndarray
+    sum_x: np.ndarray
+    sum_y: np.ndarray
+    member_id: np.ndarray
+    member_species: np.ndarray
+
+    @classmethod
+    def empty(cls) -> Level:
+        return cls(*(np.empty(0, dtype) for dtype in (np.int64, np.int64, np.float64, np.float64, np.int64, np.int64)))
+
+    def __len__(self):
+        return len(self.key)
+
+
+def reduce_cells(key, count, sum_x, sum_y, member_id, member_species) -> Level:
+    """Merge entries sharing a key."""
+    if len(key) == 0:
+        return Level.empty()
+    order = np.argsort(key, kind="stable")
+    key = key[order]
+    starts = np.flatnonzero(np.concatenate(([True], key[1:] != key[:-1])))
+    return Level(
+        key[starts],
+        np.add.reduceat(count[order], starts),
+        np.add.reduceat(sum_x[order], starts),
+        np.add.reduceat(sum_y[order], starts),
+        np.minimum.reduceat(member_id[order], starts),
+        np.minimum.reduceat(member_species[order], starts),
+    )
+
+
+def merge_cells(level: Level, extra: Level) -> Level:
+    """Add the (few) cells of `extra` into `level` without re-sorting it."""
+    if len(extra) == 0:
+        return level
+    pos = np.searchsorted(level.key, extra.key)
+    found = pos < len(level)
+    found[found] = level.key[pos[found]] == extra.key[found]
+    at = pos[found]
+    count, sum_x, sum_y = level.count.copy(), level.sum_x.copy(), level.sum_y.copy()
+    count[at] += extra.count[found]
+    sum_x[at] += extra.sum_x[found]
+    sum_y[at] += extra.sum_y[found]
+    member_id, member_species = level.member_id.copy(), level.member_species.copy()
+    member_id[at] = np.minimum(member_id[at], extra.member_id[found])
+    member_species[at] = np.minimum(member_species[at], extra.member_species[found])
+    new, where = ~found, pos[~found]
+    return Level(*(
+        np.insert(column, where, getattr(extra, f)[new])
+        for f, column in zip(Level.__dataclass_fields__, (level.key, count, sum_x, sum_y, member_id, member_species))
+    ))
+
+
+class ClusterIndex:
+    def __init__(self, cell_px: int = 64, max_zoom: int = 10, ttl: float = 300.0):
+        if TILE_SIZE % cell_px or cell_px & (cell_px - 1):
+            raise ValueError("cell_px must be a power of two dividing 256")
+        self.shift = int(math.log2(TILE_SIZE // cell_px))
+        self.max_zoom = max_zoom
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        # levels[z] = (all locations, per species); built by load()
+        self.levels: list[tuple[Level, Level]] = []
+        self._pending: list[tuple[int, int, float, float]] = []
+
+    def grid_size(self, zoom: int) -> int:
+        return 2 ** (zoom + self.shift)
+
+    # -------- building --------
+    def _leaf(self, ids, species, lat, lon) -> tuple[Level, Level]:
+        """Cells of the deepest precomputed level for raw points."""
+        n = self.grid_size(self.max_zoom)
+        mx, my = mercator(lat, lon)
+        cx = np.clip((mx * n).astype(np.int64), 0, n - 1)
+        cy = np.clip((my * n).astype(np.int64), 0, n - 1)
+        cell = cy * n + cx
+        ones = np.ones(len(ids), np.int64)
+        return (
+            reduce_cells(cell, ones, mx, my, ids, species),
+            reduce_cells(species * n * n + cell, ones, mx, my, ids, species),
+        )
+
+    @staticmethod
+    def _parent(level: Level, n: int) -> Level:
+        """Merge a level on an n x n grid into its parent on the n/2 x n/2 grid."""
+        group, cell = np.divmod(level.key, n * n)
+        cy, cx = np.divmod(cell, n)
+        half = n // 2
+        key = group * half * half + (cy >> 1) * half + (cx >> 1)
+        return reduce_cells(key, level.count, level.sum_x, level.sum_y, level.member_id, level.member_species)
+
+    def _build(self, leaf: tuple[Level, Level]) -> list[tuple[Level, Level]]:
+        levels = [leaf]
+        for z in range(self.max_zoom, 0, -1):
+            n = self.grid_size(z)
+            levels.append(tuple(self._parent(level, n) for level in levels[-1]))
+        return levels[::-1]
+
+    def needs_load(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def load(self, rows: Iterable[tuple]):
+        """rows: iterable of (id, speciesId, latitude, longitude)."""
+        rows = list(rows)
+        if rows:
+            ids, species, lat, lon = (np.asarray(c) for c in zip(*rows))
+            leaf = self._leaf(ids.astype(np.int64), species.astype(np.int64),
+                              lat.astype(np.float64), lon.astype(np.float64))
+        else:
+            leaf = (Level.empty(), Level.empty())
+        levels = self._build(leaf)
+        with self._lock:
+            self.levels = levels
+            self._pending = []
+            self._loaded_at = time.monotonic()
+
+    def add(self, location_id: int, species_id: int, lat: float, lon: float):
+        """Register a freshly inserted location without a full reload."""
+        with self._lock:
+            if self._loaded_at is None:
+                return  # not built yet; the first query loads everything from the DB
+            self._pending.append((location_id, species_id, lat, lon))
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _merge_pending(self):
+        ids, species, lat, lon = (np.asarray(c) for c in zip(*self._pending))
+        added = self._build(self._leaf(ids.astype(np.int64), species.astype(np.int64),
+                                       lat.astype(np.float64), lon.astype(np.float64)))
+        self.levels = [
+            tuple(merge_cells(old, new) for old, new in zip(current, extra))
+            for current, extra in zip(self.levels, added)
+        ]
+        self._pending = []
+
+    # -------- querying --------
+    def _level(self, zoom: int, species_id: Optional[int]) -> Level:
+        with self._lock:
+            if self._pending:
+                self._merge_pending()
+            everything, by_species = self.levels[zoom]
+        return everything if species_id is None else by_species
+
+    def clusters(self, zoom: int, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                 species_id: Optional[int] = None) -> Level:
+        """Cells of a precomputed zoom (<= max_zoom) intersecting the box."""
+        level = self._level(zoom, species_id)
+        n = self.grid_size(zoom)
+        base = 0 if species_id is None else species_id * n * n
+        (x0, x1), (y1, y0) = mercator([min_lat, max_lat], [min_lon, max_lon])
+        rows = np.arange(*np.clip([int(y0 * n), int(y1 * n) + 1], 0, n), dtype=np.int64)
+        idx = []
+        for lo, hi in lon_ranges(x0, x1):
+            c0, c1 = np.clip([int(lo * n), int(hi * n)], 0, n - 1)
+            idx.append(ranges(
+                np.searchsorted(level.key, base + rows * n + c0, side="left"),
+                np.searchsorted(level.key, base + rows * n + c1, side="right"),
+            ))
+        idx = np.concatenate(idx)
+        return Level(*(getattr(level, f)[idx] for f in Level.__dataclass_fields__))
+
+    def cluster_points(self, zoom: int, ids, species, lat, lon) -> Level:
+        """Cluster an arbitrary set of points on the zoom's grid (zooms above max_zoom)."""
+        n = self.grid_size(zoom)
+        mx, my = mercator(lat, lon)
+        cx = np.clip((mx * n).astype(np.int64), 0, n - 1)
+        cy = np.clip((my * n).astype(np.int64), 0, n - 1)
+        return reduce_cells(cy * n + cx, np.ones(len(ids), np.int64), mx, my, ids, species)
+
+
+def lon_ranges(x0: float, x1: float) -> list[tuple[float, float]]:
+    """Mercator x intervals of a longitude range; x0 > x1 crosses the antimeridian."""
+    return [(x0, 1.0), (0.0, x1)] if x0 > x1 else [(x0, x1)]
+
+
+def ranges(starts, ends):
+    """Concatenate the [start, end) index ranges without a Python loop."""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, np.int64)
+    offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+    return offsets + np.arange(total, dtype=np.int64)
+
+
+def features(level: Level, limit: int) -> list[dict]:
+    """Largest clusters first; single-member cells come back as the location itself."""
+    order = np.argsort(-level.count, kind="stable")[:limit]
+    count = level.count[order]
+    lat, lon = inverse_mercator(level.sum_x[order] / count, level.sum_y[order] / count)
+    single = count == 1
+    return [
+        {
+            "id": loc_id if one else None,
+            "cluster": not one,
+            "count": c,
+            "coordinates": [round(la, 7), round(lo, 7)],
+            "speciesId": sp if one else None,
+        }
+        for one, c, la, lo, loc_id, sp in zip(
+            single.tolist(), count.tolist(), lat.tolist(), lon.tolist(),
+            level.member_id[order].tolist(), level.member_species[order].tolist(),
+        )
+    ]
+
+
+def viewport_features(index: ClusterIndex, points: LocationIndex, zoom: int,
+                      min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                      species_id: Optional[int], limit: int) -> list[dict]:
+    """Clusters (or, above CLUSTER_MAX_ZOOM, points) in the viewport at `zoom`."""
+    if zoom <= index.max_zoom:
+        return features(index.clusters(zoom, min_lat, min_lon, max_lat, max_lon, species_id), limit)
+    ids, species, lat, lon = points.bbox_arrays(min_lat, min_lon, max_lat, max_lon, species_id)
+    if zoom > settings.CLUSTER_MAX_ZOOM:
+        ids, species, lat, lon = ids[:limit], species[:limit], lat[:limit], lon[:limit]
+        return [
+            {"id": i, "cluster": False, "count": 1, "coordinates": [la, lo], "speciesId": sp}
+            for i, sp, la, lo in zip(ids.tolist(), species.tolist(), lat.tolist(), lon.tolist())
+        ]
+    return features(index.cluster_points(zoom, ids, species, lat, lon), limit)
+
+
+cluster_index = ClusterIndex(
+    cell_px=settings.CLUSTER_CELL_PX,
+    max_zoom=settings.CLUSTER_PRECOMPUTED_MAX_ZOOM,
+    ttl=settings.SPATIAL_INDEX_TTL,
+)
@@ -0,0 +1,332 @@
+# app/services/metrics.py
+"""
+Per-request timing and SQL instrumentation, exposed in Prometheus text format at /metrics.
+
+MetricsMiddleware opens a RequestMetrics context for every HTTP request. SQLAlchemy
+cursor events (instrument_engine) add each statement's count and duration to it, the
+pool reports checkout wait through observe_checkout(), and get_db() marks when a sync
+handler first got a worker thread (threadpool queue time). When the request finishes
+everything is folded into histograms labelled by route template, so a slow route can be
+split into database time, pool wait, threadpool wait and the rest (serialization).
+
+With SLOW_REQUEST_MS set, requests over the threshold are logged with their statements.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+UNMATCHED = "<unmatched>"
+# statements and checkouts outside any request (thumbnail jobs, CLIs, startup)
+BACKGROUND = "<background>"
+INF = 'le="+Inf"'
+
+
+# -----------------------
+# Metric types
+# -----------------------
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: dict = {}
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.label_names, k)} {_num(v)}" for k, v in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._values.items()]
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="%s"' % _num(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, INF)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_num(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+
+# -----------------------
+# Registry
+# -----------------------
+class Metrics:
+    def __init__(self):
+        self.request_seconds = Histogram(
+            "app_http_request_duration_seconds", "HTTP request latency by route template",
+            ("method", "route", "status"),
+        )
+        self.in_flight = Gauge("app_http_requests_in_flight", "Requests currently being handled")
+        self.db_seconds = Histogram(
+            "app_db_time_per_request_seconds", "Time spent executing SQL per request", ("route",),
+        )
+        self.db_statements = Histogram(
+            "app_db_statements_per_request", "SQL statements issued per request", ("route",), COUNT_BUCKETS,
+        )
+        self.statement_seconds = Histogram(
+            "app_db_statement_duration_seconds", "Duration of individual SQL statements", ("route",),
+        )
+        self.checkout_seconds = Histogram(
+            "app_db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("route",),
+        )
+        self.threadpool_seconds = Histogram(
+            "app_threadpool_wait_seconds",
+            "Time from request start until a sync handler got a worker thread", ("route",),
+        )
+        self.slow_requests = Counter("app_slow_requests_total", "Requests over SLOW_REQUEST_MS", ("route",))
+        self.pool = Gauge("app_db_pool_connections", "Connection pool occupancy", ("engine", "state"))
+        self.threadpool = Gauge("app_threadpool_threads", "AnyIO worker thread limiter usage", ("state",))
+        self.review_queue = Gauge("app_review_write_queue", "Reviews buffered by the write-behind writer")
+        self.review_batch_rows = Histogram(
+            "app_review_write_batch_rows", "Reviews per write-behind flush", (), COUNT_BUCKETS + (1000,),
+        )
+        self.review_writes = Counter(
+            "app_review_writes_total", "Write-behind review outcomes (written, failed, rejected, timeout)", ("outcome",),
+        )
+
+    def all(self) -> list[Metric]:
+        return [
+            self.request_seconds, self.in_flight, self.db_seconds, self.db_statements,
+            self.statement_seconds, self.checkout_seconds, self.threadpool_seconds,
+            self.slow_requests, self.pool, self.threadpool,
+            self.review_queue, self.review_batch_rows, self.review_writes,
+        ]
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.all() for line in metric.render()) + "\n"
+
+
+metrics = Metrics()
+
+
+# -----------------------
+# Request context
+# -----------------------
+@dataclass
+class RequestMetrics:
+    started: float = field(default_factory=time.perf_counter)
+    statements: int = 0
+    db_seconds: float = 0.0
+    checkout_seconds: float = 0.0
+    threadpool_seconds: Optional[float] = None
+    # (seconds, sql) kept only while the slow-request log is enabled
+    log: list = field(default_factory=list)
+    durations: list = field(default_factory=list)
+    checkouts: list = field(default_factory=list)
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def current() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+def mark_thread_start():
+    """Called at the top of sync dependencies that run on the threadpool."""
+    ctx = _current.get()
+    if ctx is not None and ctx.threadpool_seconds is None:
+        ctx.threadpool_seconds = time.perf_counter() - ctx.started
+
+
+def observe_checkout(wait: float):
+    ctx = _current.get()
+    if ctx is not None:
+        ctx.checkout_seconds += wait
+        ctx.checkouts.append(wait)
+    else:
+        metrics.checkout_seconds.observe(wait, BACKGROUND)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    ctx = _current.get()
+    if ctx is None:
+        metrics.statement_seconds.observe(elapsed, BACKGROUND)
+        return
+    ctx.statements += 1
+    ctx.db_seconds += elapsed
+    ctx.durations.append(elapsed)
+    if settings.SLOW_REQUEST_MS and len(ctx.log) < settings.SLOW_REQUEST_MAX_STATEMENTS:
+        ctx.log.append((elapsed, statement))
+
+
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine):
+    """Attach statement counting/timing to a sync Engine (use async_engine.sync_engine for async)."""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# -----------------------
+# Middleware
+# -----------------------
+def route_label(scope: dict) -> str:
+    """Route template for the matched path (e.g. /api/v1/species/{speciesId})."""
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return UNMATCHED
+    root_path = scope.get("root_path", "")
+    path = scope["path"] if scope["path"].startswith(root_path) else root_path + scope["path"]
+    # routers included under a prefix may keep the unprefixed template on the route;
+    # the prefix is then whatever precedes the part of the path the route matched
+    start = 0
+    while not route.path_regex.match(path[start:]):
+        start = path.find("/", start + 1)
+        if start < 0:
+            return root_path + path_format
+    return path[:start] + path_format
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so the request context is shared with the handler's task and threads."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        ctx = RequestMetrics()
+        token = _current.set(ctx)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.in_flight.inc(amount=1)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight.inc(amount=-1)
+            _current.reset(token)
+            record(scope, ctx, status, time.perf_counter() - ctx.started)
+
+
+def record(scope: dict, ctx: RequestMetrics, status: int, elapsed: float):
+    route = route_label(scope)
+    metrics.request_seconds.observe(elapsed, scope["method"], route, str(status))
+    metrics.db_seconds.observe(ctx.db_seconds, route)
+    metrics.db_statements.observe(ctx.statements, route)
+    for duration in ctx.durations:
+        metrics.statement_seconds.observe(duration, route)
+    for wait in ctx.checkouts:
+        metrics.checkout_seconds.observe(wait, route)
+    if ctx.threadpool_seconds is not None:
+        metrics.threadpool_seconds.observe(ctx.threadpool_seconds, route)
+
+    if settings.SLOW_REQUEST_MS and elapsed * 1000 >= settings.SLOW_REQUEST_MS:
+        metrics.slow_requests.inc(route)
+        statements = "".join(f"\n  [{s * 1000:.1f} ms] {sql}" for s, sql in ctx.log)
+        logger.warning(
+            "Slow request %s %s -> %s: %.1f ms (db %.1f ms in %d statements, pool wait %.1f ms, "
+            "threadpool wait %.1f ms)%s",
+            scope["method"], scope["path"], status, elapsed * 1000, ctx.db_seconds * 1000,
+            ctx.statements, ctx.checkout_seconds * 1000, (ctx.threadpool_seconds or 0) * 1000, statements,
+        )
+
+
+def sample_gauges(pools: dict):
+    """Refresh point-in-time gauges; call from the event loop right before rendering."""
+    for name, status in pools.items():
+        for state in ("checkedOut", "checkedIn", "overflow"):
+            metrics.pool.set(name, state, value=status[state])
+    import anyio.to_thread
+
+    stats = anyio.to_thread.current_default_thread_limiter().statistics()
+    metrics.threadpool.set("busy", value=stats.borrowed_tokens)
+    metrics.threadpool.set("capacity", value=stats.total_tokens)
+    metrics.threadpool.set("waiting", value=stats.tasks_waiting)
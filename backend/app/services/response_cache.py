@@ -0,0 +1,122 @@
+# app/services/response_cache.py
+"""
+Read-through cache of pre-serialized JSON responses for reference data.
+
+Entries are keyed by (namespace, key) and hold the encoded body together with
+its ETag, so a hit costs no DB work and no re-serialization, and a matching
+If-None-Match is answered with 304 and no body. Writes call invalidate(namespace);
+the TTL bounds staleness for writes made by other workers.
+
+There is no Last-Modified: the time a body was cached says nothing about when its
+data last changed (a write and a refill can land in the same second, and writes in
+other workers are not seen at all), so If-Modified-Since could answer 304 for data
+that has changed. The ETag is a hash of the body and is always right.
+
+A response read from a replica (get_db marks request.state.db_replica) is not
+cached for `replica_lag` seconds after its namespace was invalidated: the replica
+may not have replayed the write yet, and caching its answer would pin the old data
+for the whole TTL. It is still returned; the next read from the primary or after
+the window fills the cache.
+"""
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Hashable, Optional
+
+from cachetools import TTLCache
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+
+    @property
+    def headers(self) -> dict:
+        return {"ETag": self.etag, "Cache-Control": "no-cache"}
+
+
+class ResponseCache:
+    def __init__(self, max_bytes: int, ttl: float, replica_lag: float = 0.0):
+        # LRU eviction bounded by total body size, plus per-entry expiry
+        self._cache = TTLCache(maxsize=max_bytes, ttl=ttl, getsizeof=lambda e: len(e.body) or 1)
+        self._lock = threading.Lock()
+        self.replica_lag = replica_lag
+        # namespace (None for clear()) -> monotonic time of its last invalidation
+        self._invalidated: dict[Optional[str], float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, request: Request, namespace: str, key: Hashable = None) -> Optional[Response]:
+        """Return a ready response (200 or 304) on a hit, None on a miss."""
+        with self._lock:
+            entry = self._cache.get((namespace, key))
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return self.respond(request, entry)
+
+    def store(self, request: Request, namespace: str, key: Hashable, payload: BaseModel) -> Response:
+        """Serialize payload once, cache it and respond to the current request."""
+        return self.store_body(request, namespace, key, payload.model_dump_json().encode())
+
+    def store_body(self, request: Request, namespace: str, key: Hashable, body: bytes) -> Response:
+        """Cache an already encoded JSON body and respond to the current request."""
+        entry = CachedResponse(
+            body=body,
+            etag='"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest(),
+        )
+        if len(body) <= self._cache.maxsize and not self._maybe_stale(request, namespace):
+            with self._lock:
+                self._cache[(namespace, key)] = entry
+        return self.respond(request, entry)
+
+    def _maybe_stale(self, request: Request, namespace: str) -> bool:
+        """Served by a replica that may still lag behind the write that invalidated namespace."""
+        if self.replica_lag <= 0 or getattr(request.state, "db_replica", None) is None:
+            return False
+        since = time.monotonic() - self.replica_lag
+        return max(self._invalidated.get(namespace, 0.0), self._invalidated.get(None, 0.0)) > since
+
+    def invalidate(self, namespace: str):
+        with self._lock:
+            self._invalidated[namespace] = time.monotonic()
+            for cache_key in [k for k in self._cache.keys() if k[0] == namespace]:
+                self._cache.pop(cache_key, None)
+
+    def discard(self, namespace: str, key: Hashable):
+        with self._lock:
+            self._invalidated[namespace] = time.monotonic()
+            self._cache.pop((namespace, key), None)
+
+    def clear(self):
+        with self._lock:
+            self._invalidated[None] = time.monotonic()
+            self._cache.clear()
+
+    @staticmethod
+    def respond(request: Request, entry: CachedResponse) -> Response:
+        if not_modified(request, entry):
+            return Response(status_code=304, headers=entry.headers)
+        return Response(content=entry.body, media_type="application/json", headers=entry.headers)
+
+
+def not_modified(request: Request, entry: CachedResponse) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in tags or entry.etag in tags
+
+
+response_cache = ResponseCache(
+    max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+    ttl=settings.RESPONSE_CACHE_TTL,
+    replica_lag=settings.DB_REPLICA_MAX_LAG_SECONDS if settings.replica_urls else 0.0,
+)
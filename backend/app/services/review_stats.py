@@ -0,0 +1,135 @@
+# app/services/review_stats.py
+"""
+Incrementally maintained review statistics.
+
+`review_stats` holds one row per (speciesId, locationId) with per-rating counts,
+the rating sum and the total. Writers call increment_stmt() inside the same
+transaction as the review insert, so /reviews/stats is a primary-key lookup.
+
+Rebuild the summaries from user_reviews with:
+
+    python -m app.services.review_stats [--species-id N] [--location-id N]
+"""
+import argparse
+from collections import Counter
+from typing import Iterable, Optional
+
+from sqlalchemy import case, delete, func, insert, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.ReviewStats import ReviewStats
+from app.models.UserReview import UserReview
+
+RATINGS = (1, 2, 3, 4, 5)
+
+
+def increment_stmt(speciesId: int, locationId: int, ratings: Iterable[int]):
+    """
+    Upsert that adds `ratings` to the (speciesId, locationId) summary.
+    Accepts several ratings at once so batched writers apply one statement per key.
+    """
+    counts = Counter(ratings)
+    values = {f"count{r}": counts.get(r, 0) for r in RATINGS}
+    values["ratingSum"] = sum(r * n for r, n in counts.items())
+    values["totalReviews"] = sum(counts.values())
+
+    stmt = pg_insert(ReviewStats).values(speciesId=speciesId, locationId=locationId, **values)
+    return stmt.on_conflict_do_update(
+        index_elements=[ReviewStats.speciesId, ReviewStats.locationId],
+        set_={name: getattr(ReviewStats, name) + stmt.excluded[name] for name in values},
+    )
+
+
+def stats_lookup(speciesId: int, locationId: int):
+    return select(ReviewStats).where(
+        ReviewStats.speciesId == speciesId,
+        ReviewStats.locationId == locationId,
+    )
+
+
+def _grouped_stats(*where):
+    """Summaries summed per locationId; rows carry the ReviewStats column names for stats_to_dict()."""
+    return (
+        select(
+            ReviewStats.locationId,
+            *[func.sum(getattr(ReviewStats, f"count{r}")).label(f"count{r}") for r in RATINGS],
+            func.sum(ReviewStats.ratingSum).label("ratingSum"),
+            func.sum(ReviewStats.totalReviews).label("totalReviews"),
+        )
+        .where(*where)
+        .group_by(ReviewStats.locationId)
+    )
+
+
+def batch_stats_query(pairs: Iterable[tuple[int, int]]):
+    """Summaries for many (speciesId, locationId) pairs in one grouped query over the primary key."""
+    return _grouped_stats(tuple_(ReviewStats.speciesId, ReviewStats.locationId).in_(list(pairs)))
+
+
+def species_stats_query(speciesId: int):
+    """Per-location summaries for every location of a species (primary-key prefix scan)."""
+    return _grouped_stats(ReviewStats.speciesId == speciesId)
+
+
+def stats_to_dict(row: Optional[ReviewStats]) -> dict:
+    """Render a summary row in the /reviews/stats response shape."""
+    if row is None or not row.totalReviews:
+        return {
+            "averageRating": 0.0,
+            "totalReviews": 0,
+            "ratingDistribution": {5: 0, 4: 0, 3: 0, 2: 0, 1: 0},
+        }
+    return {
+        "averageRating": round(row.ratingSum / row.totalReviews, 2),
+        "totalReviews": int(row.totalReviews),
+        "ratingDistribution": {r: int(getattr(row, f"count{r}")) for r in reversed(RATINGS)},
+    }
+
+
+def rebuild(db: Session, speciesId: Optional[int] = None, locationId: Optional[int] = None) -> int:
+    """
+    Recompute summaries from user_reviews, optionally scoped to one species/location.
+    Locks review_stats so concurrent submissions wait and are applied on top of the rebuilt rows.
+    Returns the number of summary rows written.
+    """
+    db.execute(text("LOCK TABLE review_stats IN EXCLUSIVE MODE"))
+
+    scope_stats = delete(ReviewStats)
+    source = select(
+        UserReview.speciesId,
+        UserReview.locationId,
+        *[func.count(case((UserReview.rating == r, 1))).label(f"count{r}") for r in RATINGS],
+        func.coalesce(func.sum(UserReview.rating), 0).label("ratingSum"),
+        func.count(UserReview.id).label("totalReviews"),
+    ).group_by(UserReview.speciesId, UserReview.locationId)
+
+    if speciesId is not None:
+        scope_stats = scope_stats.where(ReviewStats.speciesId == speciesId)
+        source = source.where(UserReview.speciesId == speciesId)
+    if locationId is not None:
+        scope_stats = scope_stats.where(ReviewStats.locationId == locationId)
+        source = source.where(UserReview.locationId == locationId)
+
+    db.execute(scope_stats)
+    columns = ["speciesId", "locationId", *[f"count{r}" for r in RATINGS], "ratingSum", "totalReviews"]
+    result = db.execute(insert(ReviewStats).from_select(columns, source))
+    db.commit()
+    return result.rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild review_stats from user_reviews")
+    parser.add_argument("--species-id", type=int, default=None)
+    parser.add_argument("--location-id", type=int, default=None)
+    args = parser.parse_args()
+
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        rows = rebuild(db, args.species_id, args.location_id)
+    print(f"review_stats rebuilt: {rows} rows")
+
+
+if __name__ == "__main__":
+    main()
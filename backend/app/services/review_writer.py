@@ -0,0 +1,250 @@
+# app/services/review_writer.py
+"""
+Write-behind batching for review submissions (REVIEW_WRITE_BEHIND).
+
+submit_review validates the form and stores images as usual, then hands the review
+to review_writer instead of committing it. A flusher thread collects submissions
+until REVIEW_FLUSH_ROWS are waiting or REVIEW_FLUSH_MS has passed since the first
+one, and writes them in one transaction: a multi-row INSERT into user_reviews, one
+increment_stmt per (speciesId, locationId) and one reference upsert per image blob.
+A burst of N reviews costs about N / REVIEW_FLUSH_ROWS commits instead of N.
+
+REVIEW_ACK sets when the client gets its answer:
+  "commit"  after the review's batch has committed (group commit). A row that fails
+            (e.g. unknown locationId) is retried alone and fails only its own request.
+  "queued"  202 as soon as the review is buffered. A crash loses whatever is still
+            buffered, and failed rows are only logged.
+
+The buffer holds at most REVIEW_QUEUE_MAX reviews; when it is full a submission waits
+up to REVIEW_QUEUE_TIMEOUT_MS for room, then gets 503 with Retry-After. A "commit"
+submission whose batch has not committed within REVIEW_COMMIT_TIMEOUT_MS also gets
+503. main.lifespan calls drain() on shutdown so buffered reviews are written before
+the engines close; submissions are refused from then on, and anything still buffered
+when the flusher stops is failed rather than left waiting.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.db import session as db_session
+from app.models.UserReview import UserReview
+from app.services.image_store import add_ref_stmt
+from app.services.metrics import metrics
+from app.services.response_cache import response_cache
+from app.services.review_stats import increment_stmt
+from app.services.thumbnails import thumbnail_worker
+
+logger = logging.getLogger(__name__)
+
+COMMIT, QUEUED = "commit", "queued"
+_STOP = object()
+
+
+@dataclass
+class PendingReview:
+    row: dict            # user_reviews column values
+    images: list[dict]   # saved image metadata (blob references, thumbnail jobs)
+    future: Future
+
+
+def review_row(review: UserReview) -> dict:
+    return {c.key: getattr(review, c.key) for c in UserReview.__table__.columns}
+
+
+def _busy(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=detail, headers={"Retry-After": "1"},
+    )
+
+
+class ReviewWriter:
+    def __init__(self, enabled: bool, flush_rows: int, flush_ms: float, max_queue: int,
+                 queue_timeout_ms: float, ack: str, commit_timeout_ms: float = 10_000.0):
+        if ack not in (COMMIT, QUEUED):
+            raise ValueError(f"REVIEW_ACK must be {COMMIT!r} or {QUEUED!r}, got {ack!r}")
+        self.enabled = enabled
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_ms / 1000
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.commit_timeout = commit_timeout_ms / 1000
+        self.ack = ack
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        # submissions put under the lock, so none can land behind drain()'s _STOP
+        self._room = threading.Condition(self._lock)
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    # -------- submitting --------
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="review-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, review: UserReview, images: list[dict], wait: bool = True) -> Future:
+        """
+        Buffer one review. The future resolves once its batch is committed. With
+        wait=False a full buffer raises queue.Full instead of blocking.
+        """
+        item = PendingReview(review_row(review), images, Future())
+        with self._room:
+            if wait and not self._room.wait_for(lambda: self._closed or not self._queue.full(), self.queue_timeout):
+                metrics.review_writes.inc("rejected")
+                raise _busy("Too many pending reviews, retry shortly")
+            if self._closed:
+                raise _busy("Server is shutting down, retry shortly")
+            self._start()
+            self._queue.put_nowait(item)
+        metrics.review_queue.set(value=self._queue.qsize())
+        return item.future
+
+    async def submit_async(self, review: UserReview, images: list[dict]) -> Future:
+        try:
+            return self.submit(review, images, wait=False)
+        except queue.Full:
+            # wait for room off the event loop
+            return await run_in_threadpool(self.submit, review, images)
+
+    def wait(self, future: Future):
+        """Block until the review's batch commits; 503 after REVIEW_COMMIT_TIMEOUT_MS."""
+        try:
+            future.result(timeout=self.commit_timeout)
+        except FutureTimeout:
+            metrics.review_writes.inc("timeout")
+            raise _busy("Review not confirmed in time, retry shortly")
+
+    async def wait_async(self, future: Future):
+        try:
+            # shield: a timeout must not cancel the future the flusher will resolve
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.commit_timeout)
+        except asyncio.TimeoutError:
+            metrics.review_writes.inc("timeout")
+            raise _busy("Review not confirmed in time, retry shortly")
+
+    # -------- flushing --------
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.flush_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            with self._room:
+                self._room.notify_all()
+            self._flush(batch)
+            metrics.review_queue.set(value=self._queue.qsize())
+        self._reject_remaining()
+
+    def _reject_remaining(self):
+        """Fail whatever is still buffered once the flusher has stopped."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP:
+                metrics.review_writes.inc("rejected")
+                item.future.set_exception(_busy("Server is shutting down, retry shortly"))
+
+    def _flush(self, batch: list[PendingReview]):
+        try:
+            self._write(batch)
+            error = None
+        except Exception as exc:
+            error = exc
+        if error is not None and len(batch) > 1:
+            # isolate the failing row(s); the rest still go in
+            logger.warning("Review batch of %d failed (%s); retrying row by row", len(batch), error)
+            for item in batch:
+                self._flush([item])
+            return
+        if error is not None:
+            metrics.review_writes.inc("failed")
+            logger.error("Review %s could not be written", batch[0].row["id"], exc_info=error)
+            batch[0].future.set_exception(error)
+            return
+        for species_id in {item.row["speciesId"] for item in batch}:
+            response_cache.discard("species_full", species_id)
+        metrics.review_writes.inc("written", amount=len(batch))
+        metrics.review_batch_rows.observe(len(batch))
+        for item in batch:
+            item.future.set_result(None)
+            try:
+                thumbnail_worker.enqueue(item.row["id"], item.images)
+            except Exception:
+                # must not take the flusher thread down with it
+                logger.exception("Could not queue thumbnails for review %s", item.row["id"])
+
+    @staticmethod
+    def _write(batch: list[PendingReview]):
+        ratings: dict[tuple[int, int], list[int]] = defaultdict(list)
+        blobs: dict[str, list] = {}
+        for item in batch:
+            ratings[item.row["speciesId"], item.row["locationId"]].append(item.row["rating"])
+            for meta in item.images:
+                entry = blobs.setdefault(meta["blob"].sha256, [meta["blob"], 0])
+                entry[1] += 1
+        with db_session.SessionLocal() as db:
+            db.execute(insert(UserReview), [item.row for item in batch])
+            # fixed key order, so concurrent batches from other workers can't deadlock
+            for (species_id, location_id), values in sorted(ratings.items()):
+                db.execute(increment_stmt(species_id, location_id, values))
+            for _, (blob, count) in sorted(blobs.items()):
+                db.execute(add_ref_stmt(blob, count))
+            db.commit()
+
+    # -------- shutdown --------
+    def drain(self, timeout: float) -> int:
+        """Stop accepting reviews and write everything buffered. Returns how many were pending."""
+        with self._room:
+            self._closed = True
+            self._room.notify_all()
+            thread = self._thread
+        if thread is None:
+            return 0
+        pending = self._queue.qsize()
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(max(deadline - time.monotonic(), 0))
+        if thread.is_alive():
+            logger.error("Shutdown with %d reviews still buffered", self._queue.qsize())
+        elif pending:
+            logger.info("Wrote %d buffered reviews on shutdown", pending)
+        return pending
+
+
+review_writer = ReviewWriter(
+    enabled=settings.REVIEW_WRITE_BEHIND,
+    flush_rows=settings.REVIEW_FLUSH_ROWS,
+    flush_ms=settings.REVIEW_FLUSH_MS,
+    max_queue=settings.REVIEW_QUEUE_MAX,
+    queue_timeout_ms=settings.REVIEW_QUEUE_TIMEOUT_MS,
+    ack=settings.REVIEW_ACK,
+    commit_timeout_ms=settings.REVIEW_COMMIT_TIMEOUT_MS,
+)
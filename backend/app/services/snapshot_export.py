@@ -0,0 +1,372 @@
+# app/services/snapshot_export.py
+"""
+Columnar snapshots of species, locations and user_reviews for analytics.
+
+    python -m app.services.snapshot_export            # reviews since the last snapshot
+    python -m app.services.snapshot_export --full     # every review
+
+Each run writes EXPORT_DIR/<snapshotId>/:
+    manifest.json
+    species.parquet, locations.parquet                full copies
+    reviews/speciesId=<id>/month=<YYYY-MM>/part.parquet
+The review partitions use Hive naming, so pyarrow.dataset, DuckDB or Spark read
+"*/reviews" across snapshots as one table with speciesId and month columns.
+EXPORT_FORMAT=arrow writes Arrow IPC files (.arrow) instead.
+
+All three tables are read in one REPEATABLE READ transaction (on a replica when one
+is configured) through server-side cursors, EXPORT_BATCH_ROWS rows at a time.
+Reviews come in (timestamp, id) order off ix_user_reviews_timestamp_id, so a month's
+partitions are complete once the cursor reaches the next month and their files are
+closed. Rows are buffered per partition and written as row groups of
+EXPORT_ROW_GROUP_ROWS; past EXPORT_MAX_BUFFERED_ROWS the largest buffer is written
+early, so memory stays bounded however many species there are.
+
+Incremental runs export the reviews with previous watermark < timestamp <= watermark.
+The watermark trails the clock by EXPORT_WATERMARK_LAG_SECONDS: timestamps are set
+by the app before commit (and before a write-behind flush), so the newest ones are
+left for the next run rather than missed. A snapshot is written to <snapshotId>.part
+and renamed when complete; /exports only lists finished ones.
+"""
+import argparse
+import os
+import re
+import shutil
+import tarfile
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional
+
+import orjson
+from sqlalchemy import ARRAY, BigInteger, Boolean, DateTime, Float, Integer, select
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.core.config import settings
+from app.models.Location import Location
+from app.models.Specie import Specie
+from app.models.UserReview import UserReview
+
+PARQUET, ARROW = "parquet", "arrow"
+MANIFEST = "manifest.json"
+PARTIAL = ".part"
+# UTC start time; a run starting in the same second as an earlier one gets -01, -02, ...
+SNAPSHOT_ID = re.compile(r"^\d{8}T\d{6}Z(-\d{2})?$")
+MAX_SAME_SECOND = 99
+
+SPECIES_EXPORT_COLUMNS = tuple(c for c in Specie.__table__.columns if c.key != "searchVector")
+LOCATION_EXPORT_COLUMNS = tuple(Location.__table__.columns)
+REVIEW_EXPORT_COLUMNS = tuple(UserReview.__table__.columns)
+
+
+def _pyarrow():
+    # imported on first export; the API process only serves finished files
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    return pyarrow
+
+
+def arrow_type(pa, sql_type):
+    if isinstance(sql_type, ARRAY):
+        return pa.list_(arrow_type(pa, sql_type.item_type))
+    if isinstance(sql_type, BigInteger):
+        return pa.int64()
+    if isinstance(sql_type, Integer):
+        return pa.int32()
+    if isinstance(sql_type, Float):
+        return pa.float64()
+    if isinstance(sql_type, Boolean):
+        return pa.bool_()
+    if isinstance(sql_type, DateTime):
+        return pa.timestamp("us")
+    # strings, and JSONB as JSON text
+    return pa.string()
+
+
+def export_reviews_query(since: Optional[datetime], until: datetime):
+    stmt = select(*REVIEW_EXPORT_COLUMNS).where(UserReview.timestamp <= until)
+    if since is not None:
+        stmt = stmt.where(UserReview.timestamp > since)
+    return stmt.order_by(UserReview.timestamp, UserReview.id)
+
+
+# -----------------------
+# Writing
+# -----------------------
+class ColumnarWriter:
+    """One table's output files; rows are buffered per file and written as row groups."""
+
+    def __init__(self, root: str, columns: Iterable, fmt: str, row_group_rows: int, max_buffered_rows: int):
+        if fmt not in (PARQUET, ARROW):
+            raise ValueError(f"EXPORT_FORMAT must be {PARQUET!r} or {ARROW!r}, got {fmt!r}")
+        self.pa = _pyarrow()
+        columns = list(columns)
+        self.schema = self.pa.schema([(c.key, arrow_type(self.pa, c.type)) for c in columns])
+        self.json_columns = [i for i, c in enumerate(columns) if isinstance(c.type, JSONB)]
+        self.root = root
+        self.fmt = fmt
+        self.row_group_rows = row_group_rows
+        self.max_buffered_rows = max_buffered_rows
+        self.rows = 0
+        self.files: list[str] = []  # relative to root, in the order they were opened
+        self._buffers: dict[str, list] = {}
+        self._buffered = 0
+        self._writers: dict[str, object] = {}
+        self._closed: set[str] = set()
+
+    def add(self, path: str, rows: list):
+        buffer = self._buffers.setdefault(path, [])
+        buffer.extend(rows)
+        self._buffered += len(rows)
+        if len(buffer) >= self.row_group_rows:
+            self._write(path)
+        while self._buffered > self.max_buffered_rows:
+            self._write(max(self._buffers, key=lambda p: len(self._buffers[p])))
+
+    def create(self, path: str):
+        """Open `path` now, so it exists (with the schema) even if no rows arrive."""
+        if path not in self._writers:
+            self._writers[path] = self._open(path)
+            self.files.append(path)
+
+    def close(self, paths: Optional[Iterable[str]] = None):
+        """Write what is buffered for `paths` (default: all) and finish their files."""
+        for path in list(set(self._buffers) | set(self._writers) if paths is None else paths):
+            self._write(path)
+            writer = self._writers.pop(path, None)
+            if writer is not None:
+                writer.close()
+                self._closed.add(path)
+
+    def _write(self, path: str):
+        rows = self._buffers.pop(path, None)
+        if not rows:
+            return
+        self._buffered -= len(rows)
+        writer = self._writers.get(path)
+        if writer is None:
+            if path in self._closed:
+                raise RuntimeError(f"{path} was already finished; rows must arrive in partition order")
+            writer = self._writers[path] = self._open(path)
+            self.files.append(path)
+        table = self._table(rows)
+        if self.fmt == PARQUET:
+            writer.write_table(table, row_group_size=self.row_group_rows)
+        else:
+            writer.write_table(table, max_chunksize=self.row_group_rows)
+        self.rows += len(rows)
+
+    def _open(self, path: str):
+        full = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        if self.fmt == PARQUET:
+            return self.pa.parquet.ParquetWriter(full, self.schema, compression="zstd")
+        return self.pa.ipc.new_file(full, self.schema)
+
+    def _table(self, rows: list):
+        columns = list(zip(*rows))
+        for i in self.json_columns:
+            columns[i] = [None if v is None else orjson.dumps(v).decode() for v in columns[i]]
+        arrays = [self.pa.array(values, type=field.type) for values, field in zip(columns, self.schema)]
+        return self.pa.Table.from_arrays(arrays, schema=self.schema)
+
+
+def _batches(db, stmt, batch_rows: int) -> Iterator[list]:
+    """Rows of `stmt` through a server-side cursor, batch_rows at a time."""
+    return db.execute(stmt.execution_options(yield_per=batch_rows)).partitions()
+
+
+def _month(ts: datetime) -> str:
+    return f"{ts:%Y-%m}"
+
+
+class SnapshotExporter:
+    def __init__(self, out_dir: str, fmt: str = PARQUET, batch_rows: int = 10_000,
+                 row_group_rows: int = 100_000, max_buffered_rows: int = 500_000,
+                 watermark_lag_seconds: float = 60.0):
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.batch_rows = batch_rows
+        self.row_group_rows = row_group_rows
+        self.max_buffered_rows = max_buffered_rows
+        self.watermark_lag = timedelta(seconds=watermark_lag_seconds)
+
+    def _writer(self, root: str, columns) -> ColumnarWriter:
+        return ColumnarWriter(root, columns, self.fmt, self.row_group_rows, self.max_buffered_rows)
+
+    # -------- exporting --------
+    def export(self, db, full: bool = False) -> dict:
+        """Write a snapshot and return its manifest. `db` should be a fresh session."""
+        previous = None if full else self.latest()
+        since = datetime.fromisoformat(previous["watermark"]) if previous else None
+        now = datetime.utcnow()
+        until = now - self.watermark_lag
+        snapshot_id, work = self._claim(f"{now:%Y%m%dT%H%M%SZ}")
+        final = os.path.join(self.out_dir, snapshot_id)
+        try:
+            # one snapshot of all three tables
+            db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            tables = {
+                "species": self._export_table(
+                    db, work, "species", SPECIES_EXPORT_COLUMNS,
+                    select(*SPECIES_EXPORT_COLUMNS).order_by(Specie.speciesId),
+                ),
+                "locations": self._export_table(
+                    db, work, "locations", LOCATION_EXPORT_COLUMNS,
+                    select(*LOCATION_EXPORT_COLUMNS).order_by(Location.speciesId, Location.id),
+                ),
+                "reviews": self._export_reviews(db, work, since, until),
+            }
+            db.rollback()
+            manifest = {
+                "snapshotId": snapshot_id,
+                "format": self.fmt,
+                "incremental": since is not None,
+                "since": since.isoformat() if since else None,
+                "watermark": until.isoformat(),
+                "createdAt": now.isoformat(),
+                "tables": tables,
+            }
+            with open(os.path.join(work, MANIFEST), "wb") as f:
+                f.write(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+            os.rename(work, final)
+        except BaseException:
+            shutil.rmtree(work, ignore_errors=True)
+            raise
+        return manifest
+
+    def _claim(self, base: str) -> tuple[str, str]:
+        """A snapshot id no other run has taken, and its freshly created work directory."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        for n in range(MAX_SAME_SECOND + 1):
+            snapshot_id = f"{base}-{n:02d}" if n else base
+            final = os.path.join(self.out_dir, snapshot_id)
+            try:
+                # the .part directory is the lock: creating it fails if another run holds the id
+                os.mkdir(final + PARTIAL)
+            except FileExistsError:
+                continue
+            if not os.path.exists(final):
+                return snapshot_id, final + PARTIAL
+            os.rmdir(final + PARTIAL)
+        raise RuntimeError(f"More than {MAX_SAME_SECOND} snapshots started at {base}")
+
+    def _export_table(self, db, root: str, name: str, columns, stmt) -> dict:
+        writer = self._writer(root, columns)
+        path = f"{name}.{self.fmt}"
+        writer.create(path)
+        for batch in _batches(db, stmt, self.batch_rows):
+            writer.add(path, batch)
+        writer.close()
+        return {"rows": writer.rows, "files": writer.files}
+
+    def _export_reviews(self, db, root: str, since: Optional[datetime], until: datetime) -> dict:
+        writer = self._writer(root, REVIEW_EXPORT_COLUMNS)
+        open_months: dict[str, set[str]] = defaultdict(set)
+        for batch in _batches(db, export_reviews_query(since, until), self.batch_rows):
+            parts: dict[str, list] = defaultdict(list)
+            for row in batch:
+                month = _month(row.timestamp)
+                path = f"reviews/speciesId={row.speciesId}/month={month}/part.{self.fmt}"
+                parts[path].append(row)
+                open_months[month].add(path)
+            for path, rows in parts.items():
+                writer.add(path, rows)
+            # rows come in timestamp order: earlier months are complete
+            current = _month(batch[-1].timestamp)
+            for month in [m for m in open_months if m < current]:
+                writer.close(open_months.pop(month))
+        writer.close()
+        return {"rows": writer.rows, "files": writer.files, "partitions": len(writer.files)}
+
+    # -------- finished snapshots --------
+    def snapshot_dir(self, snapshot_id: str) -> Optional[str]:
+        """Directory of a finished snapshot; None for unknown (or malformed) ids."""
+        if not SNAPSHOT_ID.match(snapshot_id):
+            return None
+        path = os.path.join(self.out_dir, snapshot_id)
+        return path if os.path.isfile(os.path.join(path, MANIFEST)) else None
+
+    def manifest(self, snapshot_id: str) -> Optional[dict]:
+        path = self.snapshot_dir(snapshot_id)
+        if path is None:
+            return None
+        with open(os.path.join(path, MANIFEST), "rb") as f:
+            return orjson.loads(f.read())
+
+    def snapshot_ids(self) -> list[str]:
+        """Finished snapshots, oldest first."""
+        try:
+            names = os.listdir(self.out_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(name for name in names if self.snapshot_dir(name) is not None)
+
+    def latest(self) -> Optional[dict]:
+        ids = self.snapshot_ids()
+        return self.manifest(ids[-1]) if ids else None
+
+
+# -----------------------
+# Streamed download
+# -----------------------
+def manifest_files(manifest: dict) -> list[str]:
+    return [MANIFEST] + [path for table in manifest["tables"].values() for path in table["files"]]
+
+
+def tar_stream(root: str, prefix: str, files: list[str], chunk_size: int = 1 << 20) -> tuple[int, Iterator[bytes]]:
+    """
+    An uncompressed tar of `files` (relative to root) under `prefix`/, generated a chunk
+    at a time. Returns the total size up front so the response can carry a Content-Length.
+    """
+    entries = []
+    for path in files:
+        full = os.path.join(root, path)
+        stat = os.stat(full)
+        info = tarfile.TarInfo(f"{prefix}/{path}")
+        info.size, info.mtime, info.mode = stat.st_size, int(stat.st_mtime), 0o644
+        entries.append((full, info.tobuf(format=tarfile.PAX_FORMAT), stat.st_size))
+    end = b"\0" * (2 * tarfile.BLOCKSIZE)
+    total = sum(len(header) + size + (-size % tarfile.BLOCKSIZE) for _, header, size in entries) + len(end)
+
+    def generate():
+        for full, header, size in entries:
+            yield header
+            with open(full, "rb") as f:
+                while chunk := f.read(chunk_size):
+                    yield chunk
+            if size % tarfile.BLOCKSIZE:
+                yield b"\0" * (-size % tarfile.BLOCKSIZE)
+        yield end
+
+    return total, generate()
+
+
+snapshot_exporter = SnapshotExporter(
+    out_dir=settings.EXPORT_DIR,
+    fmt=settings.EXPORT_FORMAT,
+    batch_rows=settings.EXPORT_BATCH_ROWS,
+    row_group_rows=settings.EXPORT_ROW_GROUP_ROWS,
+    max_buffered_rows=settings.EXPORT_MAX_BUFFERED_ROWS,
+    watermark_lag_seconds=settings.EXPORT_WATERMARK_LAG_SECONDS,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a columnar snapshot of species, locations and reviews")
+    parser.add_argument("--full", action="store_true", help="export every review, not just those since the last snapshot")
+    parser.add_argument("--primary", action="store_true", help="read from the primary even when replicas are configured")
+    args = parser.parse_args()
+
+    from app.db.session import SessionLocal, replicas
+
+    replica = None if args.primary or not replicas else replicas.pick()
+    with (replica.SessionLocal if replica is not None else SessionLocal)() as db:
+        manifest = snapshot_exporter.export(db, full=args.full)
+    print(f"{manifest['snapshotId']}: since {manifest['since'] or 'the beginning'}, up to {manifest['watermark']}")
+    for name, table in manifest["tables"].items():
+        print(f"  {name:<10} {table['rows']:>10} rows in {len(table['files'])} files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# app/services/spatial_index.py
+"""
+In-process grid index over Location latitude/longitude.
+
+Points are bucketed into fixed-size lat/lon cells and kept sorted by cell key,
+so a bounding box becomes one binary search per grid row followed by an exact
+filter on the candidates. The index is built from the `locations` table on first
+use, takes incremental inserts from create_location, and is reloaded after
+SPATIAL_INDEX_TTL seconds so other workers' inserts become visible.
+NumPy is imported on first use, not at startup.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Iterable, Optional
+
+from app.core.boot import lazy_import
+from app.core.config import settings
+
+np = lazy_import("numpy")
+
+EARTH_RADIUS_M = 6_371_008.8
+
+
+class LocationIndex:
+    def __init__(self, cell_deg: float = 0.05, ttl: float = 300.0, merge_every: int = 1024):
+        self.cell_deg = cell_deg
+        self.ttl = ttl
+        self.merge_every = merge_every
+        self.n_cols = int(math.ceil(360.0 / cell_deg))
+        self.n_rows = int(math.ceil(180.0 / cell_deg))
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        # arrays are built by load(); queries always load first
+        self.keys = self.ids = self.species = self.lat = self.lon = None
+        self._pending: list[tuple[int, int, float, float]] = []
+
+    # -------- building --------
+    def _cell_rows_cols(self, lat, lon):
+        row = np.clip(((np.asarray(lat) + 90.0) // self.cell_deg).astype(np.int64), 0, self.n_rows - 1)
+        col = np.clip(((np.asarray(lon) + 180.0) // self.cell_deg).astype(np.int64), 0, self.n_cols - 1)
+        return row, col
+
+    def _set_arrays(self, ids, species, lat, lon):
+        row, col = self._cell_rows_cols(lat, lon)
+        keys = row * self.n_cols + col
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.ids = ids[order]
+        self.species = species[order]
+        self.lat = lat[order]
+        self.lon = lon[order]
+
+    def needs_load(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def load(self, rows: Iterable[tuple]):
+        """rows: iterable of (id, speciesId, latitude, longitude)."""
+        rows = list(rows)
+        with self._lock:
+            if rows:
+                ids, species, lat, lon = (np.asarray(c) for c in zip(*rows))
+                self._set_arrays(ids.astype(np.int64), species.astype(np.int64),
+                                 lat.astype(np.float64), lon.astype(np.float64))
+            else:
+                self._set_arrays(np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0), np.empty(0))
+            self._pending = []
+            self._loaded_at = time.monotonic()
+
+    def add(self, location_id: int, species_id: int, lat: float, lon: float):
+        """Register a freshly inserted location without a full reload."""
+        with self._lock:
+            if self._loaded_at is None:
+                return  # not built yet; the first query loads everything from the DB
+            self._pending.append((location_id, species_id, lat, lon))
+            if len(self._pending) >= self.merge_every:
+                self._merge_pending()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _merge_pending(self):
+        ids, species, lat, lon = (np.asarray(c) for c in zip(*self._pending))
+        self._set_arrays(
+            np.concatenate([self.ids, ids.astype(np.int64)]),
+            np.concatenate([self.species, species.astype(np.int64)]),
+            np.concatenate([self.lat, lat.astype(np.float64)]),
+            np.concatenate([self.lon, lon.astype(np.float64)]),
+        )
+        self._pending = []
+
+    # -------- querying --------
+    def _snapshot(self):
+        with self._lock:
+            if self._pending:
+                self._merge_pending()
+            return self.keys, self.ids, self.species, self.lat, self.lon
+
+    def _candidates(self, keys, min_lat, min_lon, max_lat, max_lon) -> np.ndarray:
+        """Indices (into the sorted arrays) of points whose cell intersects the box."""
+        (r0, r1), (c0, c1) = self._cell_rows_cols([min_lat, max_lat], [min_lon, max_lon])
+        rows = np.arange(r0, r1 + 1, dtype=np.int64)
+        starts = np.searchsorted(keys, rows * self.n_cols + c0, side="left")
+        ends = np.searchsorted(keys, rows * self.n_cols + c1, side="right")
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, np.int64)
+        # concatenate the [start, end) ranges without a Python loop
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        return offsets + np.arange(total, dtype=np.int64)
+
+    def bbox_arrays(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                    species_id: Optional[int] = None):
+        """(ids, species, lat, lon) arrays of the points inside the box."""
+        keys, ids, species, lat, lon = self._snapshot()
+        if min_lon > max_lon:
+            # box crosses the antimeridian
+            boxes = [(min_lon, 180.0), (-180.0, max_lon)]
+        else:
+            boxes = [(min_lon, max_lon)]
+        result = []
+        for lo, hi in boxes:
+            idx = self._candidates(keys, min_lat, lo, max_lat, hi)
+            mask = (lat[idx] >= min_lat) & (lat[idx] <= max_lat) & (lon[idx] >= lo) & (lon[idx] <= hi)
+            if species_id is not None:
+                mask &= species[idx] == species_id
+            result.append(idx[mask])
+        idx = np.concatenate(result)
+        return ids[idx], species[idx], lat[idx], lon[idx]
+
+    def bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+             species_id: Optional[int] = None, limit: Optional[int] = None) -> list[int]:
+        out = self.bbox_arrays(min_lat, min_lon, max_lat, max_lon, species_id)[0]
+        if limit is not None:
+            out = out[:limit]
+        return out.tolist()
+
+    def nearby(self, lat0: float, lon0: float, radius_m: float,
+               species_id: Optional[int] = None, limit: Optional[int] = None) -> list[tuple[int, float]]:
+        """Return (id, distance_m) pairs within radius_m, nearest first."""
+        keys, ids, species, lat, lon = self._snapshot()
+        dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+        min_lat, max_lat = max(lat0 - dlat, -90.0), min(lat0 + dlat, 90.0)
+        cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+        if cos_lat < 1e-6 or radius_m / (EARTH_RADIUS_M * cos_lat) >= math.pi:
+            boxes = [(-180.0, 180.0)]
+        else:
+            dlon = math.degrees(radius_m / (EARTH_RADIUS_M * cos_lat))
+            lo, hi = lon0 - dlon, lon0 + dlon
+            if lo < -180.0:
+                boxes = [(lo + 360.0, 180.0), (-180.0, hi)]
+            elif hi > 180.0:
+                boxes = [(lo, 180.0), (-180.0, hi - 360.0)]
+            else:
+                boxes = [(lo, hi)]
+        idx = np.concatenate([self._candidates(keys, min_lat, lo, max_lat, hi) for lo, hi in boxes])
+        if species_id is not None:
+            idx = idx[species[idx] == species_id]
+        dist = haversine_m(lat0, lon0, lat[idx], lon[idx])
+        inside = dist <= radius_m
+        idx, dist = idx[inside], dist[inside]
+        order = np.argsort(dist, kind="stable")
+        if limit is not None:
+            order = order[:limit]
+        return list(zip(ids[idx[order]].tolist(), dist[order].tolist()))
+
+
+def haversine_m(lat0: float, lon0: float, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    p0, p = math.radians(lat0), np.radians(lat)
+    dphi = p - p0
+    dlmb = np.radians(lon) - math.radians(lon0)
+    a = np.sin(dphi / 2) ** 2 + math.cos(p0) * np.cos(p) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def mercator(lat, lon):
+    """Normalized Web Mercator coordinates in [0, 1), y growing southwards."""
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)
+    mx = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0
+    my = (1.0 - np.log(np.tan(np.radians(lat)) + 1.0 / np.cos(np.radians(lat))) / math.pi) / 2.0
+    return mx, my
+
+
+def inverse_mercator(mx, my):
+    """(lat, lon) arrays for normalized Web Mercator coordinates."""
+    lon = np.asarray(mx, dtype=np.float64) * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(math.pi * (1.0 - 2.0 * np.asarray(my, dtype=np.float64)))))
+    return lat, lon
+
+
+location_index = LocationIndex(cell_deg=settings.SPATIAL_CELL_DEG, ttl=settings.SPATIAL_INDEX_TTL)
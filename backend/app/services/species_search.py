@@ -0,0 +1,175 @@
+# app/services/species_search.py
+"""
+Species full-text search and typeahead.
+
+/species/search matches the accent-folded tsvector in species."searchVector"
+(names weighted A, color/habitat/characteristics B, description C; GIN-indexed).
+Every query word must match and the last one may be a prefix, so "hoa se" already
+finds "Hoa Sen". Results are ordered by ts_rank_cd, then name.
+
+/species/suggest never touches the database: SuggestIndex keeps the folded name,
+scientific name and every word suffix of them ("hoa sen dong thap", "sen dong
+thap", ...) in sorted lists, so a keystroke is a few binary searches. create_specie
+adds to it in place; it is reloaded after SPECIES_INDEX_TTL seconds so other
+workers' inserts show up.
+
+    python -m app.services.species_search "hoa sen"
+"""
+import argparse
+import bisect
+import threading
+import time
+from typing import Iterable, Optional
+
+from sqlalchemy import func, literal_column, select
+
+from app.core.config import settings
+from app.models.Specie import Specie
+from app.services.fast_json import SPECIES_COLUMNS
+from app.services.text_fold import words
+
+SUGGEST_COLUMNS = (Specie.speciesId, Specie.name, Specie.scientificName)
+# ranking classes for suggest matches, best first
+NAME, NAME_WORD, SCIENTIFIC, SCIENTIFIC_WORD = range(4)
+N_CLASSES = 4
+# matches examined per class; bounds the cost of one- or two-letter prefixes
+MAX_SCAN = 1000
+
+
+def tsquery_text(q: str) -> Optional[str]:
+    """to_tsquery input for free text: words ANDed, the last one as a prefix."""
+    terms = words(q)
+    if not terms:
+        return None
+    terms[-1] += ":*"
+    return " & ".join(terms)
+
+
+def search_query(q: str, limit: int):
+    """None when `q` has no searchable words."""
+    text = tsquery_text(q)
+    if text is None:
+        return None
+    query = func.to_tsquery(literal_column("'simple'::regconfig"), text)
+    rank = func.ts_rank_cd(Specie.searchVector, query)
+    return (
+        select(*SPECIES_COLUMNS)
+        .where(Specie.searchVector.op("@@")(query))
+        .order_by(rank.desc(), Specie.name)
+        .limit(limit)
+    )
+
+
+# -----------------------
+# Typeahead
+# -----------------------
+def suggest_terms(name: str, scientific_name: str) -> list[tuple[str, int]]:
+    terms = []
+    for text, whole, word in ((name, NAME, NAME_WORD), (scientific_name, SCIENTIFIC, SCIENTIFIC_WORD)):
+        parts = words(text or "")
+        terms += [(" ".join(parts[i:]), whole if i == 0 else word) for i in range(len(parts))]
+    return terms
+
+
+class SuggestIndex:
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        # per ranking class: sorted terms and the speciesId of each
+        self._keys: list[list[str]] = [[] for _ in range(N_CLASSES)]
+        self._ids: list[list[int]] = [[] for _ in range(N_CLASSES)]
+        self._species: dict[int, tuple[str, str]] = {}
+
+    def needs_load(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def load(self, rows: Iterable[tuple]):
+        """rows: iterable of (speciesId, name, scientificName)."""
+        species = {sid: (name, sci) for sid, name, sci in rows}
+        by_class = [[] for _ in range(N_CLASSES)]
+        for sid, (name, sci) in species.items():
+            for term, cls in suggest_terms(name, sci):
+                by_class[cls].append((term, sid))
+        for pairs in by_class:
+            pairs.sort()
+        with self._lock:
+            self._keys = [[term for term, _ in pairs] for pairs in by_class]
+            self._ids = [[sid for _, sid in pairs] for pairs in by_class]
+            self._species = species
+            self._loaded_at = time.monotonic()
+
+    def add(self, species_id: int, name: str, scientific_name: str):
+        """Register a freshly created species without a full reload."""
+        with self._lock:
+            if self._loaded_at is None:
+                return  # not built yet; the first query loads everything from the DB
+            self._species[species_id] = (name, scientific_name)
+            for term, cls in suggest_terms(name, scientific_name):
+                i = bisect.bisect_left(self._keys[cls], term)
+                self._keys[cls].insert(i, term)
+                self._ids[cls].insert(i, species_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def suggest(self, prefix: str, limit: int = 10) -> list[dict]:
+        """
+        Species whose name or scientific name (or a later word of either) starts with
+        `prefix`. Whole-name matches come first, then name words, then scientific
+        names; shorter names first within a class.
+        """
+        folded = " ".join(words(prefix))
+        if not folded:
+            return []
+        # "hoa " only matches where another word follows "hoa"
+        prefix = folded + " " if prefix[-1].isspace() else folded
+        seen: set[int] = set()
+        result = []
+        with self._lock:
+            species = self._species
+            for keys, ids in zip(self._keys, self._ids):
+                i = bisect.bisect_left(keys, prefix)
+                matches = []
+                for key, sid in zip(keys[i:i + MAX_SCAN], ids[i:i + MAX_SCAN]):
+                    if not key.startswith(prefix):
+                        break
+                    if sid not in seen:
+                        seen.add(sid)
+                        matches.append(sid)
+                matches.sort(key=lambda sid: (len(species[sid][0]), species[sid][0]))
+                result += matches
+                if len(result) >= limit:
+                    break
+            return [
+                {"speciesId": sid, "name": species[sid][0], "scientificName": species[sid][1]}
+                for sid in result[:limit]
+            ]
+
+
+species_suggest = SuggestIndex(ttl=settings.SPECIES_INDEX_TTL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Species search")
+    parser.add_argument("q")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--suggest", action="store_true", help="use the in-memory typeahead index")
+    args = parser.parse_args()
+
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        if args.suggest:
+            species_suggest.load(db.execute(select(*SUGGEST_COLUMNS)).all())
+            for s in species_suggest.suggest(args.q, args.limit):
+                print(f"{s['speciesId']:>6}  {s['name']}  ({s['scientificName']})")
+            return
+        stmt = search_query(args.q, args.limit)
+        for row in db.execute(stmt).all() if stmt is not None else []:
+            print(f"{row.speciesId:>6}  {row.name}  ({row.scientificName})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# app/services/text_fold.py
+"""
+Accent folding for search ("Hoa Sen Đồng Tháp" -> "hoa sen dong thap").
+
+The same letter table is used in Python (queries, the suggest index) and in SQL
+through translate(lower(...)), which unlike unaccent() is immutable and can back
+a generated column without any extension. Text is expected in NFC, as Postgres
+stores it and as fold() normalizes it.
+"""
+import re
+import unicodedata
+
+_LETTERS = {
+    "a": "àáảãạăằắẳẵặâầấẩẫậäå",
+    "e": "èéẻẽẹêềếểễệë",
+    "i": "ìíỉĩịîï",
+    "o": "òóỏõọôồốổỗộơờớởỡợöø",
+    "u": "ùúủũụưừứửữựûü",
+    "y": "ỳýỷỹỵÿ",
+    "d": "đ",
+    "c": "ç",
+    "n": "ñ",
+}
+ACCENTED = "".join(_LETTERS.values())
+UNACCENTED = "".join(base * len(letters) for base, letters in _LETTERS.items())
+_TABLE = str.maketrans(ACCENTED, UNACCENTED)
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def fold(text: str) -> str:
+    return unicodedata.normalize("NFC", text).lower().translate(_TABLE)
+
+
+def words(text: str) -> list[str]:
+    """Folded alphanumeric words; anything else is a separator."""
+    return _WORD.findall(fold(text))
+
+
+def fold_sql(expr: str) -> str:
+    """SQL equivalent of fold() for a text expression."""
+    return f"translate(lower({expr}), '{ACCENTED}', '{UNACCENTED}')"
@@ -0,0 +1,304 @@
+# app/services/thumbnails.py
+"""
+Background thumbnail / web-derivative generation for review images.
+
+submit_review stores images with "status": "pending" and hands them to
+thumbnail_worker.enqueue() after commit. Resizing runs on a process pool so it
+never competes with request handling; when a job finishes the review's images
+JSON is patched in place (thumbnailUrl, webUrl, status "ready" / "failed").
+
+Each pending image carries a claim ("claimedUntil", THUMBNAIL_CLAIM_SECONDS ahead)
+taken by the worker that queued it. Every API worker runs resume_pending on startup
+and then every THUMBNAIL_CLAIM_SECONDS: it locks the pending reviews nobody else is
+scanning (FOR UPDATE SKIP LOCKED, through a partial index), re-claims the images whose
+claim ran out - left behind by a crash or restart - and queues only those, so no image
+is queued twice while its claim holds. Job results are written to the database from a
+small thread pool, never from the process pool's result thread. Existing uploads can
+be backfilled with:
+
+    python -m app.services.thumbnails backfill
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from app.core.config import settings
+from app.services.image_store import image_store
+
+logger = logging.getLogger(__name__)
+
+DERIVED_DIR = "derived"
+PENDING, READY, FAILED = "pending", "ready", "failed"
+CLAIMED_UNTIL = "claimedUntil"
+# what json.dumps writes for a pending image; matches the partial index ix_user_reviews_pending_images
+PENDING_PATTERN = f'%"status": "{PENDING}"%'
+
+
+# -----------------------
+# Rendering (runs in worker processes)
+# -----------------------
+def render_derivatives(src_path: str, out_dir: str, stem: str, thumb_size: int, web_size: int) -> dict:
+    """
+    Write `<stem>_thumb.jpg` (longest side thumb_size) and `<stem>_web.jpg` (longest side web_size)
+    into out_dir. Returns {"thumb": path, "web": path}. Existing derivatives are reused, so
+    deduplicated uploads (same content hash as stem) are only rendered once.
+    """
+    out = {name: os.path.join(out_dir, f"{stem}_{name}.jpg") for name in ("thumb", "web")}
+    if all(os.path.exists(p) for p in out.values()):
+        return out
+
+    from PIL import Image, ImageOps
+
+    os.makedirs(out_dir, exist_ok=True)
+    with Image.open(src_path) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        for name, size, quality in (("web", web_size, 82), ("thumb", thumb_size, 75)):
+            variant = img.copy()
+            variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+            path = out[name]
+            tmp = f"{path}.part"
+            variant.save(tmp, "JPEG", quality=quality, optimize=True, progressive=True)
+            os.replace(tmp, path)
+    return out
+
+
+# -----------------------
+# Dispatch (API process)
+# -----------------------
+class ThumbnailWorker:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # DB writes for finished jobs; the process pool's callbacks must not block
+        self._recorder: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._resumer: Optional[threading.Thread] = None
+        self.enabled = settings.THUMBNAILS_ENABLED and workers > 0 and _pillow_available()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a threaded server process is not safe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            if self._recorder is None:
+                self._recorder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="thumbnail-status")
+            return self._pool
+
+    def mark_pending(self, images: list[dict]) -> list[dict]:
+        """Tag freshly saved image metadata before it is stored on the review."""
+        if self.enabled:
+            claimed_until = time.time() + settings.THUMBNAIL_CLAIM_SECONDS
+            for meta in images:
+                meta["status"] = PENDING
+                meta[CLAIMED_UNTIL] = claimed_until
+        return images
+
+    def enqueue(self, review_id: str, images: list[dict]) -> list[Future]:
+        if not self.enabled:
+            return []
+        futures = []
+        for meta in images:
+            src = meta.get("local_path") or image_store.path_for(meta["url"])
+            out_dir = os.path.join(os.path.dirname(src), DERIVED_DIR)
+            # content-addressed images share derivatives across reviews
+            stem = meta.get("sha256") or meta["id"]
+            future = self._executor().submit(
+                render_derivatives, src, out_dir, stem,
+                settings.THUMBNAIL_SIZE, settings.WEB_IMAGE_SIZE,
+            )
+            future.add_done_callback(
+                lambda f, image_id=meta["id"]: self._record(review_id, image_id, f)
+            )
+            futures.append(future)
+        return futures
+
+    def _record(self, review_id: str, image_id: str, future: Future):
+        """Done callback; runs on the process pool's management thread, so only hands off."""
+        with self._lock:
+            recorder = self._recorder
+        if recorder is None:
+            self._finish(review_id, image_id, future)
+            return
+        try:
+            recorder.submit(self._finish, review_id, image_id, future)
+        except RuntimeError:
+            # shutting down; the claim lapses and the next resume_pending re-queues it
+            logger.warning("Thumbnail status for review %s image %s not recorded", review_id, image_id)
+
+    def _finish(self, review_id: str, image_id: str, future: Future):
+        if future.cancelled():
+            # still pending; re-queued once its claim lapses
+            return
+        try:
+            paths = future.result()
+            patch = {
+                "status": READY,
+                "thumbnailUrl": image_store.url_for(paths["thumb"]),
+                "webUrl": image_store.url_for(paths["web"]),
+            }
+        except Exception:
+            logger.exception("Thumbnail job failed for review %s image %s", review_id, image_id)
+            patch = {"status": FAILED}
+        try:
+            update_image(review_id, image_id, patch)
+        except Exception:
+            logger.exception("Could not record thumbnail status for review %s", review_id)
+
+    def resume_pending(self) -> int:
+        """Claim and re-queue images whose claim has lapsed. Returns the number queued."""
+        if not self.enabled:
+            return 0
+        from app.db.session import SessionLocal
+        from app.models.UserReview import UserReview
+
+        now = time.time()
+        claimed = []
+        with SessionLocal() as db:
+            # reviews another worker is claiming (or update_image is patching) are skipped
+            reviews = db.query(UserReview).filter(
+                UserReview.images.like(PENDING_PATTERN)
+            ).with_for_update(skip_locked=True).all()
+            for review in reviews:
+                images = json.loads(review.images)
+                lapsed = [m for m in images if m.get("status") == PENDING and m.get(CLAIMED_UNTIL, 0) <= now]
+                if not lapsed:
+                    continue
+                for meta in lapsed:
+                    meta[CLAIMED_UNTIL] = now + settings.THUMBNAIL_CLAIM_SECONDS
+                review.images = json.dumps(images)
+                claimed.append((review.id, lapsed))
+            db.commit()
+        return sum(len(self.enqueue(review_id, images)) for review_id, images in claimed)
+
+    def start_resume(self):
+        """resume_pending now and every THUMBNAIL_CLAIM_SECONDS, on a daemon thread."""
+        with self._lock:
+            if not self.enabled or self._resumer is not None:
+                return
+            self._resumer = threading.Thread(target=self._resume_loop, name="thumbnail-resume", daemon=True)
+            self._resumer.start()
+
+    def _resume_loop(self):
+        while True:
+            try:
+                queued = self.resume_pending()
+                if queued:
+                    logger.info("Re-queued %d pending thumbnail jobs", queued)
+            except Exception:
+                logger.exception("Could not resume pending thumbnail jobs")
+            if self._stop.wait(settings.THUMBNAIL_CLAIM_SECONDS):
+                return
+
+    def shutdown(self, wait: bool = True):
+        self._stop.set()
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=not wait)
+        # after the pool, so the results of the jobs it waited for are still recorded
+        with self._lock:
+            recorder, self._recorder = self._recorder, None
+        if recorder is not None:
+            recorder.shutdown(wait=wait)
+
+
+def update_image(review_id: str, image_id: str, patch: dict):
+    """Merge `patch` into one image entry of a review's images JSON (row-locked)."""
+    from app.db.session import SessionLocal
+    from app.models.UserReview import UserReview
+
+    with SessionLocal() as db:
+        review = db.query(UserReview).filter(UserReview.id == review_id).with_for_update().first()
+        if review is None or not review.images:
+            return
+        images = json.loads(review.images)
+        for meta in images:
+            if meta.get("id") == image_id:
+                meta.update(patch)
+                if meta.get("status") != PENDING:
+                    meta.pop(CLAIMED_UNTIL, None)
+        review.images = json.dumps(images)
+        db.commit()
+
+
+def _pillow_available() -> bool:
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        logger.warning("Pillow is not installed; review thumbnails are disabled")
+        return False
+    return True
+
+
+thumbnail_worker = ThumbnailWorker(settings.THUMBNAIL_WORKERS)
+
+
+# -----------------------
+# Backfill
+# -----------------------
+def backfill(upload_dir: str) -> dict:
+    """
+    Generate derivatives for every review image that isn't ready yet, then for any
+    stray file in upload_dir that has none. Blocks until all jobs finish.
+    """
+    from app.db.session import SessionLocal
+    from app.models.UserReview import UserReview
+
+    counts = {"reviews": 0, "orphans": 0, "failed": 0}
+    futures = []
+    referenced = set()
+    with SessionLocal() as db:
+        rows = db.query(UserReview.id, UserReview.images).filter(UserReview.images.isnot(None)).all()
+    for review_id, images in rows:
+        metas = json.loads(images)
+        referenced.update(m.get("sha256") or m["id"] for m in metas)
+        todo = [m for m in metas if m.get("status") != READY]
+        if todo:
+            counts["reviews"] += 1
+            futures += thumbnail_worker.enqueue(review_id, todo)
+
+    pool = thumbnail_worker._executor()
+    out_dir = os.path.join(upload_dir, DERIVED_DIR)
+    for name in os.listdir(upload_dir):
+        stem, ext = os.path.splitext(name)
+        path = os.path.join(upload_dir, name)
+        if not os.path.isfile(path) or ext.lower() == ".part" or stem in referenced:
+            continue
+        if os.path.exists(os.path.join(out_dir, f"{stem}_thumb.jpg")):
+            continue
+        counts["orphans"] += 1
+        futures.append(pool.submit(
+            render_derivatives, path, out_dir, stem, settings.THUMBNAIL_SIZE, settings.WEB_IMAGE_SIZE
+        ))
+
+    for future in futures:
+        if future.exception() is not None:
+            counts["failed"] += 1
+    thumbnail_worker.shutdown()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Review image derivatives")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--upload-dir", default=os.environ.get("REVIEWS_UPLOAD_DIR", "uploads/reviews"))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if not thumbnail_worker.enabled:
+        raise SystemExit("Thumbnails are disabled (THUMBNAILS_ENABLED=false or Pillow missing)")
+    print(json.dumps(backfill(args.upload_dir)))
+
+
+if __name__ == "__main__":
+    main()
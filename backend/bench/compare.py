@@ -0,0 +1,66 @@
+# bench/compare.py
+"""
+Compare two or more bench.run result files scenario by scenario.
+
+    python -m bench.compare bench/results/base.json bench/results/candidate.json [--metric p95_ms]
+
+The first file is the baseline; every other file is shown with its change relative to it.
+Exits non-zero with --fail-over PCT when any scenario regressed by more than PCT percent.
+"""
+import argparse
+import json
+import sys
+
+HIGHER_IS_BETTER = {"throughput"}
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        report = json.load(f)
+    return {"meta": report["meta"], "results": {r["scenario"]: r for r in report["results"]}}
+
+
+def change(base: float, value: float, metric: str) -> float:
+    """Percent change where positive always means worse."""
+    if not base:
+        return 0.0
+    pct = (value - base) / base * 100
+    return -pct if metric in HIGHER_IS_BETTER else pct
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare benchmark result files")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--metric", default="p95_ms",
+                        choices=["p50_ms", "p95_ms", "p99_ms", "max_ms", "throughput", "queriesPerRequest"])
+    parser.add_argument("--fail-over", type=float, default=None, help="regression threshold in percent")
+    args = parser.parse_args()
+    if len(args.files) < 2:
+        parser.error("need a baseline and at least one file to compare")
+
+    runs = [load(p) for p in args.files]
+    base = runs[0]
+    headers = [f"{r['meta']['label']}@{(r['meta']['commit'] or '')[:8]}" for r in runs]
+    print(f"{args.metric:<22}" + "".join(f"{h:>26}" for h in headers))
+
+    regressed = []
+    for name, base_row in base["results"].items():
+        cells = [f"{base_row.get(args.metric)!s:>26}"]
+        for run in runs[1:]:
+            row = run["results"].get(name)
+            if row is None or row.get(args.metric) is None or base_row.get(args.metric) is None:
+                cells.append(f"{'-':>26}")
+                continue
+            pct = change(base_row[args.metric], row[args.metric], args.metric)
+            if args.fail_over is not None and pct > args.fail_over:
+                regressed.append((name, run["meta"]["label"], pct))
+            cells.append(f"{row[args.metric]!s:>16} ({pct:+6.1f}%)")
+        print(f"{name:<22}" + "".join(cells))
+
+    for name, label, pct in regressed:
+        print(f"REGRESSION {name} [{label}]: {args.metric} {pct:+.1f}%", file=sys.stderr)
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
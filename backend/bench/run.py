@@ -0,0 +1,461 @@
+# bench/run.py
+"""
+Drive every API route (plus /health) at a fixed concurrency and record latency.
+
+    python -m bench.run --base-url http://localhost:8000 --concurrency 32 --requests 2000 \
+        --label sync-10k --out bench/results
+
+Each scenario runs on its own: warm-up requests first, then `--requests` timed requests
+spread over `--concurrency` workers. Scenarios whose data is missing (no database URL,
+no review images, no export snapshot) are skipped. `--check-routes` lists the routes of
+the app that no scenario covers; tests/test_bench_routes.py keeps that list empty. For every scenario the result records p50/p95/p99/max
+latency, throughput, error count and, when the bench can reach the database, the number
+of SQL statements executed server-side (requires pg_stat_statements).
+
+Results are written as one JSON file per run, tagged with the git commit, label and
+prefix, so runs can be diffed with `python -m bench.compare`. To compare sync vs async
+in a single process start the API with DB_MOUNT_BOTH=true and run once with
+`--prefix /api/sync/v1` and once with `--prefix /api/async/v1`.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+
+
+DB, IMAGES, EXPORTS = "db", "images", "exports"
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    # route template as in the OpenAPI schema, for --check-routes
+    route: str
+    # builds (path, request kwargs) from the sampled ids
+    build: Callable[["Sample", random.Random], tuple[str, dict]]
+    write: bool = False
+    # what the scenario needs: None, a database to sample from, review images or an export
+    needs: Optional[str] = DB
+
+
+@dataclass
+class Sample:
+    species: list = field(default_factory=list)
+    names: list = field(default_factory=list)
+    locations: list = field(default_factory=list)  # (id, speciesId, latitude, longitude)
+    reviews: list = field(default_factory=list)
+    images: list = field(default_factory=list)  # review image urls
+    exports: list = field(default_factory=list)  # files of the latest export snapshot
+
+
+@dataclass
+class Result:
+    scenario: str
+    requests: int
+    errors: int
+    seconds: float
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    queries: Optional[int] = None
+    queriesPerRequest: Optional[float] = None
+
+
+def _pick_location(s: Sample, rng: random.Random):
+    return rng.choice(s.locations)
+
+
+def _bbox(s: Sample, rng: random.Random, span: float = 0.5):
+    _, _, lat, lon = _pick_location(s, rng)
+    return {"minLat": lat - span, "minLon": lon - span, "maxLat": lat + span, "maxLon": lon + span}
+
+
+def _review(s: Sample, rng: random.Random):
+    loc_id, species_id, _, _ = _pick_location(s, rng)
+    return {"speciesId": species_id, "locationId": loc_id}
+
+
+def _clusters(s: Sample, rng: random.Random):
+    zoom = rng.randint(3, 12)
+    _, _, lat, lon = _pick_location(s, rng)
+    # roughly one screen at that zoom
+    span = 360 / 2 ** zoom * 2
+    bbox = f"{max(lon - span, -180)},{max(lat - span / 2, -90)},{min(lon + span, 180)},{min(lat + span / 2, 90)}"
+    return {"zoom": zoom, "bbox": bbox}
+
+
+def _tile(s: Sample, rng: random.Random):
+    z = rng.randint(4, 12)
+    _, _, lat, lon = _pick_location(s, rng)
+    n = 2 ** z
+    x = min(int((lon + 180) / 360 * n), n - 1)
+    y = min(int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n), n - 1)
+    return f"{{api}}/locations/tiles/{z}/{x}/{y}.png"
+
+
+def _word(s: Sample, rng: random.Random) -> str:
+    return rng.choice(rng.choice(s.names).split())
+
+
+def _export_auth() -> dict:
+    return {"headers": {"Authorization": f"Bearer {settings.EXPORT_TOKEN}"}}
+
+
+def _ndjson(rows: list[dict]) -> dict:
+    return {
+        "params": {"format": "ndjson"},
+        "content": "\n".join(json.dumps(row) for row in rows).encode(),
+        "headers": {"Content-Type": "application/x-ndjson"},
+    }
+
+
+def _bulk_species(s: Sample, rng: random.Random):
+    return _ndjson([
+        {"speciesId": rng.randint(10_000_000, 2_000_000_000), "name": "Bench species", "scientificName": "Bench"}
+        for _ in range(100)
+    ])
+
+
+def _bulk_locations(s: Sample, rng: random.Random):
+    return _ndjson([
+        {"speciesId": rng.choice(s.species), "locationName": f"Bench bulk {uuid.uuid4().hex[:12]}",
+         "latitude": rng.uniform(8.5, 23.3), "longitude": rng.uniform(102.2, 109.5)}
+        for _ in range(100)
+    ])
+
+
+SCENARIOS = [
+    Scenario("health", "GET", "/health", lambda s, r: ("/health", {}), needs=None),
+    Scenario("health_db", "GET", "/health/db", lambda s, r: ("/health/db", {}), needs=None),
+    Scenario("health_boot", "GET", "/health/boot", lambda s, r: ("/health/boot", {}), needs=None),
+    Scenario("species_all", "GET", "{api}/species/all", lambda s, r: ("{api}/species/all", {})),
+    Scenario("species_search", "GET", "{api}/species/search", lambda s, r: (
+        "{api}/species/search", {"params": {"q": _word(s, r)}},
+    )),
+    Scenario("species_suggest", "GET", "{api}/species/suggest", lambda s, r: (
+        "{api}/species/suggest", {"params": {"prefix": r.choice(s.names)[:3]}},
+    )),
+    Scenario("species_detail", "GET", "{api}/species/{speciesId}",
+             lambda s, r: (f"{{api}}/species/{r.choice(s.species)}", {})),
+    Scenario("species_full", "GET", "{api}/species/{speciesId}/full",
+             lambda s, r: (f"{{api}}/species/{r.choice(s.species)}/full", {})),
+    Scenario("locations_all", "GET", "{api}/locations/all", lambda s, r: ("{api}/locations/all", {})),
+    Scenario("locations_by_species", "GET", "{api}/locations/{speciesId}",
+             lambda s, r: (f"{{api}}/locations/{r.choice(s.species)}", {})),
+    Scenario("locations_nearby", "GET", "{api}/locations/nearby", lambda s, r: (
+        "{api}/locations/nearby",
+        {"params": {"lat": _pick_location(s, r)[2], "lon": _pick_location(s, r)[3], "radius": 25_000}},
+    )),
+    Scenario("locations_bbox", "GET", "{api}/locations/bbox",
+             lambda s, r: ("{api}/locations/bbox", {"params": _bbox(s, r)})),
+    Scenario("locations_clusters", "GET", "{api}/locations/clusters",
+             lambda s, r: ("{api}/locations/clusters", {"params": _clusters(s, r)})),
+    Scenario("locations_blooming", "GET", "{api}/locations/blooming",
+             lambda s, r: ("{api}/locations/blooming", {"params": {"month": r.randint(1, 12)}})),
+    Scenario("locations_blooming_range", "GET", "{api}/locations/blooming/range", lambda s, r: (
+        "{api}/locations/blooming/range",
+        {"params": {"start": f"2025-{r.randint(1, 12):02d}-01", "end": f"2026-{r.randint(1, 12):02d}-28"}},
+    )),
+    Scenario("locations_tile", "GET", "{api}/locations/tiles/{z}/{x}/{y}.png", lambda s, r: (_tile(s, r), {})),
+    Scenario("reviews_all", "GET", "{api}/reviews/all",
+             lambda s, r: ("{api}/reviews/all", {"params": _review(s, r)})),
+    Scenario("reviews_page", "GET", "{api}/reviews/page",
+             lambda s, r: ("{api}/reviews/page", {"params": {**_review(s, r), "limit": 20}})),
+    Scenario("reviews_stream", "GET", "{api}/reviews/stream",
+             lambda s, r: ("{api}/reviews/stream", {"params": _review(s, r)})),
+    Scenario("reviews_stats", "GET", "{api}/reviews/stats",
+             lambda s, r: ("{api}/reviews/stats", {"params": _review(s, r)})),
+    Scenario("reviews_stats_batch", "GET", "{api}/reviews/stats/batch", lambda s, r: (
+        "{api}/reviews/stats/batch",
+        {"params": {"pairs": ",".join(f"{sp}:{loc}" for loc, sp, _, _ in r.sample(s.locations, min(20, len(s.locations))))}},
+    )),
+    Scenario("review_detail", "GET", "{api}/reviews/{review_id}",
+             lambda s, r: (f"{{api}}/reviews/{r.choice(s.reviews)}", {})),
+    Scenario("media", "GET", "/uploads/reviews/{path}", lambda s, r: (r.choice(s.images), {}), needs=IMAGES),
+    Scenario("exports_list", "GET", "{api}/exports/",
+             lambda s, r: ("{api}/exports/", _export_auth()), needs=EXPORTS),
+    Scenario("export_detail", "GET", "{api}/exports/{snapshotId}",
+             lambda s, r: ("{api}/exports/latest", _export_auth()), needs=EXPORTS),
+    Scenario("export_download", "GET", "{api}/exports/{snapshotId}/download",
+             lambda s, r: ("{api}/exports/latest/download", _export_auth()), needs=EXPORTS),
+    Scenario("export_file", "GET", "{api}/exports/{snapshotId}/files/{path}",
+             lambda s, r: (f"{{api}}/exports/latest/files/{r.choice(s.exports)}", _export_auth()), needs=EXPORTS),
+    Scenario("species_create", "POST", "{api}/species/", lambda s, r: ("{api}/species/", {"json": {
+        "speciesId": r.randint(10_000_000, 2_000_000_000), "name": "Bench species", "scientificName": "Bench",
+    }}), write=True),
+    Scenario("species_bulk", "POST", "{api}/species/bulk",
+             lambda s, r: ("{api}/species/bulk", _bulk_species(s, r)), write=True),
+    Scenario("location_create", "POST", "{api}/locations/", lambda s, r: ("{api}/locations/", {"json": {
+        "speciesId": r.choice(s.species), "locationName": f"Bench location {uuid.uuid4().hex[:12]}",
+        "coordinates": [r.uniform(8.5, 23.3), r.uniform(102.2, 109.5)],
+        "bloomingPeriod": {"start": "2025-03", "peak": "2025-04", "end": "2025-05"},
+    }}), write=True),
+    Scenario("locations_bulk", "POST", "{api}/locations/bulk",
+             lambda s, r: ("{api}/locations/bulk", _bulk_locations(s, r)), write=True),
+    Scenario("review_submit", "POST", "{api}/reviews/submit", lambda s, r: ("{api}/reviews/submit", {"data": {
+        **_review(s, r), "rating": r.randint(1, 5), "comment": "bench", "userName": f"bench-{uuid.uuid4().hex[:8]}",
+    }}), write=True),
+]
+
+
+def uncovered_routes(app, api: str = "/api/v1") -> list[str]:
+    """"METHOD path" of every route in app's OpenAPI schema that no scenario drives."""
+    covered = {(s.method, s.route.replace("{api}", api)) for s in SCENARIOS}
+    return [
+        f"{method.upper()} {path}"
+        for path, operations in app.openapi()["paths"].items()
+        for method in operations
+        if (method.upper(), path) not in covered
+    ]
+
+
+# -----------------------
+# Database probes
+# -----------------------
+class DbProbe:
+    """Samples ids for request parameters and reads server-side statement counters."""
+
+    def __init__(self, url: str):
+        self.engine = create_engine(url, pool_size=1, max_overflow=0)
+        with self.engine.connect() as conn:
+            self.has_statements = bool(conn.scalar(text(
+                "SELECT count(*) FROM pg_extension WHERE extname = 'pg_stat_statements'"
+            )))
+
+    def sample(self, rng_seed: int, size: int = 1000) -> Sample:
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT setseed(:s)"), {"s": (rng_seed % 1000) / 1000})
+            species = conn.execute(text(
+                'SELECT "speciesId", name FROM species ORDER BY random() LIMIT :n'
+            ), {"n": size}).all()
+            locations = conn.execute(text(
+                'SELECT id, "speciesId", latitude, longitude FROM locations ORDER BY random() LIMIT :n'
+            ), {"n": size}).all()
+            # ORDER BY random() over millions of reviews is too slow; sample pages instead
+            reviews = conn.scalars(text(
+                "SELECT id FROM user_reviews TABLESAMPLE SYSTEM (1) REPEATABLE (:s) LIMIT :n"
+            ), {"s": rng_seed, "n": size}).all() or conn.scalars(
+                text("SELECT id FROM user_reviews LIMIT :n"), {"n": size}
+            ).all()
+            images = conn.scalars(text(
+                "SELECT images FROM user_reviews TABLESAMPLE SYSTEM (1) REPEATABLE (:s)"
+                " WHERE images IS NOT NULL AND images <> '[]' LIMIT :n"
+            ), {"s": rng_seed, "n": size}).all()
+        return Sample(
+            species=[r[0] for r in species],
+            names=[r[1] for r in species if r[1]],
+            locations=[tuple(r) for r in locations],
+            reviews=list(reviews),
+            images=[meta["url"] for raw in images for meta in json.loads(raw) if meta.get("url")],
+        )
+
+    def counters(self) -> dict:
+        if not self.has_statements:
+            return {}
+        with self.engine.connect() as conn:
+            return {"queries": conn.scalar(text(
+                "SELECT COALESCE(sum(calls), 0) FROM pg_stat_statements "
+                "WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())"
+            ))}
+
+    @staticmethod
+    def delta(before: dict, after: dict) -> dict:
+        if "queries" not in before:
+            return {}
+        # the "before" probe itself is counted once it has finished
+        return {"queries": int(after["queries"] - before["queries"]) - 1}
+
+
+# -----------------------
+# Load generation
+# -----------------------
+def percentile(sorted_ms: list[float], pct: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    index = min(len(sorted_ms) - 1, max(0, round(pct / 100 * len(sorted_ms)) - 1))
+    return round(sorted_ms[index], 3)
+
+
+async def drive(client: httpx.AsyncClient, scenario: Scenario, sample: Sample, api: str,
+                total: int, concurrency: int, seed: int) -> tuple[list[float], int, float]:
+    rng = random.Random(seed)
+    # pre-build requests so parameter generation isn't timed
+    plan = []
+    for _ in range(total):
+        path, kwargs = scenario.build(sample, rng)
+        plan.append((path.format(api=api), kwargs))
+    queue = iter(plan)
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        for path, kwargs in queue:
+            started = time.perf_counter()
+            try:
+                response = await client.request(scenario.method, path, **kwargs)
+                await response.aread()
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def export_files(client: httpx.AsyncClient, api: str) -> list[str]:
+    """Files of the latest export snapshot, or [] when the server has none (or EXPORT_TOKEN is unset)."""
+    try:
+        response = await client.get(f"{api}/exports/latest", **_export_auth())
+    except httpx.HTTPError:
+        return []
+    if response.status_code != 200:
+        return []
+    return [path for table in response.json()["data"]["tables"].values() for path in table["files"]]
+
+
+def available(scenario: Scenario, probe: Optional[DbProbe], sample: Sample) -> bool:
+    if scenario.needs is None:
+        return True
+    if scenario.needs == DB:
+        return probe is not None
+    return bool(getattr(sample, scenario.needs))
+
+
+async def run(args) -> dict:
+    probe = DbProbe(args.database_url) if args.database_url else None
+    sample = probe.sample(args.seed) if probe else Sample()
+    wanted = set(args.scenarios or [])
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = []
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        sample.exports = await export_files(client, args.prefix)
+        scenarios = []
+        for s in SCENARIOS:
+            if (wanted and s.name not in wanted) or (s.write and not args.include_writes):
+                continue
+            if available(s, probe, sample):
+                scenarios.append(s)
+            else:
+                print(f"{s.name:<24} skipped: no {s.needs} to sample from")
+        for scenario in scenarios:
+            await drive(client, scenario, sample, args.prefix, args.warmup, args.concurrency, args.seed)
+            before = probe.counters() if probe else None
+            latencies, errors, seconds = await drive(
+                client, scenario, sample, args.prefix, args.requests, args.concurrency, args.seed + 1
+            )
+            counts = probe.delta(before, probe.counters()) if probe else {}
+            latencies.sort()
+            result = Result(
+                scenario=scenario.name,
+                requests=len(latencies),
+                errors=errors,
+                seconds=round(seconds, 3),
+                throughput=round(len(latencies) / seconds, 1) if seconds else 0.0,
+                p50_ms=percentile(latencies, 50),
+                p95_ms=percentile(latencies, 95),
+                p99_ms=percentile(latencies, 99),
+                max_ms=round(latencies[-1], 3) if latencies else 0.0,
+                **counts,
+            )
+            if result.queries is not None and result.requests:
+                result.queriesPerRequest = round(result.queries / result.requests, 2)
+            results.append(result)
+            print(f"{result.scenario:<24} p50={result.p50_ms:>8.2f}ms p95={result.p95_ms:>8.2f}ms "
+                  f"p99={result.p99_ms:>8.2f}ms {result.throughput:>8.1f} req/s errors={result.errors}")
+
+    return {
+        "meta": run_metadata(args, probe),
+        "results": [asdict(r) for r in results],
+    }
+
+
+def run_metadata(args, probe: Optional[DbProbe]) -> dict:
+    meta = {
+        "label": args.label,
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "startedAt": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "baseUrl": args.base_url,
+        "prefix": args.prefix,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "warmup": args.warmup,
+        "seed": args.seed,
+        "host": platform.node(),
+        "python": platform.python_version(),
+    }
+    if probe:
+        with probe.engine.connect() as conn:
+            meta["dataset"] = {
+                table: conn.scalar(text(f"SELECT count(*) FROM {table}"))
+                for table in ("species", "locations", "user_reviews")
+            }
+    return meta
+
+
+def _git(*cmd) -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", *cmd], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency / throughput benchmark for the API")
+    parser.add_argument("--base-url", default=f"http://localhost:{settings.BACKEND_PORT}")
+    parser.add_argument("--prefix", default="/api/v1", help="/api/v1, /api/sync/v1 or /api/async/v1")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL,
+                        help="used to sample ids and count queries; pass '' to run /health only")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000, help="timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenario", dest="scenarios", action="append", choices=[s.name for s in SCENARIOS])
+    parser.add_argument("--include-writes", action="store_true", help="also run the POST scenarios")
+    parser.add_argument("--label", default=os.environ.get("DB_MODE", settings.DB_MODE))
+    parser.add_argument("--out", default="bench/results", help="directory for the JSON result file")
+    parser.add_argument("--check-routes", action="store_true",
+                        help="list the app's routes no scenario covers and exit (1 if any)")
+    args = parser.parse_args()
+
+    if args.check_routes:
+        from main import app
+
+        missing = uncovered_routes(app)
+        print("\n".join(missing) or "every route has a scenario")
+        raise SystemExit(1 if missing else 0)
+
+    report = asyncio.run(run(args))
+    os.makedirs(args.out, exist_ok=True)
+    commit = (report["meta"]["commit"] or "nogit")[:8]
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    path = os.path.join(args.out, f"{stamp}-{commit}-{args.label}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(path)
+
+
+if __name__ == "__main__":
+    main()
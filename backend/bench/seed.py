@@ -0,0 +1,133 @@
+# bench/seed.py
+"""
+Generate a reproducible synthetic dataset for benchmarking.
+
+    python -m bench.seed --reviews 1000000 --locations 100000 [--species 200] [--seed 42]
+
+Names and comments come from faker, drawn once into fixed-size pools and then sampled,
+so 10M rows don't cost 10M faker calls. Rows are loaded with COPY (species and
+locations through app.services.bulk_load, reviews directly) and review_stats is rebuilt.
+"""
+import argparse
+import csv
+import io
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from faker import Faker
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401
+from app.core.config import settings
+from app.db.session import Base
+from app.services import bulk_load, review_stats
+
+BATCH = 50_000
+POOL = 2_000
+
+
+def species_records(fake: Faker, n: int):
+    for sid in range(1, n + 1):
+        yield {
+            "speciesId": sid,
+            "name": f"{fake.color_name()} {fake.word().title()}",
+            "scientificName": f"{fake.last_name()}ia {fake.word()}",
+            "description": fake.sentence(nb_words=12),
+            "bloomTime": random.choice(["Spring", "Summer", "Autumn", "Winter"]),
+            "color": fake.hex_color(),
+            "habitat": fake.sentence(nb_words=4),
+            "characteristics": fake.sentence(nb_words=6),
+        }
+
+
+def location_records(rng: random.Random, names: list, n: int, n_species: int):
+    for _ in range(n):
+        start = rng.randint(1, 12)
+        peak, end = (start % 12) + 1, ((start + 1) % 12) + 1
+        yield {
+            "speciesId": rng.randint(1, n_species),
+            "locationName": rng.choice(names),
+            # Vietnam-ish bounding box, like the real data
+            "coordinates": [rng.uniform(8.5, 23.3), rng.uniform(102.2, 109.5)],
+            "bloomingPeriod": {"start": f"2025-{start:02d}", "peak": f"2025-{peak:02d}", "end": f"2025-{end:02d}"},
+        }
+
+
+def copy_reviews(db: Session, rng: random.Random, users: list, comments: list, n: int, location_species: list):
+    """COPY reviews in batches; popularity is skewed so a few locations get most reviews."""
+    raw = db.connection().connection.dbapi_connection
+    now = datetime.utcnow()
+    done = 0
+    while done < n:
+        size = min(BATCH, n - done)
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for _ in range(size):
+            loc_id, species_id = location_species[int(len(location_species) * rng.random() ** 3)]
+            writer.writerow([
+                uuid.UUID(int=rng.getrandbits(128)).hex, species_id, loc_id, rng.choice(users),
+                rng.choices((1, 2, 3, 4, 5), weights=(1, 1, 3, 5, 6))[0], rng.choice(comments),
+                (now - timedelta(seconds=rng.randint(0, 3 * 365 * 86400))).isoformat(),
+            ])
+        buf.seek(0)
+        with raw.cursor() as cur:
+            cur.copy_expert(
+                'COPY user_reviews (id, "speciesId", "locationId", "userName", rating, comment, timestamp) '
+                "FROM STDIN WITH (FORMAT csv)", buf,
+            )
+        db.commit()
+        done += size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a synthetic benchmark dataset")
+    parser.add_argument("--species", type=int, default=200)
+    parser.add_argument("--locations", type=int, default=10_000)
+    parser.add_argument("--reviews", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    fake = Faker(["vi_VN", "en_US"])
+    Faker.seed(args.seed)
+
+    engine = create_engine(args.database_url)
+    if args.reset:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    timings = {}
+    with Session(engine) as db:
+        report = bulk_load.load_species(db, species_records(fake, args.species))
+        timings["species"] = report.to_dict()
+
+        names = [f"{fake.city()} {fake.street_name()}" for _ in range(POOL)]
+        report = bulk_load.load_locations(db, location_records(rng, names, args.locations, args.species), BATCH)
+        timings["locations"] = report.to_dict()
+
+        location_species = db.execute(text('SELECT id, "speciesId" FROM locations ORDER BY id')).all()
+        users = [fake.name() for _ in range(POOL)]
+        comments = [fake.paragraph(nb_sentences=2) for _ in range(POOL)]
+        t = time.perf_counter()
+        copy_reviews(db, rng, users, comments, args.reviews, location_species)
+        timings["reviews"] = {"rows": args.reviews, "seconds": round(time.perf_counter() - t, 3)}
+
+        t = time.perf_counter()
+        rows = review_stats.rebuild(db)
+        timings["review_stats"] = {"rows": rows, "seconds": round(time.perf_counter() - t, 3)}
+
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM ANALYZE"))
+    for part in timings.values():
+        part.pop("errors", None)
+    print(json.dumps(timings, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,50 @@
-
 import os
-from fastapi import FastAPI
-from app.db.session import Base
-import app.models
-from sqlalchemy import create_engine
-from app.core.config import settings
-from contextlib import asynccontextmanager
-from app.api import Location, Specie, UserReview
-from fastapi.middleware.cors import CORSMiddleware
+from app.core.boot import boot, schema_is_current
+
+with boot.phase("import:framework"):
+    import asyncio
+    import logging
+    from contextlib import asynccontextmanager
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import PlainTextResponse
+with boot.phase("import:db"):
+    from app.core.config import settings
+    from app.db.session import Base, async_engine, dispose_engines, engine, get_pool_status
+    from app.db.replicas import STICKY_HEADER
+    import app.models
+with boot.phase("import:api"):
+    from app.api import Export, Location, Media, Specie, UserReview
+    from app.services.metrics import MetricsMiddleware, metrics, sample_gauges
+    from app.services.review_writer import review_writer
+    from app.services.thumbnails import thumbnail_worker
+
+logger = logging.getLogger(__name__)
+ALEMBIC_VERSIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic", "versions")
 
 def run_migrations():
-    engine = create_engine(settings.DATABASE_URL)
+    if settings.FAST_BOOT and schema_is_current(engine, Base.metadata, ALEMBIC_VERSIONS):
+        boot.schema = "current"
+        return
     Base.metadata.create_all(bind=engine)
+    boot.schema = "create_all"
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     if os.getenv("APP_ENV") != "test":
-        run_migrations()
+        with boot.phase("schema"):
+            run_migrations()
+        # re-queues thumbnails whose claim lapsed; on its own thread, not needed to serve traffic
+        thumbnail_worker.start_resume()
+    boot.ready()
     yield
+    # buffered reviews are written (and their thumbnails queued) before the pools go away
+    await asyncio.get_running_loop().run_in_executor(None, review_writer.drain, settings.REVIEW_DRAIN_TIMEOUT)
+    thumbnail_worker.shutdown()
+    await dispose_engines()
 
-app = FastAPI(lifespan=lifespan)
+with boot.phase("app"):
+    app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,13 +52,51 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # read-your-writes deadline, for clients that echo it instead of keeping cookies
+    expose_headers=[STICKY_HEADER],
 )
+if settings.METRICS_ENABLED:
+    # outermost, so latency includes CORS and exception handling
+    app.add_middleware(MetricsMiddleware)
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/db")
+def db_pool_status():
+    return {"status": "healthy", "pool": get_pool_status()}
+
+@app.get("/health/boot")
+async def boot_report():
+    return {"status": "healthy", "boot": boot.report()}
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    pools = {"sync": get_pool_status()}
+    if async_engine is not None:
+        pools["async"] = pools["sync"].pop("async")
+    for name, replica in pools["sync"].pop("replicas", {}).items():
+        if "async" in replica:
+            pools[f"replica-async:{name}"] = replica.pop("async")
+        pools[f"replica:{name}"] = replica
+    sample_gauges(pools)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def include_api(prefix: str, mode: str):
+    for module, tag in ((Specie, "species"), (Location, "locations"), (UserReview, "reviews")):
+        router = module.async_router if mode == "async" else module.router
+        app.include_router(router, prefix=prefix, tags=[tag])
+
+
+with boot.phase("routes"):
+    app.include_router(Media.router)
+    # serves files written by app.services.snapshot_export; no database access
+    app.include_router(Export.router, prefix="/api/v1")
 
-app.include_router(Specie.router, prefix="/api/v1", tags=["species"])
-app.include_router(Location.router, prefix="/api/v1", tags=["locations"])
-app.include_router(UserReview.router, prefix="/api/v1", tags=["reviews"])
\ No newline at end of file
+    include_api("/api/v1", settings.DB_MODE)
+    if settings.DB_MOUNT_BOTH:
+        # side-by-side benchmarking of the two database paths
+        include_api("/api/sync/v1", "sync")
+        include_api("/api/async/v1", "async")
@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+os.environ.setdefault("APP_ENV", "test")
+
+
+@pytest.fixture(scope="session")
+def postgres_url():
+    """
+    Postgres for integration tests: TEST_DATABASE_URL if set, otherwise a throwaway
+    testcontainers instance. Skips when neither is available.
+    """
+    url = os.environ.get("TEST_DATABASE_URL")
+    if url:
+        yield url
+        return
+    try:
+        from testcontainers.postgres import PostgresContainer
+    except ImportError:
+        pytest.skip("set TEST_DATABASE_URL or install testcontainers[postgresql]")
+    container = PostgresContainer("postgres:15", driver="psycopg2")
+    try:
+        container.start()
+    except Exception as exc:
+        pytest.skip(f"could not start a postgres container: {exc}")
+    try:
+        yield container.get_connection_url()
+    finally:
+        container.stop()
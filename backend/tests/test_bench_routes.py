@@ -0,0 +1,15 @@
+"""
+Every route of the app is driven by a bench scenario (bench/run.py), so a new
+endpoint cannot ship without a latency number. No database needed.
+"""
+from bench.run import SCENARIOS, uncovered_routes
+from main import app
+
+
+def test_every_route_has_a_scenario():
+    assert uncovered_routes(app) == []
+
+
+def test_scenario_names_are_unique():
+    names = [s.name for s in SCENARIOS]
+    assert len(names) == len(set(names))
@@ -0,0 +1,69 @@
+"""Month parsing and wrap-around spans in app/services/bloom_calendar.py; no database needed."""
+from datetime import date
+
+import pytest
+
+from app.services.bloom_calendar import ALL_MONTHS, bloom_months, month_span, parse_month, range_months
+
+
+@pytest.mark.parametrize("value,parsed", [
+    ("2025-05", (2025, 5)), ("2024-03-20", (2024, 3)), ("5", (None, 5)), ("Tháng 11", (None, 11)),
+    ("thang 2", (None, 2)), ("May", (None, 5)), ("sept", (None, 9)), ("December", (None, 12)), (7, (None, 7)),
+    ("2025-13", None), ("0", None), (13, None), ("spring", None), ("", None), (None, None),
+])
+def test_parse_month(value, parsed):
+    assert parse_month(value) == parsed
+
+
+@pytest.mark.parametrize("start,end,months", [
+    (3, 5, [3, 4, 5]),
+    (5, 5, [5]),
+    (11, 2, [1, 2, 11, 12]),
+    (12, 1, [1, 12]),
+    (2, 1, ALL_MONTHS),
+    (1, 12, ALL_MONTHS),
+])
+def test_month_span(start, end, months):
+    assert month_span(start, end) == months
+
+
+@pytest.mark.parametrize("period,months", [
+    ({"start": "2025-11", "end": "2026-02"}, [1, 2, 11, 12]),
+    ({"start": "Nov", "peak": "Dec", "end": "Feb"}, [1, 2, 11, 12]),
+    ({"start": "2025-03", "peak": "2025-04-10", "end": "2025-05"}, [3, 4, 5]),
+    ({"peak": "2024-03-20"}, [3]),
+    ({"start": "Nov", "peak": "Jan"}, [1, 11, 12]),
+    ({"peak": "Jan", "end": "Feb"}, [1, 2]),
+    # a year or more between dated ends is every month
+    ({"start": "2025-03", "end": "2026-03"}, ALL_MONTHS),
+    ({"start": "2025-03", "end": "2026-05"}, ALL_MONTHS),
+    ({"start": "2025-03", "end": "2026-02"}, ALL_MONTHS),
+    ({"start": "2024-11", "end": "2026-02"}, ALL_MONTHS),
+    ({"start": "2025-03-01", "peak": "2025-09", "end": "2026-04-30"}, ALL_MONTHS),
+    ({"start": "2025-03", "end": "2026-01"}, [1, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12]),
+    ({"start": "2025-11", "peak": "2027-01"}, ALL_MONTHS),
+    # without a year on both ends only the months count
+    ({"start": "Mar", "end": "2026-03"}, [3]),
+    ({"start": "2025-11", "end": "Feb"}, [1, 2, 11, 12]),
+    ({"start": "whenever"}, None),
+    ({}, None),
+    (None, None),
+    ("2025-05", None),
+])
+def test_bloom_months(period, months):
+    assert bloom_months(period) == months
+
+
+@pytest.mark.parametrize("start,end,months", [
+    (date(2025, 5, 1), date(2025, 5, 31), [5]),
+    (date(2025, 11, 15), date(2026, 2, 1), [1, 2, 11, 12]),
+    (date(2025, 1, 1), date(2025, 12, 31), ALL_MONTHS),
+    (date(2025, 6, 1), date(2026, 6, 1), ALL_MONTHS),
+])
+def test_range_months(start, end, months):
+    assert range_months(start, end) == months
+
+
+def test_range_months_rejects_reversed_range():
+    with pytest.raises(ValueError):
+        range_months(date(2025, 2, 1), date(2025, 1, 1))
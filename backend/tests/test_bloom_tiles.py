@@ -0,0 +1,122 @@
+"""Bloom tile pyramid versions (app/services/bloom_tiles.py TileCache); no database needed."""
+import os
+import time
+
+import pytest
+
+from app.services.bloom_tiles import TileCache, TileKey, TilePoints
+
+np = pytest.importorskip("numpy")
+
+KEY = TileKey(species=None, months=0)
+# zoom 10 tile over Hanoi, and points well inside and far away from it
+TILE = (10, 813, 450)
+INSIDE = (21.03, 105.85, 1, [3])
+FAR = (-33.86, 151.21, 2, [3])
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TileCache(str(tmp_path), keep_versions=8)
+
+
+def versions(cache):
+    return sorted(int(n[1:]) for n in os.listdir(cache.root) if n.startswith("v"))
+
+
+def test_tile_survives_inserts_nobody_looked_at(cache):
+    cache.put(0, KEY, *TILE, b"png")
+    for _ in range(5):
+        cache.bump([FAR])
+    assert cache.version() == 5
+    assert cache.get(KEY, *TILE) == b"png"
+    assert os.path.exists(cache.tile_path(5, KEY, *TILE))
+
+
+def test_nearby_insert_invalidates_the_tile(cache):
+    cache.put(0, KEY, *TILE, b"png")
+    cache.bump([FAR])
+    cache.bump([INSIDE])
+    cache.bump([FAR])
+    assert cache.get(KEY, *TILE) is None
+
+
+def test_insert_of_another_species_keeps_the_tile(cache):
+    species_2 = TileKey(species=2, months=0)
+    cache.put(0, species_2, *TILE, b"sp2")
+    cache.bump([INSIDE])  # species 1
+    assert cache.get(species_2, *TILE) == b"sp2"
+
+
+def test_month_filter_skips_points_of_other_months(cache):
+    july = TileKey(species=None, months=1 << 6)
+    cache.put(0, july, *TILE, b"july")
+    cache.bump([INSIDE])  # blooms in March only
+    assert cache.get(july, *TILE) == b"july"
+
+
+def test_bulk_invalidation_ends_the_walk(cache):
+    cache.put(0, KEY, *TILE, b"png")
+    cache.bump([FAR])
+    cache.bump(None)
+    cache.bump([FAR])
+    assert cache.get(KEY, *TILE) is None
+
+
+def test_walk_is_bounded_by_kept_versions(cache):
+    cache.put(0, KEY, *TILE, b"png")
+    for _ in range(cache.keep_versions):
+        cache.bump([FAR])
+    assert cache.get(KEY, *TILE) is None
+
+
+def test_prune_keeps_recent_versions(cache):
+    cache.put(0, KEY, *TILE, b"png")
+    for _ in range(11):
+        cache.bump([FAR])
+    cache._prune_lock.acquire()  # hold off the background pruner
+    try:
+        cache.bump([FAR])
+    finally:
+        cache._prune_lock.release()
+    cache._prune()
+    assert versions(cache) == list(range(12 - cache.keep_versions + 1, 13))
+
+
+def test_prune_drops_everything_before_a_bulk_invalidation(cache):
+    for _ in range(3):
+        cache.bump([FAR])
+    cache._prune_lock.acquire()
+    try:
+        cache.bump(None)
+        cache.bump([FAR])
+    finally:
+        cache._prune_lock.release()
+    cache._prune()
+    assert versions(cache) == [4, 5]
+
+
+def test_prune_runs_only_every_few_versions(cache, monkeypatch):
+    runs = []
+    monkeypatch.setattr(TileCache, "_prune", lambda self: runs.append(1))
+    for _ in range(8):
+        cache.bump([FAR])
+    cache.bump(None)
+    for _ in range(100):
+        if len(runs) >= 5:
+            break
+        time.sleep(0.01)
+    # versions 2, 4, 6 and 8 (prune_every = keep_versions // 4), and the bulk invalidation
+    assert len(runs) == 5
+
+
+def test_points_catch_up_with_added_locations(cache):
+    points = TilePoints()
+    points.load([(10.0, 100.0, 1, [3])], cache.version())
+    cache.bump([INSIDE])
+    cache.bump([FAR])
+    assert points.catch_up(cache, cache.version())
+    assert sorted(points.species.tolist()) == [1, 1, 2]
+    assert points.species_ids == {1, 2}
+    cache.bump(None)
+    assert not points.catch_up(cache, cache.version())
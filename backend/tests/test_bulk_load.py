@@ -0,0 +1,65 @@
+"""Bulk location loads (app/services/bulk_load.py) against Postgres."""
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401  (register tables)
+from app.db.session import Base
+from app.models.Location import Location
+from app.services.bulk_load import load_locations
+
+
+@pytest.fixture
+def db(postgres_url):
+    eng = create_engine(postgres_url)
+    Base.metadata.drop_all(eng)
+    Base.metadata.create_all(eng)
+    with eng.begin() as conn:
+        conn.execute(text("""INSERT INTO species ("speciesId", name, "scientificName") VALUES (1, 'Hoa Sen', 'Nelumbo')"""))
+        conn.execute(text("""
+            INSERT INTO locations (id, "speciesId", "locationName", latitude, longitude)
+            VALUES (1, 1, 'A', 10, 100), (2, 1, 'B', 11, 101)
+        """))
+        conn.execute(text("SELECT setval(pg_get_serial_sequence('locations', 'id'), 2)"))
+    with Session(eng) as session:
+        yield session
+    Base.metadata.drop_all(eng)
+    eng.dispose()
+
+
+def record(name, lat, lon, location_id=None):
+    row = {"speciesId": 1, "locationName": name, "coordinates": [lat, lon]}
+    return row if location_id is None else {**row, "id": location_id}
+
+
+def names(db):
+    return dict(db.execute(select(Location.id, Location.locationName).order_by(Location.id)).all())
+
+
+@pytest.mark.parametrize("writer", ["copy", "values"])
+def test_natural_key_conflict_rejects_only_its_batch(db, writer):
+    records = [
+        record("C", 12, 102), record("D", 13, 103),
+        # id 2 moved onto A's species, name and coordinates
+        record("A", 10, 100, location_id=2), record("E", 14, 104),
+        record("F", 15, 105, location_id=7), record("G", 16, 106),
+    ]
+    report = load_locations(db, records, batch_size=2, writer=writer)
+
+    assert (report.rows, report.written, report.rejected) == (6, 4, 2)
+    assert [e["row"] for e in report.errors] == [3, 4]
+    assert all("ux_locations_natural_key" in e["error"] for e in report.errors)
+    assert sorted(names(db).values()) == ["A", "B", "C", "D", "F", "G"]
+    assert names(db)[2] == "B"
+    # explicit ids of the committed batches still move the sequence on
+    db.add(Location(speciesId=1, locationName="H", latitude=0, longitude=0))
+    db.commit()
+    assert max(names(db)) == 8
+
+
+def test_reloading_rows_without_ids_is_idempotent(db):
+    records = [record("C", 12, 102), record("C", 12, 102), record("A", 10, 100)]
+    first = load_locations(db, records, batch_size=2)
+    second = load_locations(db, records, batch_size=2)
+    assert first.rejected == second.rejected == 0
+    assert sorted(names(db).values()) == ["A", "B", "C"]
@@ -0,0 +1,106 @@
+"""ClusterIndex (app/services/location_clusters.py) counts against brute force; no database needed."""
+import random
+from collections import Counter
+
+import pytest
+
+from app.services.location_clusters import ClusterIndex, features
+from app.services.spatial_index import mercator
+
+np = pytest.importorskip("numpy")
+
+MAX_ZOOM = 6
+
+
+def random_rows(seed, n, first_id=0):
+    rng = random.Random(seed)
+    return [(first_id + i, rng.randint(1, 4), rng.uniform(-85.0, 85.0), rng.uniform(-180.0, 179.999)) for i in range(n)]
+
+
+def brute_cells(index, rows, zoom, species_id=None):
+    """{(cx, cy): count} of the points on the zoom's grid."""
+    n = index.grid_size(zoom)
+    cells = Counter()
+    for _, s, lat, lon in rows:
+        if species_id is None or s == species_id:
+            mx, my = mercator(lat, lon)
+            cells[min(int(mx * n), n - 1), min(int(my * n), n - 1)] += 1
+    return cells
+
+
+def index_cells(index, zoom, species_id=None):
+    level = index.clusters(zoom, -85.0, -180.0, 85.0, 180.0, species_id)
+    n = index.grid_size(zoom)
+    cy, cx = np.divmod(level.key % (n * n), n)
+    return dict(zip(zip(cx.tolist(), cy.tolist()), level.count.tolist()))
+
+
+@pytest.fixture
+def rows():
+    return random_rows(11, 2000)
+
+
+@pytest.fixture
+def index(rows):
+    idx = ClusterIndex(cell_px=64, max_zoom=MAX_ZOOM)
+    idx.load(rows)
+    return idx
+
+
+@pytest.mark.parametrize("zoom", range(MAX_ZOOM + 1))
+@pytest.mark.parametrize("species_id", [None, 1, 3])
+def test_counts_after_load(index, rows, zoom, species_id):
+    assert index_cells(index, zoom, species_id) == brute_cells(index, rows, zoom, species_id)
+
+
+@pytest.mark.parametrize("zoom", range(MAX_ZOOM + 1))
+@pytest.mark.parametrize("species_id", [None, 2, 4])
+def test_counts_after_add(index, rows, zoom, species_id):
+    added = random_rows(12, 150, first_id=len(rows))
+    for row in added:
+        index.add(*row)
+    assert index_cells(index, zoom, species_id) == brute_cells(index, rows + added, zoom, species_id)
+
+
+def test_add_matches_a_full_reload(index, rows):
+    added = random_rows(13, 50, first_id=len(rows))
+    for row in added:
+        index.add(*row)
+    reloaded = ClusterIndex(cell_px=64, max_zoom=MAX_ZOOM)
+    reloaded.load(rows + added)
+    for zoom in range(MAX_ZOOM + 1):
+        for species_id in (None, 1):
+            got, want = index._level(zoom, species_id), reloaded._level(zoom, species_id)
+            np.testing.assert_array_equal(got.key, want.key)
+            np.testing.assert_array_equal(got.count, want.count)
+            np.testing.assert_array_equal(got.member_id, want.member_id)
+            np.testing.assert_allclose(got.sum_x, want.sum_x)
+            np.testing.assert_allclose(got.sum_y, want.sum_y)
+
+
+def test_add_before_load_is_ignored():
+    idx = ClusterIndex(cell_px=64, max_zoom=MAX_ZOOM)
+    idx.add(1, 1, 10.0, 10.0)
+    assert idx.needs_load()
+    idx.load([])
+    assert len(idx.clusters(0, -85.0, -180.0, 85.0, 180.0)) == 0
+
+
+def test_zoom_zero_totals(index, rows):
+    per_species = Counter(s for _, s, _, _ in rows)
+    assert int(index.clusters(0, -85.0, -180.0, 85.0, 180.0).count.sum()) == len(rows)
+    for species_id, total in per_species.items():
+        assert int(index.clusters(0, -85.0, -180.0, 85.0, 180.0, species_id).count.sum()) == total
+
+
+def test_single_member_cell_is_the_location():
+    idx = ClusterIndex(cell_px=64, max_zoom=MAX_ZOOM)
+    idx.load([(7, 3, 21.0285, 105.8542), (8, 3, -33.86, 151.21), (9, 1, -33.8601, 151.2101)])
+    found = features(idx.clusters(MAX_ZOOM, -85.0, -180.0, 85.0, 180.0), limit=10)
+    assert found[0]["cluster"] and found[0]["count"] == 2 and found[0]["id"] is None
+    assert found[1] == {"id": 7, "cluster": False, "count": 1, "coordinates": [21.0285, 105.8542], "speciesId": 3}
+
+
+def test_rejects_cell_size_that_does_not_divide_a_tile():
+    with pytest.raises(ValueError):
+        ClusterIndex(cell_px=48)
@@ -0,0 +1,154 @@
+"""
+Query-plan regression suite.
+
+Seeds a synthetic dataset (PLAN_TEST_SCALE reviews, default 500k), runs EXPLAIN on
+the statements each endpoint issues and fails when
+  * a large table is read with a sequential scan, or
+  * the planner's total cost grows past PLAN_COST_TOLERANCE x the recorded baseline.
+
+Baselines live in tests/query_plan_baseline.json and are committed alongside index
+changes. Regenerate them with UPDATE_PLAN_BASELINE=1; without it a missing baseline
+file, or a query with no recorded cost, fails.
+/species/all and /locations/all read whole tables by design and are not covered;
+/locations/blooming without a species can match a quarter of all locations, where a
+sequential scan is the right plan, so it is only checked with a speciesId.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.dialects import postgresql
+
+import app.models  # noqa: F401  (register tables)
+from app.db.session import Base
+from app.models.Location import Location
+from app.models.Specie import Specie
+from app.models.UserReview import UserReview
+
+SCALE = int(os.environ.get("PLAN_TEST_SCALE", 500_000))
+N_SPECIES = 200
+N_LOCATIONS = max(SCALE // 10, 1000)
+TOLERANCE = float(os.environ.get("PLAN_COST_TOLERANCE", 1.5))
+BASELINE_FILE = Path(__file__).with_name("query_plan_baseline.json")
+LARGE_TABLES = {"user_reviews", "locations", "review_stats"}
+
+
+@pytest.fixture(scope="module")
+def engine(postgres_url):
+    eng = create_engine(postgres_url)
+    Base.metadata.drop_all(eng)
+    Base.metadata.create_all(eng)
+    with eng.begin() as conn:
+        conn.execute(text(f"""
+            INSERT INTO species ("speciesId", name, "scientificName")
+            SELECT g, 'Species ' || g, 'Flora ' || g FROM generate_series(1, {N_SPECIES}) g
+        """))
+        conn.execute(text(f"""
+            INSERT INTO locations ("speciesId", "locationName", latitude, longitude, "bloomingPeriod", "bloomMonths")
+            SELECT 1 + g % {N_SPECIES}, 'Location ' || g, 8 + random() * 15, 102 + random() * 8,
+                   '{{"start": "2025-03", "peak": "2025-04", "end": "2025-05"}}'::jsonb,
+                   ARRAY[1 + g % 12, 1 + (g + 1) % 12, 1 + (g + 2) % 12]
+            FROM generate_series(1, {N_LOCATIONS}) g
+        """))
+        # reviews cluster on a subset of locations, as popular spots do
+        conn.execute(text(f"""
+            INSERT INTO user_reviews (id, "speciesId", "locationId", "userName", rating, comment, timestamp)
+            SELECT md5(g::text), 1 + (g % {N_LOCATIONS}) % {N_SPECIES}, 1 + (g % {N_LOCATIONS}),
+                   'user ' || g % 1000, 1 + g % 5, 'comment', now() - (g || ' seconds')::interval
+            FROM generate_series(1, {SCALE}) g
+        """))
+    from app.services.review_stats import rebuild
+    from sqlalchemy.orm import Session
+
+    with Session(eng) as db:
+        rebuild(db)
+    with eng.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM ANALYZE"))
+    yield eng
+    eng.dispose()
+
+
+def endpoint_queries():
+    from app.api.Location import blooming_query, by_ids
+    from app.api.UserReview import encode_cursor, page_query, reviews_query
+    from app.services.fast_json import LOCATION_COLUMNS, REVIEW_COLUMNS
+    from app.services.review_stats import batch_stats_query, species_stats_query, stats_lookup
+    from app.services.snapshot_export import export_reviews_query
+    from app.services.species_search import search_query
+
+    species_id, location_id = 1 + 42 % N_SPECIES, 43
+    cursor = encode_cursor(SimpleNamespace(timestamp=datetime.utcnow(), id="f" * 32))
+    return {
+        "GET /species/{id}": select(Specie).where(Specie.speciesId == species_id).limit(1),
+        "GET /species/search": search_query("flora 4", 20),
+        # /species/{id}/full: the selectin load of Specie.locations, then the grouped stats
+        "GET /species/{id}/full (locations)": select(Location).where(Location.speciesId.in_([species_id])),
+        "GET /species/{id}/full (stats)": species_stats_query(species_id),
+        "GET /locations/{speciesId}": select(*LOCATION_COLUMNS).where(Location.speciesId == species_id),
+        "GET /locations/nearby (fetch by ids)": by_ids(list(range(1, 501))),
+        "GET /locations/blooming (species)": blooming_query([5], species_id, any_month=False),
+        "GET /locations/blooming/range (species)": blooming_query([12, 1], species_id, any_month=True),
+        "GET /reviews/all": reviews_query(species_id, location_id, *REVIEW_COLUMNS),
+        "GET /reviews/page (first)": page_query(species_id, location_id, 50, None),
+        "GET /reviews/page (cursor)": page_query(species_id, location_id, 50, cursor),
+        "GET /reviews/stats": stats_lookup(species_id, location_id),
+        "GET /reviews/stats/batch": batch_stats_query(
+            [(1 + loc % N_SPECIES, loc) for loc in range(location_id, location_id + 200)]
+        ),
+        "GET /reviews/{id}": select(UserReview).where(UserReview.id == "abc"),
+        # incremental snapshot export: the reviews since the last watermark
+        "snapshot_export (incremental reviews)": export_reviews_query(
+            datetime.utcnow() - timedelta(hours=1), datetime.utcnow(),
+        ),
+    }
+
+
+def explain(conn, stmt) -> dict:
+    compiled = stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"render_postcompile": True})
+    result = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params)
+    return result.scalar()[0]["Plan"]
+
+
+def walk(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from walk(child)
+
+
+@pytest.fixture(scope="module")
+def plans(engine):
+    with engine.connect() as conn:
+        return {name: explain(conn, stmt) for name, stmt in endpoint_queries().items()}
+
+
+@pytest.fixture(scope="module")
+def baseline(plans):
+    if os.environ.get("UPDATE_PLAN_BASELINE"):
+        recorded = {name: round(plan["Total Cost"], 2) for name, plan in plans.items()}
+        BASELINE_FILE.write_text(json.dumps(recorded, indent=2, sort_keys=True) + "\n")
+        return recorded
+    if not BASELINE_FILE.exists():
+        pytest.fail(f"{BASELINE_FILE.name} is missing; record it with UPDATE_PLAN_BASELINE=1")
+    return json.loads(BASELINE_FILE.read_text())
+
+
+@pytest.mark.parametrize("name", list(endpoint_queries()))
+def test_no_sequential_scan(plans, name):
+    seq = [
+        node["Relation Name"] for node in walk(plans[name])
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in LARGE_TABLES
+    ]
+    assert not seq, f"{name}: sequential scan on {seq}"
+
+
+@pytest.mark.parametrize("name", list(endpoint_queries()))
+def test_plan_cost_within_baseline(plans, baseline, name):
+    assert name in baseline, f"no baseline recorded for {name}; rerun with UPDATE_PLAN_BASELINE=1"
+    cost = plans[name]["Total Cost"]
+    assert cost <= baseline[name] * TOLERANCE, (
+        f"{name}: plan cost {cost:.2f} exceeds baseline {baseline[name]:.2f} x {TOLERANCE}"
+    )
@@ -0,0 +1,62 @@
+"""ResponseCache (app/services/response_cache.py) conditional GETs and invalidation; no database needed."""
+from starlette.requests import Request
+
+from app.services.response_cache import ResponseCache
+
+
+def request(replica=None, **headers):
+    req = Request({
+        "type": "http", "method": "GET", "path": "/", "query_string": b"",
+        "headers": [(k.replace("_", "-").lower().encode(), v.encode()) for k, v in headers.items()],
+    })
+    req.state.db_replica = replica
+    return req
+
+
+def test_etag_revalidation():
+    cache = ResponseCache(max_bytes=1 << 20, ttl=60)
+    first = cache.store_body(request(), "species", "all", b'{"data": []}')
+    assert first.status_code == 200 and first.body == b'{"data": []}'
+    etag = first.headers["etag"]
+    assert "last-modified" not in first.headers
+
+    assert cache.lookup(request(if_none_match=etag), "species", "all").status_code == 304
+    assert cache.lookup(request(if_none_match=f'"other", W/{etag}'), "species", "all").status_code == 304
+    assert cache.lookup(request(if_none_match='"other"'), "species", "all").status_code == 200
+
+
+def test_if_modified_since_is_not_honoured():
+    cache = ResponseCache(max_bytes=1 << 20, ttl=60)
+    cache.store_body(request(), "species", "all", b"[]")
+    hit = cache.lookup(request(if_modified_since="Wed, 21 Oct 2099 07:28:00 GMT"), "species", "all")
+    assert hit.status_code == 200
+
+
+def test_changed_body_gets_a_new_etag():
+    cache = ResponseCache(max_bytes=1 << 20, ttl=60)
+    etag = cache.store_body(request(), "species", 1, b'{"v": 1}').headers["etag"]
+    cache.invalidate("species")
+    assert cache.lookup(request(), "species", 1) is None
+    refilled = cache.store_body(request(if_none_match=etag), "species", 1, b'{"v": 2}')
+    assert refilled.status_code == 200 and refilled.headers["etag"] != etag
+
+
+def test_invalidate_and_discard_are_scoped():
+    cache = ResponseCache(max_bytes=1 << 20, ttl=60)
+    for namespace, key in [("species", 1), ("species", 2), ("locations", 1)]:
+        cache.store_body(request(), namespace, key, b"{}")
+    cache.discard("species", 1)
+    assert cache.lookup(request(), "species", 1) is None
+    assert cache.lookup(request(), "species", 2) is not None
+    cache.invalidate("species")
+    assert cache.lookup(request(), "species", 2) is None
+    assert cache.lookup(request(), "locations", 1) is not None
+
+
+def test_replica_body_is_not_cached_right_after_a_write():
+    cache = ResponseCache(max_bytes=1 << 20, ttl=60, replica_lag=30)
+    cache.invalidate("species")
+    assert cache.store_body(request(replica="r1:5432"), "species", 1, b"{}").status_code == 200
+    assert cache.lookup(request(), "species", 1) is None
+    cache.store_body(request(), "species", 1, b"{}")
+    assert cache.lookup(request(), "species", 1) is not None
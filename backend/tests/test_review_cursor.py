@@ -0,0 +1,59 @@
+"""Keyset cursors for /reviews/page (app/api/UserReview.py); no database needed."""
+import base64
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from app.api.UserReview import build_page, decode_cursor, encode_cursor, page_query
+
+
+def review(ts: datetime, review_id: str, **extra):
+    return SimpleNamespace(timestamp=ts, id=review_id, **extra)
+
+
+@pytest.mark.parametrize("ts,review_id", [
+    (datetime(2025, 3, 1, 8, 30, 0), "5f0c7f9e-0f43-4b4e-9c55-0a3b3c1f2d11"),
+    (datetime(2025, 12, 31, 23, 59, 59, 999999), "id|with|pipes"),
+    (datetime(1999, 1, 1), "é"),
+])
+def test_cursor_round_trip(ts, review_id):
+    cursor = encode_cursor(review(ts, review_id))
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (ts, review_id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"no separator").decode(),
+    base64.urlsafe_b64encode(b"yesterday|abc").decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe|abc").decode(),
+])
+def test_bad_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+def test_page_query_continues_after_the_cursor():
+    cursor = encode_cursor(review(datetime(2025, 3, 1, 8, 30), "abc"))
+    sql = str(page_query(1, 2, 20, cursor).compile(dialect=postgresql.dialect()))
+    assert '(user_reviews.timestamp, user_reviews.id) < (' in sql
+    assert "ORDER BY user_reviews.timestamp DESC, user_reviews.id DESC" in sql
+    assert "LIMIT" in sql
+    # the first page has no keyset predicate
+    assert "<" not in str(page_query(1, 2, 20, None).compile(dialect=postgresql.dialect()))
+
+
+def test_build_page_cursor_points_at_the_last_row():
+    rows = [
+        review(datetime(2025, 3, 1, 8, 30 - i), f"r{i}", speciesId=1, locationId=2, userName="u",
+               rating=5, comment="c", images=None)
+        for i in range(3)
+    ]
+    page = build_page(rows, limit=2)
+    assert [r.id for r in page.data] == ["r0", "r1"]
+    assert decode_cursor(page.nextCursor) == (rows[1].timestamp, "r1")
+    assert build_page(rows, limit=3).nextCursor is None
@@ -0,0 +1,144 @@
+"""ReviewWriter (app/services/review_writer.py) batching, drain and rejection; no database needed."""
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.UserReview import UserReview
+from app.services import review_writer as writer_module
+from app.services.review_writer import QUEUED, PendingReview, ReviewWriter
+
+
+class RecordingWriter(ReviewWriter):
+    """Records batches instead of writing them; rating 0 fails, `gate` holds the flusher."""
+
+    def __init__(self, **kwargs):
+        options = dict(enabled=True, flush_rows=3, flush_ms=200, max_queue=100, queue_timeout_ms=50, ack="commit")
+        super().__init__(**{**options, **kwargs})
+        self.batches: list[list[str]] = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def _write(self, batch):
+        self.gate.wait(5)
+        if any(item.row["rating"] == 0 for item in batch):
+            raise ValueError("bad row")
+        self.batches.append([item.row["id"] for item in batch])
+
+
+def review(n: int, rating: int = 5, species_id: int = 1) -> UserReview:
+    return UserReview(id=f"r{n}", speciesId=species_id, locationId=1, userName="u", rating=rating,
+                      comment="c", timestamp=datetime(2025, 1, 1), images=None)
+
+
+@pytest.fixture(autouse=True)
+def side_effects(monkeypatch):
+    calls = {"discard": [], "enqueue": []}
+    monkeypatch.setattr(writer_module.response_cache, "discard", lambda ns, key: calls["discard"].append(key))
+    monkeypatch.setattr(writer_module.thumbnail_worker, "enqueue",
+                        lambda review_id, images: calls["enqueue"].append(review_id))
+    return calls
+
+
+@pytest.fixture
+def writer():
+    w = RecordingWriter()
+    yield w
+    w.gate.set()
+    w.drain(timeout=5)
+
+
+def test_rejects_unknown_ack():
+    with pytest.raises(ValueError):
+        RecordingWriter(ack="later")
+    assert RecordingWriter(ack=QUEUED).ack == QUEUED
+
+
+def test_batches_up_to_flush_rows(writer, side_effects):
+    futures = [writer.submit(review(i, species_id=i % 2 + 1), []) for i in range(7)]
+    for future in futures:
+        future.result(timeout=5)
+    assert [len(b) for b in writer.batches] == [3, 3, 1]
+    assert sum(writer.batches, []) == [f"r{i}" for i in range(7)]
+    assert side_effects["enqueue"] == [f"r{i}" for i in range(7)]
+    assert sorted(set(side_effects["discard"])) == [1, 2]
+
+
+def test_failing_row_fails_alone(writer):
+    futures = [writer.submit(review(i, rating=0 if i == 1 else 5), []) for i in range(3)]
+    futures[0].result(timeout=5)
+    futures[2].result(timeout=5)
+    with pytest.raises(ValueError):
+        futures[1].result(timeout=5)
+    assert writer.batches == [["r0"], ["r2"]]
+
+
+def test_drain_writes_everything_buffered(writer):
+    writer.gate.clear()
+    futures = [writer.submit(review(i), []) for i in range(5)]
+    threading.Timer(0.1, writer.gate.set).start()
+    writer.drain(timeout=5)
+    assert all(f.done() and f.exception() is None for f in futures)
+    assert sum(writer.batches, []) == [f"r{i}" for i in range(5)]
+
+
+def test_submit_after_drain_is_503(writer):
+    writer.drain(timeout=5)
+    with pytest.raises(HTTPException) as exc:
+        writer.submit(review(1), [])
+    assert exc.value.status_code == 503
+    assert exc.value.headers == {"Retry-After": "1"}
+
+
+def test_full_queue_is_503_after_the_timeout():
+    w = RecordingWriter(flush_rows=1, max_queue=1)
+    w.gate.clear()
+    try:
+        first = w.submit(review(0), [])   # taken by the flusher, which blocks in _write
+        for _ in range(500):
+            if w._queue.empty():
+                break
+            time.sleep(0.01)
+        second = w.submit(review(1), [])  # fills the queue
+        with pytest.raises(HTTPException) as exc:
+            w.submit(review(2), [])
+        assert exc.value.status_code == 503
+        with pytest.raises(queue.Full):
+            w.submit(review(3), [], wait=False)
+    finally:
+        w.gate.set()
+        w.drain(timeout=5)
+    assert first.exception() is None and second.exception() is None
+    assert w.batches == [["r0"], ["r1"]]
+
+
+def test_reject_remaining_fails_what_is_left():
+    w = RecordingWriter()
+    items = [PendingReview({"id": f"r{i}"}, [], Future()) for i in range(2)]
+    for item in items:
+        w._queue.put_nowait(item)
+    w._reject_remaining()
+    for item in items:
+        assert isinstance(item.future.exception(), HTTPException)
+        assert item.future.exception().status_code == 503
+    assert w._queue.empty()
+
+
+def test_wait_times_out_with_503():
+    w = RecordingWriter(commit_timeout_ms=20)
+    future = Future()
+    with pytest.raises(HTTPException) as exc:
+        w.wait(future)
+    assert exc.value.status_code == 503
+    with pytest.raises(HTTPException):
+        asyncio.run(w.wait_async(future))
+    # the flusher can still resolve it
+    assert not future.cancelled()
+    future.set_result(None)
+    w.wait(future)
+    asyncio.run(w.wait_async(future))
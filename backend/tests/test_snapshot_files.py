@@ -0,0 +1,113 @@
+"""ColumnarWriter partitions and the streamed tar in app/services/snapshot_export.py; no database needed."""
+import io
+import os
+import tarfile
+from datetime import datetime
+
+import pytest
+
+from app.services.snapshot_export import ARROW, PARQUET, REVIEW_EXPORT_COLUMNS, ColumnarWriter, tar_stream
+
+
+@pytest.fixture
+def pa():
+    return pytest.importorskip("pyarrow")
+
+
+def rows(n, species_id=1, start=0):
+    return [
+        (f"r{start + i}", species_id, 1, "u", 5, "c", datetime(2025, 1, 1, 0, 0, i % 60), None)
+        for i in range(n)
+    ]
+
+
+def writer(root, fmt=PARQUET, row_group_rows=2, max_buffered_rows=100):
+    return ColumnarWriter(str(root), REVIEW_EXPORT_COLUMNS, fmt, row_group_rows, max_buffered_rows)
+
+
+def read(pa, root, path, fmt):
+    full = os.path.join(root, path)
+    if fmt == PARQUET:
+        return pa.parquet.read_table(full)
+    with pa.ipc.open_file(full) as f:
+        return f.read_all()
+
+
+@pytest.mark.parametrize("fmt", [PARQUET, ARROW])
+def test_partitions_close_independently(pa, tmp_path, fmt):
+    w = writer(tmp_path, fmt)
+    jan, feb = "speciesId=1/month=2025-01/part", "speciesId=1/month=2025-02/part"
+    w.add(jan, rows(3))
+    w.close([jan])
+    w.add(feb, rows(5, start=3))
+    w.close()
+    assert w.files == [jan, feb]
+    assert w.rows == 8
+    assert read(pa, tmp_path, jan, fmt).column("id").to_pylist() == ["r0", "r1", "r2"]
+    assert read(pa, tmp_path, feb, fmt).num_rows == 5
+
+
+def test_rows_for_a_closed_partition_are_refused(pa, tmp_path):
+    w = writer(tmp_path)
+    w.add("a/part", rows(1))
+    w.close(["a/part"])
+    w.add("a/part", rows(1, start=1))
+    with pytest.raises(RuntimeError, match="already finished"):
+        w.close()
+
+
+def test_closing_an_unknown_partition_is_a_no_op(pa, tmp_path):
+    w = writer(tmp_path)
+    w.close(["never/part"])
+    assert w.files == [] and not os.path.exists(tmp_path / "never")
+
+
+def test_largest_buffer_is_spilled_past_the_limit(pa, tmp_path):
+    w = writer(tmp_path, row_group_rows=100, max_buffered_rows=4)
+    w.add("big/part", rows(3))
+    w.add("small/part", rows(1, species_id=2, start=3))
+    assert w.files == []
+    w.add("small/part", rows(1, species_id=2, start=4))
+    assert w.files == ["big/part"]
+    assert w._buffered == 2
+    w.close()
+    assert w.rows == 5
+
+
+def test_created_file_has_the_schema_without_rows(pa, tmp_path):
+    w = writer(tmp_path)
+    w.create("species")
+    w.close()
+    table = read(pa, tmp_path, "species", PARQUET)
+    assert table.num_rows == 0
+    assert table.schema.names == [c.key for c in REVIEW_EXPORT_COLUMNS]
+
+
+def test_rejects_unknown_format(pa, tmp_path):
+    with pytest.raises(ValueError):
+        writer(tmp_path, fmt="csv")
+
+
+@pytest.mark.parametrize("chunk_size", [7, 512, 1 << 20])
+def test_tar_stream_size_matches_its_output(tmp_path, chunk_size):
+    contents = {
+        "manifest.json": b"{}",
+        "empty": b"",
+        "block": b"x" * tarfile.BLOCKSIZE,
+        "reviews/speciesId=1/month=2025-01/part.parquet": os.urandom(3000),
+        "reviews/" + "long-" * 30 + "/Đà Lạt.arrow": b"y" * 513,
+    }
+    for path, data in contents.items():
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_bytes(data)
+
+    total, chunks = tar_stream(str(tmp_path), "20250101T000000Z", list(contents), chunk_size)
+    body = b"".join(chunks)
+    assert total == len(body)
+    assert total % tarfile.BLOCKSIZE == 0
+
+    with tarfile.open(fileobj=io.BytesIO(body)) as tar:
+        members = tar.getmembers()
+        assert [m.name for m in members] == [f"20250101T000000Z/{path}" for path in contents]
+        for member, data in zip(members, contents.values()):
+            assert tar.extractfile(member).read() == data
@@ -0,0 +1,97 @@
+"""LocationIndex (app/services/spatial_index.py) against brute force; no database needed."""
+import math
+import random
+
+import pytest
+
+from app.services.spatial_index import LocationIndex, haversine_m
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture(scope="module")
+def points():
+    rng = random.Random(7)
+    rows = [(i, rng.randint(1, 5), rng.uniform(-89.9, 89.9), rng.uniform(-180.0, 179.999)) for i in range(5000)]
+    # clusters straddling the antimeridian and around the poles
+    rows += [(5000 + i, 1, rng.uniform(-5, 5), rng.choice([-1, 1]) * rng.uniform(179.0, 179.999)) for i in range(300)]
+    rows += [(5300 + i, 2, rng.choice([-1, 1]) * rng.uniform(89.0, 89.99), rng.uniform(-180, 180)) for i in range(100)]
+    return rows
+
+
+@pytest.fixture(scope="module")
+def index(points):
+    idx = LocationIndex(cell_deg=0.5)
+    idx.load(points)
+    return idx
+
+
+def brute_bbox(points, min_lat, min_lon, max_lat, max_lon, species_id=None):
+    def in_lon(lon):
+        return min_lon <= lon <= max_lon if min_lon <= max_lon else lon >= min_lon or lon <= max_lon
+    return sorted(
+        i for i, s, lat, lon in points
+        if min_lat <= lat <= max_lat and in_lon(lon) and (species_id is None or s == species_id)
+    )
+
+
+def brute_nearby(points, lat0, lon0, radius_m, species_id=None):
+    found = []
+    for i, s, lat, lon in points:
+        d = float(haversine_m(lat0, lon0, np.array([lat]), np.array([lon]))[0])
+        if d <= radius_m and (species_id is None or s == species_id):
+            found.append((d, i))
+    return [i for _, i in sorted(found)]
+
+
+@pytest.mark.parametrize("box", [
+    (-10.0, -20.0, 10.0, 20.0),
+    (40.0, 100.0, 60.0, 140.0),
+    # crosses the antimeridian
+    (-5.0, 179.0, 5.0, -179.0),
+    (-60.0, 170.0, 60.0, -170.0),
+    (88.0, -180.0, 90.0, 180.0),
+])
+@pytest.mark.parametrize("species_id", [None, 1])
+def test_bbox_matches_brute_force(points, index, box, species_id):
+    assert sorted(index.bbox(*box, species_id=species_id)) == brute_bbox(points, *box, species_id=species_id)
+
+
+@pytest.mark.parametrize("center,radius", [
+    ((0.0, 0.0), 500_000),
+    # the search circle wraps past +/-180
+    ((0.0, 179.9), 150_000),
+    ((0.0, -179.9), 150_000),
+    ((89.5, 0.0), 200_000),
+    ((45.0, 90.0), 20_000_000),
+])
+def test_nearby_matches_brute_force(points, index, center, radius):
+    result = index.nearby(*center, radius)
+    assert [i for i, _ in result] == brute_nearby(points, *center, radius)
+    distances = [d for _, d in result]
+    assert distances == sorted(distances)
+
+
+def test_nearby_species_and_limit(points, index):
+    expected = brute_nearby(points, 0.0, 179.9, 300_000, species_id=1)[:5]
+    assert [i for i, _ in index.nearby(0.0, 179.9, 300_000, species_id=1, limit=5)] == expected
+
+
+def test_added_points_are_found_before_and_after_merge(points):
+    idx = LocationIndex(cell_deg=0.5, merge_every=2)
+    idx.load(points[:100])
+    idx.add(9001, 3, 12.5, -179.95)
+    assert 9001 in idx.bbox(12.0, 179.0, 13.0, -179.0)
+    idx.add(9002, 3, 12.6, 179.95)
+    found = idx.bbox(12.0, 179.0, 13.0, -179.0, species_id=3)
+    assert {9001, 9002} <= set(found)
+    assert math.isclose(idx.nearby(12.55, 180.0, 20_000, species_id=3)[0][1],
+                        min(float(haversine_m(12.55, 180.0, np.array([la]), np.array([lo]))[0])
+                            for la, lo in ((12.5, -179.95), (12.6, 179.95))))
+
+
+def test_empty_index():
+    idx = LocationIndex()
+    idx.load([])
+    assert idx.bbox(-10, -10, 10, 10) == []
+    assert idx.nearby(0, 0, 1000) == []
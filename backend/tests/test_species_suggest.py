@@ -0,0 +1,103 @@
+"""Accent folding (app/services/text_fold.py) and the suggest index ranking; no database needed."""
+import unicodedata
+
+import pytest
+
+from app.services.species_search import SuggestIndex, tsquery_text
+from app.services.text_fold import ACCENTED, UNACCENTED, fold, fold_sql, words
+
+SPECIES = [
+    (1, "Hoa Sen", "Nelumbo nucifera"),
+    (2, "Hoa Sen Đồng Tháp", "Nelumbo nucifera var."),
+    (3, "Sen Trắng", "Nelumbo alba"),
+    (4, "Hoa Súng", "Nymphaea"),
+    (5, "Đào", "Prunus persica"),
+    (6, "Mai Vàng", "Ochna integerrima"),
+    (7, "Hoa Ban", "Bauhinia variegata"),
+]
+
+
+@pytest.mark.parametrize("text,folded", [
+    ("Hoa Sen Đồng Tháp", "hoa sen dong thap"),
+    ("ĐÀO", "dao"),
+    ("Trắng", "trang"),
+    ("Ỷ Lan", "y lan"),
+    ("Phượng Vĩ", "phuong vi"),
+    ("Crème Brûlée", "creme brulee"),
+    ("Señor", "senor"),
+    ("plain ascii 123", "plain ascii 123"),
+])
+def test_fold(text, folded):
+    assert fold(text) == folded
+
+
+def test_fold_normalizes_decomposed_input():
+    assert fold(unicodedata.normalize("NFD", "Hoa Sen Đồng Tháp")) == "hoa sen dong thap"
+
+
+def test_translate_table_lines_up():
+    assert len(ACCENTED) == len(UNACCENTED) == len(set(ACCENTED))
+    assert fold_sql('"name"') == f"""translate(lower("name"), '{ACCENTED}', '{UNACCENTED}')"""
+
+
+def test_words_split_on_anything_else():
+    assert words("Hoa-Sen,  Đồng_Tháp (2025)") == ["hoa", "sen", "dong", "thap", "2025"]
+
+
+@pytest.mark.parametrize("q,query", [
+    ("hoa se", "hoa & se:*"),
+    ("Đồng", "dong:*"),
+    ("  ", None),
+    ("--", None),
+])
+def test_tsquery_text(q, query):
+    assert tsquery_text(q) == query
+
+
+@pytest.fixture
+def index():
+    idx = SuggestIndex()
+    idx.load(SPECIES)
+    return idx
+
+
+def ids(result):
+    return [s["speciesId"] for s in result]
+
+
+@pytest.mark.parametrize("prefix,expected", [
+    # whole names first, shortest first; then later name words; then scientific names
+    ("hoa", [7, 1, 4, 2]),
+    ("sen", [3, 1, 2]),
+    ("hoa sen", [1, 2]),
+    ("hoa sen ", [2]),
+    ("dong", [2]),
+    ("Đ", [5, 2]),
+    ("nelumbo", [1, 3, 2]),
+    ("NUCI", [1, 2]),
+    ("persica", [5]),
+    ("xyz", []),
+    ("  ", []),
+])
+def test_suggest_ranking(index, prefix, expected):
+    assert ids(index.suggest(prefix)) == expected
+
+
+def test_suggest_limit_and_payload(index):
+    assert index.suggest("hoa", limit=2) == [
+        {"speciesId": 7, "name": "Hoa Ban", "scientificName": "Bauhinia variegata"},
+        {"speciesId": 1, "name": "Hoa Sen", "scientificName": "Nelumbo nucifera"},
+    ]
+
+
+def test_add_is_visible_without_reload(index):
+    index.add(8, "Hoa Sứ", "Plumeria")
+    assert ids(index.suggest("hoa s")) == [8, 1, 4, 2]
+    assert ids(index.suggest("plum")) == [8]
+
+
+def test_add_before_load_is_ignored():
+    idx = SuggestIndex()
+    idx.add(1, "Hoa Sen", "Nelumbo nucifera")
+    assert idx.needs_load()
+    assert idx.suggest("hoa") == []